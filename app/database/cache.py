@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+TOP100_CHANNEL = "top100_changed"
+
+
+class ResponseCache:
+    """
+    Кэш сериализованных ответов API в памяти процесса.
+
+    Записи сбрасываются уведомлением парсера через LISTEN на отдельном соединении,
+    а TTL ограничивает срок их жизни, если уведомление потеряно. Число записей ограничено
+    max_entries, при превышении вытесняется запись, к которой дольше всего не обращались.
+
+    Каждый сброс увеличивает generation: ответ, прочитанный из базы до уведомления,
+    не сохраняется после него. Пока соединение LISTEN разорвано, кэш не используется,
+    а соединение восстанавливается в фоне с экспоненциальной задержкой.
+    """
+
+    def __init__(self, channel: str, ttl: float, max_entries: int = 256, reconnect_max_delay: float = 60):
+        self.channel = channel
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.reconnect_max_delay = reconnect_max_delay
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.generation = 0
+        self.dsn: Optional[str] = None
+        self.connection: Optional[asyncpg.Connection] = None
+        self.reconnect_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def active(self) -> bool:
+        """
+        Кэш используется, если LISTEN не настраивался (только TTL) или соединение LISTEN открыто.
+        """
+        return self.dsn is None or self.connection is not None
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Возвращает сохранённый ответ или None, если его нет, истёк TTL или кэш не используется.
+
+        :param key: Ключ запроса.
+        """
+        entry = self.entries.get(key) if self.active else None
+        if entry is None or time.monotonic() >= entry[0]:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Сохраняет ответ, если с начала его чтения из базы кэш не сбрасывался.
+
+        :param key: Ключ запроса.
+        :param value: Ответ.
+        :param generation: Значение generation до чтения ответа из базы.
+        """
+        if not self.active or (generation is not None and generation != self.generation):
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.entries.clear()
+
+    async def listen(self, dsn: str) -> None:
+        """
+        Подписывается на канал уведомлений через выделенное соединение.
+        Если подключиться не удалось, подключение повторяется в фоне.
+
+        :param dsn: Строка подключения к базе данных.
+        """
+        self.dsn = dsn
+        try:
+            await self._connect()
+        except Exception as e:
+            logger.warning(f"Не удалось подписаться на канал {self.channel}, кэш ответов отключён: {e}")
+            self._schedule_reconnect()
+
+    async def _connect(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        await connection.add_listener(self.channel, self._on_notify)
+        connection.add_termination_listener(self._on_terminate)
+        self.clear()
+        self.connection = connection
+        logger.info(f"Кэш ответов подписан на канал {self.channel}.")
+
+    def _schedule_reconnect(self) -> None:
+        if self.dsn is not None and (self.reconnect_task is None or self.reconnect_task.done()):
+            self.reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        """
+        Восстанавливает соединение LISTEN с экспоненциальной задержкой.
+        Уведомления, пришедшие без соединения, потеряны, поэтому после подключения кэш сбрасывается.
+        """
+        delay = 1.0
+        while self.dsn is not None and self.connection is None:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+            except Exception as e:
+                delay = min(delay * 2, self.reconnect_max_delay)
+                logger.warning(f"Не удалось восстановить LISTEN {self.channel}, повтор через {delay:.0f} с: {e}")
+
+    async def close(self) -> None:
+        self.dsn = None
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+        if self.connection is not None and not self.connection.is_closed():
+            await self.connection.close()
+        self.connection = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        logger.info(f"Получено уведомление {channel} ({payload}), кэш ответов сброшен.")
+        self.clear()
+
+    def _on_terminate(self, connection) -> None:
+        if connection is not self.connection:
+            return
+        logger.warning(f"Соединение LISTEN {self.channel} закрыто, кэш ответов отключён до переподключения.")
+        self.clear()
+        self.connection = None
+        self._schedule_reconnect()
+
+
+top100_cache = ResponseCache(
+    TOP100_CHANNEL,
+    float(os.getenv("TOP100_CACHE_TTL", 300)),
+    int(os.getenv("TOP100_CACHE_MAX_ENTRIES", 256)),
+)
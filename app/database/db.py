@@ -1,5 +1,5 @@
-from typing import List, Dict, Any
-from asyncpg import Pool
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional, Tuple
+from asyncpg import Pool, Record
 from datetime import datetime
 
 
@@ -17,28 +17,74 @@ def parse_date(date_str: str) -> datetime.date:
         raise ValueError(f"Неверный формат даты: {date_str}. Используйте YYYY-MM-DD.") from e
 
 
+async def fetch_author_names(conn, author_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Получение имён авторов по идентификаторам из словаря authors.
+
+    :param conn: Соединение с базой данных.
+    :param author_ids: Идентификаторы авторов.
+    :return: Словарь {идентификатор: имя}.
+    """
+    unique_ids = list(set(author_ids))
+    if not unique_ids:
+        return {}
+    rows = await conn.fetch("SELECT id, name FROM authors WHERE id = ANY($1::int[])", unique_ids)
+    return {row["id"]: row["name"] for row in rows}
+
+
+ACTIVITY_GRANULARITIES = ("day", "week", "month")
+
+
 async def fetch_activity_from_db(
-    pool: Pool, repo: str, start_date: str, end_date: str
+    pool: Pool, repo: str, start_date: str, end_date: str, with_authors: bool = True, granularity: str = "day"
 ) -> List[Dict[str, Any]]:
     """
-    Получение активности репозитория из таблицы activity.
+    Получение активности репозитория из таблицы activity или из недельных и месячных агрегатов activity_rollups.
+
+    Авторы хранятся массивами идентификаторов; имена подставляются
+    одним запросом к словарю authors по уникальным идентификаторам выборки.
+    Для недель и месяцев date — первый день периода, а периоды на границах интервала
+    возвращаются целиком; авторы периода уже без повторов. Периоды, начинающиеся раньше
+    окна хранения activity, неполные и не хранятся, поэтому в ответ не попадают.
 
     :param pool: Пул соединений с базой данных.
     :param repo: Полное имя репозитория (owner/repo).
     :param start_date: Начальная дата в формате YYYY-MM-DD.
     :param end_date: Конечная дата в формате YYYY-MM-DD.
+    :param with_authors: Подставлять имена авторов (иначе список авторов пустой).
+    :param granularity: Шаг агрегации: day, week или month.
     :return: Список объектов активности.
     """
-    query = """
-        SELECT date, commits, authors
-        FROM activity
-        WHERE repo = $1 AND date >= $2 AND date <= $3
-        ORDER BY date ASC
-    """
+    if granularity == "day":
+        query = """
+            SELECT date, commits, author_ids
+            FROM activity
+            WHERE repo = $1 AND date >= $2 AND date <= $3
+            ORDER BY date ASC
+        """
+        params = (repo, start_date, end_date)
+    else:
+        query = """
+            SELECT period_start AS date, commits, author_ids
+            FROM activity_rollups
+            WHERE repo = $1 AND granularity = $4
+              AND period_start >= date_trunc($4, $2::date)::date AND period_start <= $3
+            ORDER BY period_start ASC
+        """
+        params = (repo, start_date, end_date, granularity)
     async with pool.acquire() as conn:
-        rows = await conn.fetch(query, repo, start_date, end_date)
+        rows = await conn.fetch(query, *params)
+        names = (
+            await fetch_author_names(conn, (author_id for row in rows for author_id in row["author_ids"]))
+            if with_authors
+            else {}
+        )
     return [
-        {"date": row["date"], "commits": row["commits"], "authors": row["authors"]}
+        {
+            "date": row["date"],
+            "commits": row["commits"],
+            "authors": [names[author_id] for author_id in row["author_ids"] if author_id in names],
+        }
         for row in rows
     ]
 
@@ -47,7 +93,7 @@ async def fetch_top_repositories(
     pool: Pool, sort_by: str = "stars", order: str = "desc", limit: int = 100
 ) -> List[Dict[str, Any]]:
     """
-    Получение топ-репозиториев из таблицы top100.
+    Получение топ-репозиториев из таблицы top100 (в ней хранится топ-N, заданный парсеру).
 
     :param pool: Пул соединений с базой данных.
     :param sort_by: Поле для сортировки (по умолчанию stars).
@@ -77,3 +123,253 @@ async def fetch_top_repositories(
         }
         for row in rows
     ]
+
+
+SORT_EXPRESSIONS = {
+    "stars": "stars",
+    "watchers": "watchers",
+    "forks": "forks",
+    "open_issues": "open_issues",
+    "language": "COALESCE(language, '')",
+}
+
+
+async def fetch_repositories_page(
+    pool: Pool, sort_by: str, order: str, limit: int, after: Optional[Tuple[Any, str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Получение страницы репозиториев из таблицы top100 с keyset-пагинацией.
+
+    Порядок задаётся полем сортировки и именем репозитория как уточняющим ключом, а страница
+    начинается строго после пары (значение, repo) последней строки предыдущей страницы.
+    Для каждого поля сортировки есть индекс (поле, repo), поэтому любая страница читается
+    коротким просмотром индекса без OFFSET.
+
+    :param pool: Пул соединений с базой данных.
+    :param sort_by: Поле для сортировки.
+    :param order: Порядок сортировки (asc или desc).
+    :param limit: Количество записей на странице.
+    :param after: Пара (значение поля сортировки, repo) последней строки предыдущей страницы.
+    :return: Список репозиториев; у каждого есть также sort_value для курсора следующей страницы.
+    """
+    expression = SORT_EXPRESSIONS[sort_by]
+    comparison = "<" if order == "desc" else ">"
+    params = [limit]
+    keyset = ""
+    if after is not None:
+        keyset = f"WHERE ({expression}, repo) {comparison} ($2, $3)"
+        params += [after[0], after[1]]
+    query = f"""
+        SELECT repo, owner, position_cur, position_prev, stars, watchers, forks, open_issues, language,
+               {expression} AS sort_value
+        FROM top100
+        {keyset}
+        ORDER BY {expression} {order}, repo {order}
+        LIMIT $1
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(query, *params)
+    return [dict(row) for row in rows]
+
+
+async def fetch_rank_history(pool: Pool, repo: str, start_date, end_date) -> List[Dict[str, Any]]:
+    """
+    Получение истории позиции, звёзд и форков репозитория из таблицы top100_history.
+
+    Выборка идёт по первичному ключу (repo, captured_at) и читает только снимки интервала.
+
+    :param pool: Пул соединений с базой данных.
+    :param repo: Полное имя репозитория (owner/repo).
+    :param start_date: Начальная дата интервала включительно.
+    :param end_date: Конечная дата интервала включительно.
+    :return: Список снимков в порядке времени.
+    """
+    query = """
+        SELECT captured_at, position, stars, forks
+        FROM top100_history
+        WHERE repo = $1 AND captured_at >= $2::date AND captured_at < $3::date + 1
+        ORDER BY captured_at ASC
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(query, repo, start_date, end_date)
+    return [
+        {
+            "captured_at": row["captured_at"],
+            "position": row["position"],
+            "stars": row["stars"],
+            "forks": row["forks"],
+        }
+        for row in rows
+    ]
+
+
+async def fetch_data_version(pool: Pool, name: str) -> int:
+    """
+    Получение версии таблицы, которую парсер увеличивает при каждой публикации.
+
+    :param pool: Пул соединений с базой данных.
+    :param name: Имя таблицы (top100, activity).
+    :return: Версия или 0, если таблица ещё не публиковалась.
+    """
+    async with pool.acquire() as conn:
+        version = await conn.fetchval("SELECT version FROM data_versions WHERE name = $1", name)
+    return version or 0
+
+
+async def fetch_activity_version(pool: Pool, repo: str) -> int:
+    """
+    Получение версии активности репозитория.
+
+    :param pool: Пул соединений с базой данных.
+    :param repo: Полное имя репозитория (owner/repo).
+    :return: Версия или 0, если активности репозитория нет.
+    """
+    async with pool.acquire() as conn:
+        version = await conn.fetchval("SELECT version FROM activity_versions WHERE repo = $1", repo)
+    return version or 0
+
+
+async def fetch_data_versions(pool: Pool, names: List[str]) -> Dict[str, int]:
+    """
+    Получение версий нескольких таблиц одним запросом.
+
+    :param pool: Пул соединений с базой данных.
+    :param names: Имена таблиц.
+    :return: Словарь {имя: версия}; таблицы, которые ещё не публиковались, имеют версию 0.
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch("SELECT name, version FROM data_versions WHERE name = ANY($1::text[])", names)
+    versions = {row["name"]: row["version"] for row in rows}
+    return {name: versions.get(name, 0) for name in names}
+
+
+async def stream_bulk_activity(
+    pool: Pool,
+    start_date,
+    end_date,
+    repos: Optional[List[str]] = None,
+    top_n: Optional[int] = None,
+    granularity: str = "day",
+    prefetch: int = 1000,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Потоковое получение активности многих репозиториев одним запросом через серверный курсор.
+
+    Репозитории задаются списком или первыми top_n позициями текущего топа; во втором случае
+    список берётся подзапросом к top100 в том же запросе. Имена авторов подставляются в SQL
+    из словаря authors. Строки идут по репозиториям, внутри репозитория — по дате.
+
+    :param pool: Пул соединений с базой данных.
+    :param start_date: Начальная дата интервала.
+    :param end_date: Конечная дата интервала.
+    :param repos: Полные имена репозиториев (owner/repo).
+    :param top_n: Количество первых позиций топа (если repos не задан).
+    :param granularity: Шаг агрегации: day, week или month.
+    :param prefetch: Сколько строк курсор забирает из базы за раз.
+    :return: Асинхронный итератор пар (repo, объект активности).
+    """
+    if granularity == "day":
+        source = """
+            SELECT repo, date, commits, author_ids
+            FROM activity
+            WHERE date >= $3 AND date <= $4
+        """
+    else:
+        source = """
+            SELECT repo, period_start AS date, commits, author_ids
+            FROM activity_rollups
+            WHERE granularity = $5 AND period_start >= date_trunc($5, $3::date)::date AND period_start <= $4
+        """
+    query = f"""
+        SELECT s.repo, s.date, s.commits,
+               ARRAY(
+                   SELECT a.name
+                   FROM unnest(s.author_ids) WITH ORDINALITY AS u(id, ord)
+                   JOIN authors a ON a.id = u.id
+                   ORDER BY u.ord
+               ) AS authors
+        FROM ({source}) AS s
+        WHERE s.repo = ANY(COALESCE(
+            $1::text[],
+            ARRAY(SELECT repo FROM top100 ORDER BY position_cur LIMIT $2)
+        ))
+        ORDER BY s.repo, s.date
+    """
+    params = [repos, top_n, start_date, end_date]
+    if granularity != "day":
+        params.append(granularity)
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(query, *params, prefetch=prefetch):
+                yield row["repo"], {"date": row["date"], "commits": row["commits"], "authors": row["authors"]}
+
+
+EXPORT_COLUMNS = {
+    "activity": ("repo", "date", "commits", "authors"),
+    "top100": ("repo", "owner", "position_cur", "position_prev", "stars", "watchers", "forks", "open_issues", "language"),
+}
+
+
+async def stream_export(
+    pool: Pool,
+    table: str,
+    repos: Optional[List[str]] = None,
+    start_date=None,
+    end_date=None,
+    chunk_size: int = 5000,
+) -> AsyncIterator[List[Record]]:
+    """
+    Потоковая выгрузка таблицы activity или top100 пачками строк через серверный курсор.
+
+    Курсор открывается в транзакции только для чтения с уровнем repeatable read, поэтому выгрузка
+    видит один снимок данных, даже если парсер опубликует новые данные во время чтения.
+    В процессе API одновременно находится не больше одной пачки строк.
+
+    :param pool: Пул соединений с базой данных.
+    :param table: Выгружаемая таблица: activity или top100.
+    :param repos: Полные имена репозиториев (owner/repo); None — все репозитории.
+    :param start_date: Начальная дата активности включительно (только для activity).
+    :param end_date: Конечная дата активности включительно (только для activity).
+    :param chunk_size: Сколько строк забирать из курсора за раз.
+    :return: Асинхронный итератор пачек строк с колонками EXPORT_COLUMNS[table].
+    """
+    conditions = []
+    params: List[Any] = []
+    if repos is not None:
+        params.append(repos)
+        conditions.append(f"t.repo = ANY(${len(params)}::text[])")
+    if table == "activity":
+        if start_date is not None:
+            params.append(start_date)
+            conditions.append(f"t.date >= ${len(params)}")
+        if end_date is not None:
+            params.append(end_date)
+            conditions.append(f"t.date <= ${len(params)}")
+        select = """
+            SELECT t.repo, t.date, t.commits,
+                   ARRAY(
+                       SELECT a.name
+                       FROM unnest(t.author_ids) WITH ORDINALITY AS u(id, ord)
+                       JOIN authors a ON a.id = u.id
+                       ORDER BY u.ord
+                   ) AS authors
+            FROM activity t
+        """
+        order = "ORDER BY t.repo, t.date"
+    else:
+        select = f"SELECT {', '.join(EXPORT_COLUMNS['top100'])} FROM top100 t"
+        order = "ORDER BY t.position_cur NULLS LAST, t.repo"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"{select} {where} {order}"
+
+    async with pool.acquire() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            cursor = await conn.cursor(query, *params)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                yield rows
+                if len(rows) < chunk_size:
+                    break
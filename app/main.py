@@ -1,8 +1,9 @@
 from fastapi import FastAPI, HTTPException
-from app.routers import repos, activity
+from app.routers import repos, activity, export
 from fastapi.middleware.cors import CORSMiddleware
 from asyncpg import create_pool
 from app.database.utils import set_db_pool
+from app.database.cache import top100_cache
 from app.config.config import Settings
 import logging
 from dotenv import load_dotenv
@@ -31,6 +32,7 @@ def include_routers():
     """
     app.include_router(repos.router, prefix="/api/repos", tags=["Repositories"])
     app.include_router(activity.router, prefix="/api/repos", tags=["Activity"])
+    app.include_router(export.router, prefix="/api/export", tags=["Export"])
 
 
 include_routers()
@@ -49,6 +51,10 @@ async def startup_event():
         async with pool.acquire() as conn:
             await conn.execute("SELECT 1")
         logger.info("Успешное подключение к базе данных")
+        try:
+            await top100_cache.listen(settings.database_url)
+        except Exception as e:
+            logger.warning(f"Не удалось подписаться на уведомления парсера, кэш топа обновляется по TTL: {e}")
     except Exception as e:
         logger.error(f"Ошибка подключения к базе данных: {e}")
         raise HTTPException(status_code=500, detail="Ошибка подключения к базе данных")
@@ -60,6 +66,7 @@ async def shutdown_event():
     Обработчик события завершения приложения.
     Закрывает подключение к базе данных.
     """
+    await top100_cache.close()
     global db_pool
     if db_pool is not None:
         try:
@@ -1,8 +1,18 @@
+import json
 from datetime import datetime
-from typing import List, Union
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from app.database.db import fetch_activity_from_db, parse_date
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.database.db import (
+    ACTIVITY_GRANULARITIES,
+    fetch_activity_from_db,
+    fetch_activity_version,
+    fetch_data_versions,
+    parse_date,
+    stream_bulk_activity,
+)
+from app.schemas.query_params import MAX_TOP_N
+from app.routers.etag import cache_headers, etag_matches, make_etag, not_modified
 from app.schemas.activity_schema import ActivitySchema, MessageResponseSchema
 from app.database.utils import get_db_pool
 from asyncpg.pool import Pool
@@ -11,6 +21,163 @@ import logging
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+MAX_BULK_REPOS = 1000
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def validate_granularity(granularity: str) -> None:
+    if granularity not in ACTIVITY_GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Недопустимый шаг агрегации: {granularity}. Допустимые значения: {', '.join(ACTIVITY_GRANULARITIES)}"
+        )
+
+
+def parse_bulk_repos(repos: Optional[str], top_n: Optional[int]) -> Optional[List[str]]:
+    """
+    Разбирает и проверяет выбор репозиториев для получения активности многих репозиториев.
+
+    :param repos: Полные имена репозиториев через запятую; повторы отбрасываются с сохранением порядка.
+    :param top_n: Количество первых позиций топа.
+    :return: Список репозиториев или None, если выбран top_n.
+    :raises HTTPException: Если не задан ровно один из параметров, список пуст или слишком длинный.
+    """
+    repo_list = None
+    if repos is not None:
+        repo_list = list(dict.fromkeys(name.strip() for name in repos.split(",") if name.strip()))
+    if (repo_list is None) == (top_n is None):
+        raise HTTPException(status_code=400, detail="Укажите ровно один из параметров: repos или top_n.")
+    if repo_list is not None and not repo_list:
+        raise HTTPException(status_code=400, detail="Список репозиториев пуст.")
+    if repo_list is not None and len(repo_list) > MAX_BULK_REPOS:
+        raise HTTPException(status_code=400, detail=f"Можно запросить не больше {MAX_BULK_REPOS} репозиториев.")
+    if top_n is not None and not 1 <= top_n <= MAX_TOP_N:
+        raise HTTPException(status_code=400, detail=f"Допустимый диапазон top_n: 1–{MAX_TOP_N}.")
+    return repo_list
+
+
+async def encode_bulk_activity(rows: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """
+    Сериализует упорядоченные по репозиторию строки активности в JSON-объект {repo: [активность, ...]}
+    кусками не меньше STREAM_CHUNK_BYTES (кроме последнего).
+
+    :param rows: Пары (repo, объект активности) из stream_bulk_activity.
+    :return: Асинхронный итератор кусков тела ответа.
+    """
+    current = None
+    parts = [b"{"]
+    size = 1
+    async for repo, item in rows:
+        if repo != current:
+            part = (b"" if current is None else b"],") + json.dumps(repo).encode() + b":["
+            current = repo
+        else:
+            part = b","
+        item["date"] = item["date"].isoformat()
+        part += json.dumps(item, ensure_ascii=False).encode()
+        parts.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b"".join(parts)
+            parts, size = [], 0
+    parts.append(b"}" if current is None else b"]}")
+    yield b"".join(parts)
+
+
+async def prefetch_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Получает первый кусок потокового ответа до отправки заголовков, чтобы ошибка запроса
+    к базе данных вернула 500, а не обрезанный JSON со статусом 200.
+
+    Ошибка после отправки первого куска логируется и обрывает соединение: клиент получает
+    незавершённый ответ, а не корректно закрытый, но неполный JSON.
+
+    :param chunks: Куски тела ответа.
+    :return: Асинхронный итератор тех же кусков.
+    :raises HTTPException: Если первый кусок получить не удалось.
+    """
+    try:
+        first = await chunks.__anext__()
+    except Exception as e:
+        logger.error(f"Ошибка при получении активности репозиториев: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Произошла внутренняя ошибка сервера. Пожалуйста, повторите попытку позже.",
+        )
+
+    async def body():
+        yield first
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            logger.error(f"Передача активности репозиториев прервана: {e}")
+            raise
+
+    return body()
+
+
+@router.get("/activity")
+async def get_bulk_activity(
+    start_date: str,
+    end_date: str,
+    request: Request,
+    repos: Optional[str] = None,
+    top_n: Optional[int] = None,
+    granularity: str = "day",
+    db_pool: Pool = Depends(get_db_pool)
+):
+    """
+    Получение активности многих репозиториев одним запросом к базе данных.
+
+    Репозитории задаются списком repos через запятую (owner/repo,owner/repo) или числом top_n —
+    первыми позициями текущего топа. Ответ передаётся потоком: JSON-объект {repo: список активности},
+    репозитории без активности за период и неизвестные репозитории в него не попадают. ETag строится из версий activity и top100.
+
+    :param start_date: Начальная дата интервала (в формате YYYY-MM-DD).
+    :param end_date: Конечная дата интервала (в формате YYYY-MM-DD).
+    :param request: Объект запроса (заголовок If-None-Match).
+    :param repos: Полные имена репозиториев через запятую.
+    :param top_n: Количество первых позиций топа (если repos не задан).
+    :param granularity: Шаг агрегации: day (по умолчанию), week или month.
+    :param db_pool: Пул соединений с базой данных (зависимость FastAPI).
+    :return: Потоковый JSON-ответ или 304.
+    :raises HTTPException: При некорректных параметрах запроса или ошибке базы данных до начала ответа.
+    """
+    validate_granularity(granularity)
+    repo_list = parse_bulk_repos(repos, top_n)
+
+    try:
+        start_date_parsed = parse_date(start_date)
+        end_date_parsed = parse_date(end_date)
+    except ValueError as e:
+        logger.error(f"Некорректный формат даты: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail="Ошибка при обработке вашего запроса. Проверьте формат дат."
+        )
+
+    try:
+        versions = await fetch_data_versions(db_pool, ["activity", "top100"])
+    except Exception as e:
+        logger.error(f"Ошибка при получении версий данных: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Произошла внутренняя ошибка сервера. Пожалуйста, повторите попытку позже.",
+        )
+    etag = make_etag(
+        "bulk_activity", versions["activity"], versions["top100"],
+        ",".join(repo_list or []), top_n, start_date_parsed, end_date_parsed, granularity,
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    rows = stream_bulk_activity(
+        db_pool, start_date_parsed, end_date_parsed, repos=repo_list, top_n=top_n, granularity=granularity
+    )
+    body = await prefetch_stream(encode_bulk_activity(rows))
+    return StreamingResponse(body, media_type="application/json", headers=cache_headers(etag))
+
 
 @router.get("/{owner}/{repo}/activity", response_model=List[Union[ActivitySchema, MessageResponseSchema]])
 async def get_activity(
@@ -18,28 +185,47 @@ async def get_activity(
     repo: str,
     start_date: str,
     end_date: str,
+    request: Request,
+    response: Response,
+    granularity: str = "day",
     db_pool: Pool = Depends(get_db_pool)
 ):
     """
     Получение активности репозитория за указанный период.
 
+    ETag строится из версии активности репозитория, которую парсер увеличивает при её изменении,
+    и параметров запроса. Совпавший If-None-Match получает 304 до чтения строк активности.
+
     :param owner: Владелец репозитория.
     :param repo: Название репозитория.
     :param start_date: Начальная дата интервала (в формате YYYY-MM-DD).
     :param end_date: Конечная дата интервала (в формате YYYY-MM-DD).
+    :param request: Объект запроса (заголовок If-None-Match).
+    :param response: Ответ, в который добавляются заголовки ETag и Cache-Control.
+    :param granularity: Шаг агрегации: day (по умолчанию), week или month. Недели и месяцы
+        читаются из готовых агрегатов, даты в ответе — первые дни периодов.
     :param db_pool: Пул соединений с базой данных (зависимость FastAPI).
     :return: Список активности или сообщение, если данных нет.
     :raises HTTPException: При ошибке обработки запроса или внутренней ошибке сервера.
     """
+    validate_granularity(granularity)
+
     try:
         start_date_parsed = parse_date(start_date)
         end_date_parsed = parse_date(end_date)
 
+        version = await fetch_activity_version(db_pool, f"{owner}/{repo}")
+        etag = make_etag("activity", f"{owner}/{repo}", version, start_date_parsed, end_date_parsed, granularity)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
         activity = await fetch_activity_from_db(
             pool=db_pool,
             repo=f"{owner}/{repo}",
             start_date=start_date_parsed,
             end_date=end_date_parsed,
+            granularity=granularity,
         )
 
         if not activity:
@@ -49,7 +235,8 @@ async def get_activity(
                 content={
                     "message": "Указанный интервал слишком большой, данных нет в базе.",
                     "activity": []
-                }
+                },
+                headers=cache_headers(etag),
             )
 
         min_date = activity[0]["date"]
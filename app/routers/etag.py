@@ -0,0 +1,38 @@
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Response
+
+CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", 60))
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+
+
+def make_etag(*parts) -> str:
+    """
+    Строит сильный ETag из версии данных и параметров запроса.
+
+    :param parts: Версия данных и параметры, от которых зависит тело ответа.
+    :return: ETag в кавычках.
+    """
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверяет заголовок If-None-Match: список ETag через запятую или *.
+    Для If-None-Match используется слабое сравнение, поэтому префикс W/ не учитывается.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
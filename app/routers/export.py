@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import os
+from typing import List, Optional, Sequence
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from asyncpg import Record
+from asyncpg.pool import Pool
+from app.database.db import EXPORT_COLUMNS, parse_date, stream_export
+from app.database.utils import get_db_pool
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def validate_format(export_format: str) -> None:
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Недопустимый формат выгрузки: {export_format}. Допустимые значения: {', '.join(EXPORT_FORMATS)}"
+        )
+
+
+def parse_repos(repos: Optional[str]) -> Optional[List[str]]:
+    return [name.strip() for name in repos.split(",") if name.strip()] if repos else None
+
+
+def csv_header(columns: Sequence[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+
+def encode_rows(export_format: str, columns: Sequence[str], rows: List[Record]) -> bytes:
+    """
+    Сериализует пачку строк выгрузки в NDJSON или CSV.
+
+    Даты записываются в формате ISO, списки авторов в CSV — одной ячейкой через «;».
+
+    :param export_format: Формат: ndjson или csv.
+    :param columns: Порядок колонок.
+    :param rows: Строки курсора.
+    :return: Байты пачки.
+    """
+    if export_format == "ndjson":
+        return "".join(
+            json.dumps({column: row[column] for column in columns}, ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        ).encode()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            ";".join(value) if isinstance(value, list) else ("" if value is None else value)
+            for value in (row[column] for column in columns)
+        ])
+    return buffer.getvalue().encode()
+
+
+def export_response(db_pool: Pool, table: str, export_format: str, **filters) -> StreamingResponse:
+    """
+    Потоковый ответ с выгрузкой таблицы: каждая пачка строк курсора сериализуется и сразу отправляется.
+    Заголовок CSV отправляется до запроса к базе данных.
+    """
+    columns = EXPORT_COLUMNS[table]
+
+    async def body():
+        if export_format == "csv":
+            yield csv_header(columns)
+        try:
+            async for rows in stream_export(db_pool, table, chunk_size=EXPORT_CHUNK_ROWS, **filters):
+                yield encode_rows(export_format, columns, rows)
+        except Exception as e:
+            logger.error(f"Выгрузка {table} прервана: {e}")
+            raise
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{export_format}"'},
+    )
+
+
+@router.get("/activity")
+async def export_activity(
+    format: str = "ndjson",
+    repos: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    db_pool: Pool = Depends(get_db_pool)
+):
+    """
+    Полная выгрузка таблицы activity в NDJSON или CSV, упорядоченная по репозиторию и дате.
+
+    Строки читаются серверным курсором пачками по EXPORT_CHUNK_ROWS и передаются потоком,
+    поэтому память процесса не зависит от размера выгрузки.
+
+    :param format: Формат выгрузки: ndjson (по умолчанию) или csv.
+    :param repos: Полные имена репозиториев через запятую; без параметра — все репозитории.
+    :param start_date: Начальная дата (в формате YYYY-MM-DD), необязательно.
+    :param end_date: Конечная дата (в формате YYYY-MM-DD), необязательно.
+    :param db_pool: Пул соединений с базой данных (зависимость FastAPI).
+    :return: Потоковый ответ с выгрузкой.
+    :raises HTTPException: При некорректных параметрах запроса.
+    """
+    validate_format(format)
+    try:
+        start_date_parsed = parse_date(start_date) if start_date else None
+        end_date_parsed = parse_date(end_date) if end_date else None
+    except ValueError as e:
+        logger.error(f"Некорректный формат даты: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail="Ошибка при обработке вашего запроса. Проверьте формат дат."
+        )
+
+    return export_response(
+        db_pool, "activity", format,
+        repos=parse_repos(repos), start_date=start_date_parsed, end_date=end_date_parsed,
+    )
+
+
+@router.get("/top100")
+async def export_top100(
+    format: str = "ndjson",
+    repos: Optional[str] = None,
+    db_pool: Pool = Depends(get_db_pool)
+):
+    """
+    Полная выгрузка таблицы top100 в NDJSON или CSV, упорядоченная по текущей позиции.
+
+    :param format: Формат выгрузки: ndjson (по умолчанию) или csv.
+    :param repos: Полные имена репозиториев через запятую; без параметра — все репозитории.
+    :param db_pool: Пул соединений с базой данных (зависимость FastAPI).
+    :return: Потоковый ответ с выгрузкой.
+    :raises HTTPException: При некорректном формате.
+    """
+    validate_format(format)
+    return export_response(db_pool, "top100", format, repos=parse_repos(repos))
@@ -1,16 +1,113 @@
+import base64
+import binascii
+import json
 from asyncpg import PostgresError
-from fastapi import APIRouter, HTTPException, Depends, Request
-from app.database.db import fetch_top_repositories
-from app.schemas.repo_schema import RepoSchema
-from app.schemas.query_params import Top100QueryParams
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from pydantic import TypeAdapter
+from app.database.cache import top100_cache
+from app.database.db import (
+    fetch_data_version,
+    fetch_rank_history,
+    fetch_repositories_page,
+    fetch_top_repositories,
+    parse_date,
+)
+from app.routers.etag import cache_headers, etag_matches, make_etag, not_modified
+from app.schemas.repo_schema import RankHistorySchema, RepoPageSchema, RepoSchema
+from app.schemas.query_params import RepoPageQueryParams, Top100QueryParams, TopQueryParams
 from app.database.utils import get_db_pool
-from typing import List
+from typing import Any, List, Optional, Tuple
 from asyncpg.pool import Pool
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+repo_list_adapter = TypeAdapter(List[RepoSchema])
+
+INT4_MIN, INT4_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def encode_cursor(sort_by: str, order: str, value: Any, repo: str) -> str:
+    """
+    Кодирует позицию на странице в непрозрачный курсор: поле и порядок сортировки,
+    значение поля и имя репозитория последней строки.
+    """
+    payload = json.dumps([sort_by, order, value, repo], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, str]:
+    """
+    Разбирает курсор и проверяет, что он выдан для той же сортировки, а значения
+    имеют тип поля сортировки: строка для language, целое число INTEGER для остальных полей.
+
+    :return: Пара (значение поля сортировки, repo).
+    :raises HTTPException: Если курсор повреждён или выдан для другой сортировки.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор.")
+    if not isinstance(payload, list) or len(payload) != 4:
+        raise HTTPException(status_code=400, detail="Некорректный курсор.")
+    cursor_sort_by, cursor_order, value, repo = payload
+    if (cursor_sort_by, cursor_order) != (sort_by, order):
+        raise HTTPException(status_code=400, detail="Курсор выдан для другой сортировки.")
+    if sort_by == "language":
+        valid_value = isinstance(value, str)
+    else:
+        valid_value = isinstance(value, int) and not isinstance(value, bool) and INT4_MIN <= value <= INT4_MAX
+    if not valid_value or not isinstance(repo, str):
+        raise HTTPException(status_code=400, detail="Некорректный курсор.")
+    return value, repo
+
+
+async def top_repositories_response(
+    request: Request, db_pool: Pool, sort_by: str, order: str, limit: int
+) -> Response:
+    """
+    Возвращает сериализованный список топ-репозиториев из кэша ответов,
+    а при промахе загружает его из базы данных и сохраняет в кэш.
+
+    ETag строится из версии top100, которую парсер увеличивает при публикации, и параметров запроса.
+    Совпавший If-None-Match получает 304 до чтения строк и сериализации.
+
+    :param request: Объект запроса (заголовок If-None-Match).
+    :param db_pool: Пул соединений с базой данных.
+    :param sort_by: Поле для сортировки.
+    :param order: Порядок сортировки.
+    :param limit: Максимальное количество записей.
+    :return: Ответ с JSON-телом или 304.
+    :raises HTTPException: Если репозитории не найдены.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    key = (sort_by, order, limit)
+    cached = top100_cache.get(key)
+    if cached is None:
+        generation = top100_cache.generation
+        version = await fetch_data_version(db_pool, "top100")
+        etag = make_etag("top100", version, sort_by, order, limit)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        repos = await fetch_top_repositories(db_pool, sort_by=sort_by, order=order, limit=limit)
+
+        if not repos:
+            logger.warning("Данные не найдены в базе данных для запрошенных параметров.")
+            raise HTTPException(
+                status_code=404,
+                detail="Репозитории не найдены."
+            )
+
+        cached = (etag, repo_list_adapter.dump_json([RepoSchema(**repo) for repo in repos]))
+        top100_cache.set(key, cached, generation)
+
+    etag, body = cached
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
 
 @router.get("/top100", response_model=List[RepoSchema])
 async def get_top_repositories(
@@ -19,7 +116,8 @@ async def get_top_repositories(
         db_pool: Pool = Depends(get_db_pool),  
 ):
     """
-    Получение топ-100 репозиториев из базы данных.
+    Получение топ-100 репозиториев. Ответ отдаётся из кэша в памяти процесса,
+    который сбрасывается уведомлением парсера после публикации нового топа.
 
     :param request: Объект запроса для проверки всех параметров.
     :param params: Валидированные параметры запроса.
@@ -39,18 +137,171 @@ async def get_top_repositories(
 
         logger.info(f"Получен запрос с параметрами: sort_by={params.sort_by}, order={params.order}")
 
-        repos = await fetch_top_repositories(
-            db_pool, sort_by=params.sort_by, order=params.order
+        return await top_repositories_response(request, db_pool, params.sort_by, params.order, 100)
+
+    except PostgresError as db_err:
+        logger.error(f"Ошибка базы данных: {db_err}")
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка соединения с базой данных. Попробуйте позже."
+        )
+    except HTTPException as http_err:
+        logger.warning(f"Обработка HTTP-ошибки: {http_err.detail}")
+        raise http_err
+    except Exception as e:
+        logger.error(f"Необработанная ошибка: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Произошла внутренняя ошибка сервера. Попробуйте позже."
         )
 
-        if not repos:
-            logger.warning("Данные не найдены в базе данных для запрошенных параметров.")
+
+@router.get("/top", response_model=List[RepoSchema])
+async def get_top_n_repositories(
+        request: Request,
+        params: TopQueryParams = Depends(),
+        db_pool: Pool = Depends(get_db_pool),
+):
+    """
+    Получение топ-N репозиториев из базы данных.
+
+    :param request: Объект запроса для проверки всех параметров.
+    :param params: Валидированные параметры запроса (sort_by, order, n).
+    :param db_pool: Пул соединений с базой данных.
+    :return: Список репозиториев.
+    """
+    try:
+        valid_params = {"sort_by", "order", "n"}
+        query_params = set(request.query_params.keys())
+        unknown_params = query_params - valid_params
+
+        if unknown_params:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неизвестные параметры запроса: {', '.join(unknown_params)}"
+            )
+
+        logger.info(
+            f"Получен запрос с параметрами: sort_by={params.sort_by}, order={params.order}, n={params.n}"
+        )
+
+        return await top_repositories_response(request, db_pool, params.sort_by, params.order, params.n)
+
+    except PostgresError as db_err:
+        logger.error(f"Ошибка базы данных: {db_err}")
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка соединения с базой данных. Попробуйте позже."
+        )
+    except HTTPException as http_err:
+        logger.warning(f"Обработка HTTP-ошибки: {http_err.detail}")
+        raise http_err
+    except Exception as e:
+        logger.error(f"Необработанная ошибка: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Произошла внутренняя ошибка сервера. Попробуйте позже."
+        )
+
+
+@router.get("/{owner}/{repo}/history", response_model=List[RankHistorySchema])
+async def get_rank_history(
+        owner: str,
+        repo: str,
+        start_date: str,
+        end_date: str,
+        db_pool: Pool = Depends(get_db_pool),
+):
+    """
+    Получение истории позиции в топе, звёзд и форков репозитория за указанный период.
+
+    :param owner: Владелец репозитория.
+    :param repo: Название репозитория.
+    :param start_date: Начальная дата интервала (в формате YYYY-MM-DD).
+    :param end_date: Конечная дата интервала (в формате YYYY-MM-DD).
+    :param db_pool: Пул соединений с базой данных.
+    :return: Список снимков истории в порядке времени.
+    """
+    try:
+        history = await fetch_rank_history(
+            db_pool, f"{owner}/{repo}", parse_date(start_date), parse_date(end_date)
+        )
+
+        if not history:
+            logger.warning(f"История репозитория {owner}/{repo} за указанный период не найдена.")
             raise HTTPException(
                 status_code=404,
-                detail="Репозитории не найдены."
+                detail="История репозитория за указанный период не найдена."
             )
 
-        return [RepoSchema(**repo) for repo in repos]
+        return [RankHistorySchema(**item) for item in history]
+
+    except ValueError as e:
+        logger.error(f"Некорректный формат даты: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail="Ошибка при обработке вашего запроса. Проверьте формат дат."
+        )
+    except PostgresError as db_err:
+        logger.error(f"Ошибка базы данных: {db_err}")
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка соединения с базой данных. Попробуйте позже."
+        )
+    except HTTPException as http_err:
+        logger.warning(f"Обработка HTTP-ошибки: {http_err.detail}")
+        raise http_err
+    except Exception as e:
+        logger.error(f"Необработанная ошибка: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Произошла внутренняя ошибка сервера. Попробуйте позже."
+        )
+
+
+@router.get("", response_model=RepoPageSchema)
+async def list_repositories(
+        request: Request,
+        params: RepoPageQueryParams = Depends(),
+        db_pool: Pool = Depends(get_db_pool),
+):
+    """
+    Постраничное получение репозиториев из базы данных с keyset-пагинацией.
+
+    Курсор next_cursor из ответа передаётся в следующий запрос с той же сортировкой;
+    на последней странице он равен null.
+
+    :param request: Объект запроса для проверки всех параметров и заголовка If-None-Match.
+    :param params: Валидированные параметры запроса (sort_by, order, limit, cursor).
+    :param db_pool: Пул соединений с базой данных.
+    :return: Страница репозиториев и курсор следующей страницы.
+    """
+    try:
+        valid_params = {"sort_by", "order", "limit", "cursor"}
+        unknown_params = set(request.query_params.keys()) - valid_params
+
+        if unknown_params:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неизвестные параметры запроса: {', '.join(unknown_params)}"
+            )
+
+        after = decode_cursor(params.cursor, params.sort_by, params.order) if params.cursor else None
+
+        version = await fetch_data_version(db_pool, "top100")
+        etag = make_etag("repos", version, params.sort_by, params.order, params.limit, params.cursor)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        rows = await fetch_repositories_page(db_pool, params.sort_by, params.order, params.limit + 1, after)
+        next_cursor: Optional[str] = None
+        if len(rows) > params.limit:
+            rows = rows[:params.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(params.sort_by, params.order, last["sort_value"], last["repo"])
+
+        page = RepoPageSchema(items=[RepoSchema(**row) for row in rows], next_cursor=next_cursor)
+        return Response(content=page.model_dump_json(), media_type="application/json", headers=cache_headers(etag))
 
     except PostgresError as db_err:
         logger.error(f"Ошибка базы данных: {db_err}")
@@ -1,6 +1,10 @@
+from typing import Optional
 from fastapi import HTTPException
 from pydantic import BaseModel, Field, field_validator
 
+MAX_TOP_N = 10000
+MAX_PAGE_SIZE = 1000
+
 
 class Top100QueryParams(BaseModel):
     sort_by: str = Field(
@@ -35,3 +39,37 @@ class Top100QueryParams(BaseModel):
             )
             raise HTTPException(status_code=422, detail=message)
         return value
+
+
+class TopQueryParams(Top100QueryParams):
+    n: int = Field(
+        100,
+        description=f"Количество репозиториев (от 1 до {MAX_TOP_N})",
+        example=1000
+    )
+
+    @field_validator("n")
+    def validate_n(cls, value):
+        if not 1 <= value <= MAX_TOP_N:
+            message = f"Недопустимое количество репозиториев: {value}. Допустимый диапазон: 1–{MAX_TOP_N}"
+            raise HTTPException(status_code=422, detail=message)
+        return value
+
+
+class RepoPageQueryParams(Top100QueryParams):
+    limit: int = Field(
+        100,
+        description=f"Количество репозиториев на странице (от 1 до {MAX_PAGE_SIZE})",
+        example=100
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="Курсор следующей страницы из ответа на предыдущий запрос",
+    )
+
+    @field_validator("limit")
+    def validate_limit(cls, value):
+        if not 1 <= value <= MAX_PAGE_SIZE:
+            message = f"Недопустимый размер страницы: {value}. Допустимый диапазон: 1–{MAX_PAGE_SIZE}"
+            raise HTTPException(status_code=422, detail=message)
+        return value
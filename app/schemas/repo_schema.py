@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from datetime import datetime
 
 
 class RepoSchema(BaseModel):
@@ -12,3 +13,14 @@ class RepoSchema(BaseModel):
     forks: int
     open_issues: int
     language: Optional[str]
+
+
+class RepoPageSchema(BaseModel):
+    items: List[RepoSchema]
+    next_cursor: Optional[str]
+
+class RankHistorySchema(BaseModel):
+    captured_at: datetime
+    position: int
+    stars: int
+    forks: int
@@ -0,0 +1,116 @@
+"""
+Микробенчмарк разбора страниц коммитов: полный response.json() + strptime против
+проекционного разбора (ijson, только commit.author) + среза даты.
+
+Запуск:
+
+    python benchmarks/commit_decoding.py [коммитов на странице] [страниц]
+
+Для каждого пути выводится процессорное время и пиковое потребление памяти (tracemalloc).
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cloud_function"))
+
+from commit_decoder import decode_commit_page_bytes, ijson  # noqa: E402
+from github_parser import aggregate_commits  # noqa: E402
+
+START = date(2024, 1, 1)
+DAYS = 30
+
+
+def make_commit(i: int) -> dict:
+    """
+    Коммит в форме ответа GET /repos/{owner}/{repo}/commits со всеми вложенными полями.
+    """
+    sha = f"{i:040x}"
+    author = {
+        "name": f"Author {i % 97}",
+        "email": f"author{i % 97}@example.com",
+        "date": (datetime(2024, 1, 1) + timedelta(minutes=i * 7 % (DAYS * 1440))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    user = {
+        "login": f"author{i % 97}",
+        "id": i % 97,
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{i % 97}?v=4",
+        "url": f"https://api.github.com/users/author{i % 97}",
+        "html_url": f"https://github.com/author{i % 97}",
+        "type": "User",
+        "site_admin": False,
+    }
+    return {
+        "sha": sha,
+        "node_id": f"C_{sha}",
+        "commit": {
+            "author": author,
+            "committer": dict(author),
+            "message": f"Commit message number {i}\n\nWith a longer body describing the change in detail.",
+            "tree": {"sha": sha[::-1], "url": f"https://api.github.com/repos/o/r/git/trees/{sha[::-1]}"},
+            "url": f"https://api.github.com/repos/o/r/git/commits/{sha}",
+            "comment_count": 0,
+            "verification": {"verified": False, "reason": "unsigned", "signature": None, "payload": None},
+        },
+        "url": f"https://api.github.com/repos/o/r/commits/{sha}",
+        "html_url": f"https://github.com/o/r/commit/{sha}",
+        "comments_url": f"https://api.github.com/repos/o/r/commits/{sha}/comments",
+        "author": user,
+        "committer": user,
+        "parents": [{"sha": f"{i - 1:040x}", "url": "https://api.github.com/repos/o/r/commits/parent"}],
+    }
+
+
+def baseline(body: bytes) -> dict:
+    """
+    Прежний путь: полный разбор JSON и strptime для каждого коммита.
+    """
+    activity = {}
+    for commit in json.loads(body):
+        commit_date = datetime.strptime(commit["commit"]["author"]["date"], "%Y-%m-%dT%H:%M:%SZ").date()
+        date_str = commit_date.strftime("%Y-%m-%d")
+        bucket = activity.setdefault(date_str, {"commits": 0, "authors": set()})
+        bucket["commits"] += 1
+        bucket["authors"].add(commit["commit"]["author"]["name"])
+    return activity
+
+
+def projected(body: bytes) -> dict:
+    """
+    Новый путь: проекционный разбор и агрегация со срезом даты.
+    """
+    activity = {}
+    aggregate_commits(decode_commit_page_bytes(body), activity, START, START + timedelta(days=DAYS), "o/r")
+    return activity
+
+
+def measure(func, pages) -> tuple:
+    tracemalloc.start()
+    started = time.process_time()
+    for body in pages:
+        func(body)
+    elapsed = time.process_time() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(per_page: int, pages_count: int) -> None:
+    pages = [
+        json.dumps([make_commit(page * per_page + i) for i in range(per_page)]).encode()
+        for page in range(pages_count)
+    ]
+    total_mb = sum(len(body) for body in pages) / 1024 / 1024
+    print(f"{pages_count} страниц по {per_page} коммитов, {total_mb:.1f} МиБ JSON, ijson: {ijson is not None}")
+
+    for name, func in (("json + strptime", baseline), ("проекция + срез", projected)):
+        elapsed, peak = measure(func, pages)
+        print(f"{name:>18}: CPU {elapsed:.3f} с, пик памяти {peak / 1024 / 1024:.2f} МиБ")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else 100, args[1] if len(args) > 1 else 200)
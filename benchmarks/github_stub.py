@@ -0,0 +1,358 @@
+"""
+Локальная замена GitHub API для тестов и бенчмарков парсера.
+
+Отдаёт детерминированные синтетические репозитории и коммиты через те же эндпоинты,
+которыми пользуется парсер:
+
+    GET  /search/repositories           (q=stars:>N или stars:A..B, sort=stars, page, per_page)
+    GET  /repos/{owner}/{repo}/commits  (since, until, page, per_page; заголовки Link и ETag)
+    POST /graphql                       (пакетные запросы history, которые строит graphql_fetcher)
+    GET  /repos/{owner}/{repo}/stats/commit_activity  (первые ответы 202, пока статистика «считается»)
+    GET  /__stats                       (счётчики запросов для бенчмарка)
+
+Задержка ответов, доля ошибок 5xx, доля ответов об ограничении (403 + Retry-After)
+и бюджет X-RateLimit-* (отдельный для каждого токена) задаются параметрами.
+
+Запуск:
+
+    python benchmarks/github_stub.py --repos 1000 --commits-per-day 50 --latency-ms 20 --port 8081
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+SEARCH_RESULT_LIMIT = 1000
+
+
+class StubSettings:
+    def __init__(
+        self,
+        repos: int = 100,
+        commits_per_day: int = 20,
+        authors: int = 50,
+        latency_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        rate_limit: int = 0,
+        rate_limit_window: float = 60,
+        stats_pending_polls: int = 1,
+        seed: int = 1,
+    ):
+        self.repos = repos
+        self.commits_per_day = commits_per_day
+        self.authors = authors
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.stats_pending_polls = stats_pending_polls
+        self.seed = seed
+
+
+class GitHubStub:
+    """
+    Состояние замены GitHub API: синтетические данные, внедрение ошибок и счётчики.
+    """
+
+    def __init__(self, settings: StubSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.stars = [max(2, int(500_000 / (rank + 1) ** 0.9)) for rank in range(settings.repos)]
+        self.stats = {
+            "requests": 0, "commits_served": 0, "errors": 0, "throttled": 0, "not_modified": 0, "stats_pending": 0,
+        }
+        self.budgets: Dict[str, List[float]] = {}
+        self.stats_polls: Dict[int, int] = {}
+
+    def repo(self, rank: int) -> Dict[str, Any]:
+        return {
+            "full_name": f"owner{rank}/repo{rank}",
+            "owner": {"login": f"owner{rank}"},
+            "stargazers_count": self.stars[rank],
+            "watchers_count": self.stars[rank],
+            "forks_count": self.stars[rank] // 10,
+            "open_issues_count": rank % 500,
+            "language": ("Python", "Go", "Rust", "TypeScript", None)[rank % 5],
+        }
+
+    def commits_for_day(self, rank: int, day: datetime) -> List[Tuple[str, str]]:
+        """
+        Коммиты репозитория за день: список (дата ISO ...Z, имя автора), детерминированно по rank и дню.
+        """
+        rnd = random.Random(f"{self.settings.seed}:{rank}:{day.date()}")
+        hot = max(1, self.settings.commits_per_day // (1 + rank // 10))
+        count = rnd.randint(0, hot * 2)
+        result = []
+        for _ in range(count):
+            moment = day + timedelta(seconds=rnd.randrange(86400))
+            result.append((moment.strftime("%Y-%m-%dT%H:%M:%SZ"), f"Author {rnd.randrange(self.settings.authors)}"))
+        return result
+
+    def commits_between(self, rank: int, since: datetime, until: datetime) -> List[Tuple[str, str]]:
+        commits = []
+        day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day <= until:
+            for committed_at, author in self.commits_for_day(rank, day):
+                moment = datetime.strptime(committed_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+                if since <= moment <= until:
+                    commits.append((committed_at, author))
+            day += timedelta(days=1)
+        commits.sort(reverse=True)
+        return commits
+
+    def budget(self, request: web.Request) -> List[float]:
+        """
+        Бюджет запросов токена из заголовка Authorization: [остаток, время сброса].
+        """
+        budget = self.budgets.setdefault(request.headers.get("Authorization", ""), [0, 0.0])
+        if time.time() >= budget[1]:
+            budget[0] = self.settings.rate_limit
+            budget[1] = time.time() + self.settings.rate_limit_window
+        return budget
+
+    def rate_limit_headers(self, request: web.Request) -> Dict[str, str]:
+        if not self.settings.rate_limit:
+            return {}
+        remaining, reset_at = self.budget(request)
+        return {
+            "X-RateLimit-Limit": str(self.settings.rate_limit),
+            "X-RateLimit-Remaining": str(max(0, remaining)),
+            "X-RateLimit-Reset": str(int(reset_at)),
+        }
+
+    async def before_request(self, request: web.Request) -> Optional[web.Response]:
+        """
+        Общая обработка запроса: задержка, учёт бюджета токена, внедрение ошибок и ограничений.
+
+        :return: Ответ с ошибкой, если запрос нужно отклонить, иначе None.
+        """
+        self.stats["requests"] += 1
+        if self.settings.latency_ms:
+            await asyncio.sleep(self.settings.latency_ms / 1000)
+
+        if self.settings.rate_limit:
+            budget = self.budget(request)
+            if budget[0] <= 0:
+                self.stats["throttled"] += 1
+                return web.json_response(
+                    {"message": "API rate limit exceeded"}, status=403, headers=self.rate_limit_headers(request)
+                )
+            budget[0] -= 1
+
+        if self.settings.throttle_rate and self.random.random() < self.settings.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.json_response(
+                {"message": "You have exceeded a secondary rate limit"}, status=403, headers={"Retry-After": "1"}
+            )
+        if self.settings.error_rate and self.random.random() < self.settings.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"message": "Server Error"}, status=502)
+        return None
+
+    async def search(self, request: web.Request) -> web.Response:
+        rejected = await self.before_request(request)
+        if rejected:
+            return rejected
+
+        query = request.query.get("q", "")
+        page = int(request.query.get("page", 1))
+        per_page = int(request.query.get("per_page", 30))
+
+        low, high = 0, float("inf")
+        match = re.search(r"stars:(\d+)\.\.(\d+)", query)
+        if match:
+            low, high = int(match.group(1)), int(match.group(2))
+        else:
+            match = re.search(r"stars:>(\d+)", query)
+            if match:
+                low = int(match.group(1)) + 1
+
+        ranks = [rank for rank, stars in enumerate(self.stars) if low <= stars <= high]
+        if (page - 1) * per_page >= SEARCH_RESULT_LIMIT:
+            return web.json_response(
+                {"message": "Only the first 1000 search results are available"}, status=422
+            )
+
+        items = [self.repo(rank) for rank in ranks[(page - 1) * per_page:page * per_page]]
+        return web.json_response(
+            {"total_count": len(ranks), "incomplete_results": False, "items": items},
+            headers=self.rate_limit_headers(request),
+        )
+
+    async def commits(self, request: web.Request) -> web.Response:
+        rejected = await self.before_request(request)
+        if rejected:
+            return rejected
+
+        name = request.match_info["repo"]
+        if not name.startswith("repo") or not name[4:].isdigit() or int(name[4:]) >= self.settings.repos:
+            return web.json_response({"message": "Not Found"}, status=404)
+        rank = int(name[4:])
+
+        now = datetime.now(timezone.utc)
+        since = parse_timestamp(request.query.get("since")) or now - timedelta(days=30)
+        until = parse_timestamp(request.query.get("until")) or now
+        page = int(request.query.get("page", 1))
+        per_page = int(request.query.get("per_page", 30))
+
+        commits = self.commits_between(rank, since, until)
+        last_page = max(1, -(-len(commits) // per_page))
+        chunk = commits[(page - 1) * per_page:page * per_page]
+
+        etag = '"' + hashlib.md5(f"{rank}:{since}:{until}:{page}:{per_page}".encode()).hexdigest() + '"'
+        headers = {"ETag": etag, **self.rate_limit_headers(request)}
+        if page < last_page:
+            base = request.url.with_query({**request.query, "per_page": per_page})
+            headers["Link"] = (
+                f'<{base.update_query(page=page + 1)}>; rel="next", '
+                f'<{base.update_query(page=last_page)}>; rel="last"'
+            )
+        if request.headers.get("If-None-Match") == etag:
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers=headers)
+
+        self.stats["commits_served"] += len(chunk)
+        payload = [
+            {
+                "sha": hashlib.sha1(f"{rank}:{committed_at}:{author}".encode()).hexdigest(),
+                "commit": {
+                    "author": {"name": author, "email": "author@example.com", "date": committed_at},
+                    "committer": {"name": author, "email": "author@example.com", "date": committed_at},
+                    "message": "Synthetic commit",
+                    "tree": {"sha": "0" * 40, "url": "http://localhost/tree"},
+                    "verification": {"verified": False, "reason": "unsigned", "signature": None, "payload": None},
+                },
+                "parents": [],
+            }
+            for committed_at, author in chunk
+        ]
+        return web.json_response(payload, headers=headers)
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        rejected = await self.before_request(request)
+        if rejected:
+            return rejected
+
+        body = await request.json()
+        variables = body.get("variables") or {}
+        until = parse_timestamp(variables.get("until")) or datetime.now(timezone.utc)
+        data = {}
+        for key in variables:
+            if not key.endswith("_owner"):
+                continue
+            alias = key[:-len("_owner")]
+            name = variables[f"{alias}_name"]
+            if not name.startswith("repo") or not name[4:].isdigit() or int(name[4:]) >= self.settings.repos:
+                data[alias] = None
+                continue
+
+            since = parse_timestamp(variables.get(f"{alias}_since")) or until - timedelta(days=30)
+            offset = int(variables.get(f"{alias}_cursor") or 0)
+            commits = self.commits_between(int(name[4:]), since, until)
+            chunk = commits[offset:offset + 100]
+            self.stats["commits_served"] += len(chunk)
+            data[alias] = {
+                "defaultBranchRef": {
+                    "target": {
+                        "history": {
+                            "pageInfo": {
+                                "hasNextPage": offset + 100 < len(commits),
+                                "endCursor": str(offset + 100),
+                            },
+                            "nodes": [
+                                {"author": {"name": author, "date": committed_at.replace("Z", "+00:00")}}
+                                for committed_at, author in chunk
+                            ],
+                        }
+                    }
+                }
+            }
+        return web.json_response({"data": data}, headers=self.rate_limit_headers(request))
+
+    async def commit_activity(self, request: web.Request) -> web.Response:
+        rejected = await self.before_request(request)
+        if rejected:
+            return rejected
+
+        name = request.match_info["repo"]
+        if not name.startswith("repo") or not name[4:].isdigit() or int(name[4:]) >= self.settings.repos:
+            return web.json_response({"message": "Not Found"}, status=404)
+        rank = int(name[4:])
+
+        polls = self.stats_polls[rank] = self.stats_polls.get(rank, 0) + 1
+        if polls <= self.settings.stats_pending_polls:
+            self.stats["stats_pending"] += 1
+            return web.json_response({}, status=202, headers=self.rate_limit_headers(request))
+
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = today - timedelta(days=(today.weekday() + 1) % 7 + 51 * 7)
+        weeks = []
+        for _ in range(52):
+            days = [len(self.commits_for_day(rank, week_start + timedelta(days=offset))) for offset in range(7)]
+            weeks.append({"days": days, "total": sum(days), "week": int(week_start.timestamp())})
+            week_start += timedelta(days=7)
+        return web.json_response(weeks, headers=self.rate_limit_headers(request))
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def create_app(settings: StubSettings) -> web.Application:
+    stub = GitHubStub(settings)
+    app = web.Application()
+    app["stub"] = stub
+    app.router.add_get("/search/repositories", stub.search)
+    app.router.add_get("/repos/{owner}/{repo}/commits", stub.commits)
+    app.router.add_post("/graphql", stub.graphql)
+    app.router.add_get("/repos/{owner}/{repo}/stats/commit_activity", stub.commit_activity)
+    app.router.add_get("/__stats", stub.stats_handler)
+    return app
+
+
+def parse_args(argv=None) -> Tuple[StubSettings, argparse.Namespace]:
+    parser = argparse.ArgumentParser(description="Локальная замена GitHub API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--repos", type=int, default=100)
+    parser.add_argument("--commits-per-day", type=int, default=20)
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--rate-limit-window", type=float, default=60)
+    parser.add_argument("--stats-pending-polls", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    settings = StubSettings(
+        repos=args.repos,
+        commits_per_day=args.commits_per_day,
+        authors=args.authors,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        stats_pending_polls=args.stats_pending_polls,
+        seed=args.seed,
+    )
+    return settings, args
+
+
+if __name__ == "__main__":
+    stub_settings, cli_args = parse_args()
+    web.run_app(create_app(stub_settings), host=cli_args.host, port=cli_args.port)
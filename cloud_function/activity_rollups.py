@@ -0,0 +1,115 @@
+import logging
+from datetime import date
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_GRANULARITIES = ("week", "month")
+
+
+async def ensure_rollup_schema(conn) -> None:
+    """
+    Создаёт таблицу недельных и месячных агрегатов активности activity_rollups.
+    Если агрегатов ещё нет, а активность уже есть, строит их по всей таблице activity.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS activity_rollups (
+            repo TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            period_start DATE NOT NULL,
+            commits INTEGER NOT NULL,
+            author_ids INTEGER[] NOT NULL,
+            PRIMARY KEY (repo, granularity, period_start)
+        );
+    """)
+    if await conn.fetchval(
+        "SELECT NOT EXISTS (SELECT 1 FROM activity_rollups) AND EXISTS (SELECT 1 FROM activity)"
+    ):
+        logger.info("Построение агрегатов активности по всей таблице activity.")
+        async with conn.transaction():
+            await refresh_rollups(conn)
+
+
+async def refresh_rollups(
+    conn, version: Optional[int] = None, retention_start: Optional[date] = None, staging_table: Optional[str] = None
+) -> None:
+    """
+    Пересчитывает агрегаты активности, изменённые публикацией.
+    Вызывается в транзакции публикации после переноса активности в activity.
+
+    Изменённые репозитории — те, чья версия в activity_versions равна версии публикации.
+    Агрегат — сумма коммитов и неповторяющиеся авторы за неделю и за месяц, он строится по activity.
+    При инкрементальном слиянии (передана staging_table) пересчитываются только периоды,
+    начиная с того, что содержит первый загруженный день репозитория; более ранние периоды
+    не изменились. При замене activity агрегаты изменённых репозиториев строятся заново целиком.
+
+    Периоды, начинающиеся раньше retention_start, неполные (их первые дни уже удалены из activity),
+    поэтому они не хранятся. Агрегаты репозиториев, активности которых больше нет в activity, удаляются.
+
+    :param conn: Соединение AsyncPG.
+    :param version: Версия активности публикации (bump_activity_versions); None — пересчитать все репозитории.
+    :param retention_start: Первая дата окна хранения activity; None — не отбрасывать периоды.
+    :param staging_table: Staging-таблица инкрементального слияния.
+    """
+    if version is None:
+        changed = "SELECT DISTINCT repo, NULL::date AS first_day FROM activity WHERE $1::bigint IS NULL"
+    elif staging_table is None:
+        changed = "SELECT repo, NULL::date AS first_day FROM activity_versions WHERE version = $1::bigint"
+    else:
+        changed = f"""
+            SELECT v.repo, s.first_day
+            FROM activity_versions v
+            JOIN (SELECT repo, min(date) AS first_day FROM {staging_table} GROUP BY repo) s USING (repo)
+            WHERE v.version = $1::bigint
+        """
+    await conn.execute(
+        f"""
+        WITH changed AS ({changed})
+        DELETE FROM activity_rollups r
+        USING changed c
+        WHERE r.repo = c.repo
+          AND (c.first_day IS NULL OR r.period_start >= date_trunc(r.granularity, c.first_day)::date);
+        """,
+        version,
+    )
+    await conn.execute(
+        """
+        DELETE FROM activity_rollups r
+        WHERE r.period_start < $1::date
+           OR NOT EXISTS (SELECT 1 FROM activity a WHERE a.repo = r.repo);
+        """,
+        retention_start,
+    )
+    await conn.execute(
+        f"""
+        WITH changed AS ({changed}),
+        days AS (
+            SELECT a.repo, g.granularity, date_trunc(g.granularity, a.date)::date AS period_start,
+                   a.commits, a.author_ids
+            FROM activity a
+            JOIN changed c ON c.repo = a.repo
+            CROSS JOIN unnest($2::text[]) AS g(granularity)
+            WHERE c.first_day IS NULL OR a.date >= date_trunc(g.granularity, c.first_day)::date
+        ),
+        commits AS (
+            SELECT repo, granularity, period_start, sum(commits)::integer AS commits
+            FROM days
+            WHERE $3::date IS NULL OR period_start >= $3::date
+            GROUP BY repo, granularity, period_start
+        ),
+        authors AS (
+            SELECT repo, granularity, period_start, array_agg(DISTINCT author_id ORDER BY author_id) AS author_ids
+            FROM days, unnest(author_ids) AS author_id
+            GROUP BY repo, granularity, period_start
+        )
+        INSERT INTO activity_rollups (repo, granularity, period_start, commits, author_ids)
+        SELECT c.repo, c.granularity, c.period_start, c.commits, COALESCE(a.author_ids, '{{}}')
+        FROM commits c
+        LEFT JOIN authors a USING (repo, granularity, period_start);
+        """,
+        version,
+        list(ROLLUP_GRANULARITIES),
+        retention_start,
+    )
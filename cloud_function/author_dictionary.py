@@ -0,0 +1,114 @@
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_author_schema(conn) -> None:
+    """
+    Создаёт словарь авторов и переводит activity на хранение идентификаторов авторов.
+
+    Если в activity ещё есть столбец authors со списками имён, имена переносятся в словарь,
+    списки заменяются массивами идентификаторов, а столбец удаляется.
+
+    :param conn: Соединение AsyncPG.
+    """
+    async with conn.transaction():
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS authors (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );
+            ALTER TABLE activity ADD COLUMN IF NOT EXISTS author_ids INTEGER[];
+        """)
+        legacy = await conn.fetchval("""
+            SELECT EXISTS (
+                SELECT 1
+                FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'activity' AND column_name = 'authors'
+            )
+        """)
+        if not legacy:
+            return
+
+        logger.info("Перенос имён авторов из activity в словарь authors.")
+        await conn.execute("""
+            LOCK TABLE activity IN ACCESS EXCLUSIVE MODE;
+            INSERT INTO authors (name)
+            SELECT DISTINCT name FROM activity, unnest(authors) AS name
+            ORDER BY name
+            ON CONFLICT (name) DO NOTHING;
+            UPDATE activity
+            SET author_ids = ARRAY(
+                SELECT a.id
+                FROM unnest(activity.authors) WITH ORDINALITY AS u(name, ord)
+                JOIN authors a ON a.name = u.name
+                ORDER BY u.ord
+            );
+            ALTER TABLE activity DROP COLUMN authors;
+            ALTER TABLE activity ALTER COLUMN author_ids SET NOT NULL;
+        """)
+
+
+class AuthorDictionary:
+    """
+    Кэш словаря авторов на время запуска: имя -> идентификатор в таблице authors.
+
+    Неизвестные имена разрешаются пакетно, одним запросом на пакет строк,
+    поэтому каждое имя обращается к базе данных не больше одного раза за запуск.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    async def resolve(self, conn, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Находит или создаёт идентификаторы авторов.
+
+        :param conn: Соединение AsyncPG.
+        :param names: Имена авторов; пустые значения (None) пропускаются.
+        :return: Словарь {имя: идентификатор}, содержащий как минимум все переданные непустые имена.
+        """
+        missing = sorted({name for name in names if name is not None and name not in self.ids})
+        if not missing:
+            return self.ids
+
+        records = await conn.fetch("SELECT id, name FROM authors WHERE name = ANY($1::text[])", missing)
+        self.ids.update((record["name"], record["id"]) for record in records)
+
+        new_names = [name for name in missing if name not in self.ids]
+        if new_names:
+            records = await conn.fetch(
+                """
+                INSERT INTO authors (name)
+                SELECT unnest($1::text[])
+                ON CONFLICT (name) DO NOTHING
+                RETURNING id, name
+                """,
+                new_names,
+            )
+            self.ids.update((record["name"], record["id"]) for record in records)
+
+            raced = [name for name in new_names if name not in self.ids]
+            if raced:
+                records = await conn.fetch("SELECT id, name FROM authors WHERE name = ANY($1::text[])", raced)
+                self.ids.update((record["name"], record["id"]) for record in records)
+
+        return self.ids
+
+    async def encode(
+        self, conn, records: List[Tuple[str, date, int, List[str]]]
+    ) -> List[Tuple[str, date, int, List[int]]]:
+        """
+        Заменяет имена авторов в строках активности их идентификаторами.
+
+        :param conn: Соединение AsyncPG.
+        :param records: Кортежи (repo, date, commits, authors).
+        :return: Кортежи (repo, date, commits, author_ids).
+        """
+        ids = await self.resolve(conn, (name for record in records for name in record[3]))
+        return [
+            (repo, day, commits, [ids[name] for name in authors if name is not None])
+            for repo, day, commits, authors in records
+        ]
@@ -0,0 +1,90 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+COMMIT_FIELDS = {
+    "item.commit.author.date": ("author", "date"),
+    "item.commit.author.name": ("author", "name"),
+    "item.commit.committer.date": ("committer", "date"),
+}
+
+
+def project_commit(commit: Any) -> Dict[str, Any]:
+    """
+    Оставляет от commit дату и имя автора и дату коммитера, в формате, который понимает агрегатор.
+
+    Дата автора определяет день активности, а дата коммитера — водяной знак: по ней
+    GitHub фильтрует коммиты параметром since.
+
+    :param commit: Объект commit из ответа GitHub API.
+    :return: Коммит вида {"commit": {"author": {"date": ..., "name": ...}, "committer": {"date": ...}}}
+        или {}, если автора нет.
+    """
+    if not isinstance(commit, dict) or not isinstance(commit.get("author"), dict):
+        return {}
+    author = commit["author"]
+    projected = {"author": {key: author[key] for key in ("date", "name") if key in author}}
+    committer = commit.get("committer")
+    if isinstance(committer, dict) and committer.get("date"):
+        projected["committer"] = {"date": committer["date"]}
+    return {"commit": projected}
+
+
+class _CommitEvents:
+    """
+    Собирает урезанные коммиты из событий ijson.parse, не создавая полных объектов коммитов.
+    """
+
+    def __init__(self):
+        self.commit: Dict[str, Dict[str, Any]] = {}
+
+    def feed(self, prefix: str, event: str, value: Any) -> Iterator[Dict[str, Any]]:
+        if prefix == "item" and event == "start_map":
+            self.commit = {}
+        elif prefix == "item" and event == "end_map":
+            yield project_commit(self.commit)
+        elif prefix in ("item.commit.author", "item.commit.committer") and event == "start_map":
+            self.commit[prefix.rsplit(".", 1)[1]] = {}
+        elif prefix in COMMIT_FIELDS:
+            section, key = COMMIT_FIELDS[prefix]
+            self.commit.setdefault(section, {})[key] = value
+
+
+def _project_events(events: Iterable[Tuple[str, str, Any]]) -> List[Dict[str, Any]]:
+    collector = _CommitEvents()
+    return [commit for prefix, event, value in events for commit in collector.feed(prefix, event, value)]
+
+
+def decode_commit_page_bytes(body: bytes) -> List[Dict[str, Any]]:
+    """
+    Разбирает страницу коммитов, извлекая только автора и дату коммитера каждого коммита.
+
+    С ijson полные объекты коммитов (tree, verification, ссылки) не создаются вовсе;
+    без него страница разбирается json.loads и урезается после разбора.
+
+    :param body: Тело ответа.
+    :return: Список урезанных коммитов.
+    """
+    if ijson is None:
+        return [project_commit(commit.get("commit")) for commit in json.loads(body)]
+    return _project_events(ijson.parse(body))
+
+
+async def decode_commit_page(response) -> List[Dict[str, Any]]:
+    """
+    Потоково разбирает страницу коммитов прямо из тела ответа AIOHTTP.
+
+    :param response: Ответ AIOHTTP со списком коммитов.
+    :return: Список урезанных коммитов.
+    """
+    if ijson is None:
+        return decode_commit_page_bytes(await response.read())
+    collector = _CommitEvents()
+    commits = []
+    async for prefix, event, value in ijson.parse(response.content):
+        commits.extend(collector.feed(prefix, event, value))
+    return commits
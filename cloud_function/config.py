@@ -9,7 +9,55 @@ class Config:
         self.db_name = os.getenv("POSTGRES_DB")
         self.db_port = os.getenv("POSTGRES_PORT")
         self.activity_days = int(os.getenv("ACTIVITY_DAYS", 30))
+        self.top_n = int(os.getenv("TOP_N", 100))
         self.github_token = os.getenv("GITHUB_TOKEN")
+        self.github_tokens = [
+            token.strip() for token in os.getenv("GITHUB_TOKENS", "").split(",") if token.strip()
+        ] or [self.github_token]
+        self.incremental = os.getenv("INCREMENTAL_MODE", "false").lower() == "true"
+        self.incremental_lookback_days = int(os.getenv("INCREMENTAL_LOOKBACK_DAYS", 1))
+        self.fetch_backend = os.getenv("FETCH_BACKEND", "rest")
+        self.github_api_url = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+        self.github_graphql_url = os.getenv("GITHUB_GRAPHQL_URL", f"{self.github_api_url}/graphql")
+        self.graphql_batch_size = int(os.getenv("GRAPHQL_BATCH_SIZE", 20))
+        self.stats_batch_size = int(os.getenv("STATS_BATCH_SIZE", 20))
+        self.stats_poll_attempts = int(os.getenv("STATS_POLL_ATTEMPTS", 6))
+        self.stats_poll_interval = float(os.getenv("STATS_POLL_INTERVAL", 2))
+        self.stats_poll_max_interval = float(os.getenv("STATS_POLL_MAX_INTERVAL", 30))
+        self.stats_author_days = int(os.getenv("STATS_AUTHOR_DAYS", 0))
+        self.pipeline_workers = int(os.getenv("PIPELINE_WORKERS", 10))
+        self.pipeline_queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", 100))
+        self.pipeline_flush_rows = int(os.getenv("PIPELINE_FLUSH_ROWS", 5000))
+        self.pipeline_flush_seconds = float(os.getenv("PIPELINE_FLUSH_SECONDS", 5))
+        self.run_time_budget = float(os.getenv("RUN_TIME_BUDGET", 0))
+        self.run_max_age_hours = float(os.getenv("RUN_MAX_AGE_HOURS", 24))
+        self.run_max_attempts = int(os.getenv("RUN_MAX_ATTEMPTS", 3))
+        self.lease_seconds = float(os.getenv("LEASE_SECONDS", 300))
+        self.parser_workers = int(os.getenv("PARSER_WORKERS", 1))
+        self.adaptive_refresh = os.getenv("ADAPTIVE_REFRESH", "false").lower() == "true"
+        self.refresh_request_budget = int(os.getenv("REFRESH_REQUEST_BUDGET", 0))
+        self.refresh_target_commits = float(os.getenv("REFRESH_TARGET_COMMITS", 100))
+        self.refresh_min_interval_hours = float(os.getenv("REFRESH_MIN_INTERVAL_HOURS", 1))
+        self.refresh_max_interval_hours = float(os.getenv("REFRESH_MAX_INTERVAL_HOURS", 168))
+        self.refresh_rate_days = int(os.getenv("REFRESH_RATE_DAYS", 7))
+        self.run_report_dir = os.getenv("RUN_REPORT_DIR", "")
+        self.run_report_db = os.getenv("RUN_REPORT_DB", "true").lower() == "true"
+        self.run_profile = os.getenv("RUN_PROFILE", "false").lower() == "true"
+        self.run_profile_top = int(os.getenv("RUN_PROFILE_TOP", 30))
+        self.github_max_concurrency = int(os.getenv("GITHUB_MAX_CONCURRENCY", 10))
+        self.github_requests_per_second = float(os.getenv("GITHUB_REQUESTS_PER_SECOND", 10))
+        self.github_max_retries = int(os.getenv("GITHUB_MAX_RETRIES", 5))
+        self.github_backoff_base = float(os.getenv("GITHUB_BACKOFF_BASE", 1))
+        self.github_backoff_max = float(os.getenv("GITHUB_BACKOFF_MAX", 60))
+        self.http_connection_limit = int(os.getenv("HTTP_CONNECTION_LIMIT", 20))
+        self.http_dns_cache_ttl = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+        self.http_keepalive_timeout = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+        self.http_timeout = float(os.getenv("HTTP_TIMEOUT", 30))
+        self.http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+        self.github_cache_dir = os.getenv("GITHUB_CACHE_DIR", "")
+        self.github_cache_max_bytes = int(os.getenv("GITHUB_CACHE_MAX_BYTES", 50 * 1024 * 1024))
 
-        self.db_url = (f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:"
-                       f"{self.db_port}/{self.db_name}?sslmode=require")
+        self.db_url = os.getenv("DATABASE_URL") or (
+            f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:"
+            f"{self.db_port}/{self.db_name}?sslmode=require"
+        )
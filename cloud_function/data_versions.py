@@ -0,0 +1,99 @@
+import logging
+from datetime import date
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_data_version_schema(conn) -> None:
+    """
+    Создаёт таблицы версий данных, по которым API строит ETag:
+    data_versions — счётчик на таблицу, activity_versions — версия активности каждого репозитория.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS activity_versions (
+            repo TEXT PRIMARY KEY,
+            version BIGINT NOT NULL
+        );
+    """)
+
+
+async def bump_data_version(conn, name: str) -> int:
+    """
+    Увеличивает версию таблицы. Вызывается в транзакции, которая изменяет таблицу.
+
+    :param conn: Соединение AsyncPG.
+    :param name: Имя таблицы.
+    :return: Новая версия.
+    """
+    return await conn.fetchval(
+        """
+        INSERT INTO data_versions (name, version)
+        VALUES ($1, 1)
+        ON CONFLICT (name) DO UPDATE
+        SET version = data_versions.version + 1,
+            updated_at = now()
+        RETURNING version
+        """,
+        name,
+    )
+
+
+async def bump_activity_versions(
+    conn,
+    staging_table: str,
+    repo_names: Optional[List[str]] = None,
+    retention_start: Optional[date] = None,
+    keep_repos: Optional[List[str]] = None,
+) -> int:
+    """
+    Отмечает новой версией активность репозиториев, которую изменит публикация.
+    Вызывается в транзакции публикации до переноса staging-таблицы в activity.
+
+    Версия берётся из общего счётчика activity, поэтому она только растёт
+    и не повторяется даже для репозитория, который выбыл из топа и вернулся.
+
+    :param conn: Соединение AsyncPG.
+    :param staging_table: Имя staging-таблицы с новыми строками.
+    :param repo_names: Репозитории топа при инкрементальном слиянии: активность остальных удаляется
+        вместе с их версиями. None — activity заменяется целиком, и удаляются версии репозиториев,
+        которых нет в staging-таблице.
+    :param retention_start: Первая дата окна хранения при инкрементальном слиянии: репозитории
+        со строками раньше неё тоже изменятся.
+    :param keep_repos: Репозитории, активность которых при замене activity остаётся прежней, вместе с версиями.
+    :return: Новая версия активности.
+    """
+    version = await bump_data_version(conn, "activity")
+    await conn.execute(
+        f"""
+        INSERT INTO activity_versions (repo, version)
+        SELECT repo, $1
+        FROM (
+            SELECT DISTINCT repo FROM {staging_table}
+            UNION
+            SELECT DISTINCT repo FROM activity WHERE $2::date IS NOT NULL AND date < $2::date
+        ) AS changed
+        ON CONFLICT (repo) DO UPDATE
+        SET version = EXCLUDED.version;
+        """,
+        version,
+        retention_start,
+    )
+    if repo_names is None:
+        await conn.execute(
+            f"""
+            DELETE FROM activity_versions
+            WHERE repo NOT IN (SELECT repo FROM {staging_table}) AND NOT (repo = ANY($1::text[]))
+            """,
+            keep_repos or [],
+        )
+    else:
+        await conn.execute("DELETE FROM activity_versions WHERE NOT (repo = ANY($1::text[]))", repo_names)
+    return version
@@ -0,0 +1,175 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from config import Config
+from run_profiler import RunProfiler
+from scheduler import RequestScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_key(url: str) -> str:
+    """
+    Приводит URL запроса к шаблону эндпоинта для статистики,
+    например /repos/{owner}/{repo}/commits.
+    """
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    if len(parts) >= 3 and parts[0] == "repos":
+        parts[1:3] = ["{owner}", "{repo}"]
+    return "/" + "/".join(parts)
+
+
+class GitHubClient:
+    """
+    Клиент GitHub API с одной общей сессией AIOHTTP.
+
+    Владеет настроенным TCPConnector (лимит соединений, кэш DNS, keep-alive),
+    задаёт общие заголовки и сжатие, единые таймауты, а через TraceConfig
+    собирает по каждому эндпоинту число запросов, задержку и объём полученных данных.
+    Замеры фаз вызова парсера накапливаются в profiler.
+    Все запросы проходят через общий планировщик RequestScheduler, который подставляет
+    заголовок авторизации токена из пула.
+    """
+
+    def __init__(self, config: Config, scheduler: Optional[RequestScheduler] = None):
+        self.config = config
+        self.scheduler = scheduler or RequestScheduler(config)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.endpoint_stats: Dict[str, Dict[str, float]] = {}
+        self.profiler = RunProfiler()
+
+    async def __aenter__(self) -> "GitHubClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """
+        Создаёт сессию с настроенным пулом соединений и хуками сбора статистики.
+        """
+        if self.session is not None:
+            return
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_response_chunk_received.append(self._on_response_chunk_received)
+        trace_config.on_request_end.append(self._on_request_end)
+
+        connector = aiohttp.TCPConnector(
+            limit=max(
+                self.config.http_connection_limit,
+                self.config.github_max_concurrency * len(self.scheduler.tokens),
+            ),
+            ttl_dns_cache=self.config.http_dns_cache_ttl,
+            keepalive_timeout=self.config.http_keepalive_timeout,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=self.config.http_timeout, connect=self.config.http_connect_timeout
+            ),
+            headers={
+                "Accept": "application/vnd.github+json",
+                "Accept-Encoding": "gzip",
+            },
+            trace_configs=[trace_config],
+        )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _stats(self, url) -> Dict[str, float]:
+        key = endpoint_key(str(url))
+        if key not in self.endpoint_stats:
+            self.endpoint_stats[key] = {"requests": 0, "latency": 0.0, "bytes": 0}
+        return self.endpoint_stats[key]
+
+    async def _on_request_start(self, session, context, params) -> None:
+        context.started_at = time.monotonic()
+
+    async def _on_response_chunk_received(self, session, context, params) -> None:
+        self._stats(params.url)["bytes"] += len(params.chunk)
+
+    async def _on_request_end(self, session, context, params) -> None:
+        stats = self._stats(params.url)
+        stats["requests"] += 1
+        stats["latency"] += time.monotonic() - context.started_at
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        label: str = "",
+        compact: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+    ) -> Tuple[Any, Dict[str, str]]:
+        """
+        Выполняет GET-запрос через общий планировщик.
+
+        :param url: URL запроса.
+        :param params: Параметры запроса.
+        :param label: Подпись запроса для логирования.
+        :param compact: Функция, оставляющая в ответе только нужные поля.
+        :param decode: Собственный разбор тела ответа вместо response.json().
+        :return: Кортеж (разобранный JSON, заголовки ответа).
+        """
+        await self.open()
+        self.profiler.count_request(label)
+        return await self.scheduler.get_json(
+            self.session, url, params=params, label=label, compact=compact, decode=decode
+        )
+
+    async def post_json(self, url: str, json_body: Dict[str, Any], label: str = "") -> Tuple[Any, Dict[str, str]]:
+        """
+        Выполняет POST-запрос с JSON-телом через общий планировщик.
+
+        :param url: URL запроса.
+        :param json_body: Тело запроса.
+        :param label: Подпись запроса для логирования.
+        :return: Кортеж (разобранный JSON, заголовки ответа).
+        """
+        await self.open()
+        self.profiler.count_request(label)
+        return await self.scheduler.post_json(self.session, url, json_body, label=label)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика клиента для отчёта о вызове: планировщик, кэш ответов и эндпоинты.
+        """
+        scheduler = self.scheduler
+        return {
+            "requests": scheduler.requests,
+            "retries": scheduler.retries,
+            "throttled": scheduler.throttled,
+            "throttle_delay_seconds": round(scheduler.throttle_delay, 3),
+            "cache_not_modified": scheduler.cache.hits if scheduler.cache else 0,
+            "cache_misses": scheduler.cache.misses if scheduler.cache else 0,
+            "endpoints": {
+                key: {
+                    "requests": stats["requests"],
+                    "latency_seconds": round(stats["latency"], 3),
+                    "bytes": stats["bytes"],
+                }
+                for key, stats in sorted(self.endpoint_stats.items())
+            },
+        }
+
+    def log_stats(self) -> None:
+        """
+        Записывает в лог статистику планировщика и по каждому эндпоинту: запросы, среднюю задержку и объём.
+        """
+        self.scheduler.log_stats()
+        for key, stats in sorted(self.endpoint_stats.items()):
+            average = stats["latency"] / stats["requests"] if stats["requests"] else 0.0
+            logger.info(
+                f"Эндпоинт {key}: запросов {stats['requests']}, "
+                f"средняя задержка {average * 1000:.0f} мс, получено {stats['bytes'] / 1024:.1f} КиБ."
+            )
@@ -1,132 +1,585 @@
 import asyncio
-import aiohttp
 import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import aiohttp
 import asyncpg
-from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 from config import Config
+from github_client import GitHubClient
+from graphql_fetcher import fetch_histories
+from pipeline import run_pipeline
+from commit_decoder import decode_commit_page
+from stats_fetcher import daily_commits, fetch_commit_activity
+from activity_rollups import ensure_rollup_schema, refresh_rollups
+from author_dictionary import AuthorDictionary, ensure_author_schema
+from data_versions import bump_activity_versions, bump_data_version, ensure_data_version_schema
+from run_profiler import save_report_to_db, write_report_file
+from refresh_schedule import ensure_refresh_schema, record_refreshes, select_due_repos
+from run_state import (
+    claim_repos,
+    complete_run,
+    create_run,
+    ensure_run_state_schema,
+    extend_leases,
+    fetch_run_progress,
+    fetch_run_watermarks,
+    fetch_unfinished_repos,
+    find_active_run,
+    lock_owned_repos,
+    lock_runs,
+    lock_running_run,
+    mark_repos_done,
+    reconcile_staging,
+    release_repos,
+    unlock_runs,
+)
 from dotenv import load_dotenv
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def get_top_repositories(config: Config) -> List[Dict[str, Any]]:
+SEARCH_PAGE_SIZE = 100
+SEARCH_RESULT_LIMIT = 1000
+
+
+async def search_repositories_page(client: GitHubClient, query: str, page: int) -> Dict[str, Any]:
     """
-    Получает топ-100 репозиториев с GitHub.
+    Загружает одну страницу поиска репозиториев, отсортированных по звёздам.
+
+    :param client: Клиент GitHub API.
+    :param query: Поисковый запрос (например, stars:100..200).
+    :param page: Номер страницы.
+    :return: Ответ с полями total_count и items.
     """
-    url = "https://api.github.com/search/repositories"
-    headers = {"Authorization": f"token {config.github_token}"}
     params = {
-        "q": "stars:>1",
+        "q": query,
         "sort": "stars",
         "order": "desc",
-        "per_page": 100,
+        "per_page": SEARCH_PAGE_SIZE,
+        "page": page,
     }
+    data, _ = await client.get_json(
+        f"{client.config.github_api_url}/search/repositories",
+        params=params,
+        label=f"search {query}, страница {page}",
+        compact=compact_repositories,
+    )
+
+    if "items" not in data:
+        raise ValueError("Ответ GitHub API не содержит ключа 'items'.")
+    return data
+
+
+async def search_all_pages(
+    client: GitHubClient,
+    query: str,
+    first_page: Dict[str, Any],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    Догружает остальные страницы поискового запроса параллельно.
+
+    :param first_page: Уже полученная первая страница.
+    :param limit: Сколько результатов нужно (не больше 1000 — ограничение поиска GitHub).
+    :return: Репозитории со всех страниц.
+    """
+    total = min(first_page.get("total_count", len(first_page["items"])), limit, SEARCH_RESULT_LIMIT)
+    last_page = -(-total // SEARCH_PAGE_SIZE)
+    pages = await asyncio.gather(*(
+        search_repositories_page(client, query, page) for page in range(2, last_page + 1)
+    ))
+    return first_page["items"] + [repo for page in pages for repo in page["items"]]
+
+
+async def crawl_star_range(client: GitHubClient, low: int, high: int) -> List[Dict[str, Any]]:
+    """
+    Собирает все репозитории с количеством звёзд в диапазоне [low, high].
+
+    Если диапазон содержит больше 1000 результатов (предел поиска GitHub),
+    он делится пополам, и половины обходятся параллельно.
+
+    :return: Репозитории диапазона.
+    """
+    query = f"stars:{low}..{high}"
+    first_page = await search_repositories_page(client, query, 1)
+    total = first_page.get("total_count", 0)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers, params=params) as response:
-            response.raise_for_status()
-            data = await response.json()
+    if total > SEARCH_RESULT_LIMIT and low < high:
+        middle = (low + high) // 2
+        upper, lower = await asyncio.gather(
+            crawl_star_range(client, middle + 1, high),
+            crawl_star_range(client, low, middle),
+        )
+        return upper + lower
 
-            if "items" not in data:
-                raise ValueError("Ответ GitHub API не содержит ключа 'items'.")
+    if total > SEARCH_RESULT_LIMIT:
+        logger.warning(
+            f"Репозиториев с {low} звёздами {total}, поиск GitHub отдаёт только первые {SEARCH_RESULT_LIMIT}."
+        )
+    return await search_all_pages(client, query, first_page, SEARCH_RESULT_LIMIT)
+
+
+def rank_repositories(repositories: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+    """
+    Убирает дубликаты (репозиторий мог сменить диапазон во время обхода) и ранжирует по звёздам.
+
+    :param repositories: Репозитории из всех запросов.
+    :param top_n: Сколько репозиториев оставить.
+    :return: Топ-N репозиториев по убыванию звёзд.
+    """
+    unique = {}
+    for repo in repositories:
+        current = unique.get(repo["full_name"])
+        if current is None or repo.get("stargazers_count", 0) > current.get("stargazers_count", 0):
+            unique[repo["full_name"]] = repo
+    ranked = sorted(unique.values(), key=lambda repo: (-repo.get("stargazers_count", 0), repo["full_name"]))
+    return ranked[:top_n]
+
+
+async def get_top_repositories(client: GitHubClient) -> List[Dict[str, Any]]:
+    """
+    Получает топ-N репозиториев с GitHub (N задаётся config.top_n).
+
+    До 1000 репозиториев страницы одного запроса загружаются параллельно. Для большего N
+    запрос делится на диапазоны звёзд: диапазоны обходятся сверху вниз (каждый следующий
+    вдвое ниже), пока не наберётся N репозиториев.
+
+    :param client: Клиент GitHub API.
+    """
+    top_n = client.config.top_n
+    query = "stars:>1"
+    first_page = await search_repositories_page(client, query, 1)
+
+    if top_n <= SEARCH_RESULT_LIMIT or not first_page["items"]:
+        repositories = await search_all_pages(client, query, first_page, top_n)
+    else:
+        repositories = list(first_page["items"])
+        high = first_page["items"][0].get("stargazers_count", 0)
+        while len(rank_repositories(repositories, top_n)) < top_n and high > 1:
+            low = max(2, high // 2)
+            logger.info(f"Обход диапазона звёзд {low}..{high}.")
+            repositories += await crawl_star_range(client, low, high)
+            high = low - 1
+
+    logger.info("Получены репозитории с GitHub")
+    return rank_repositories(repositories, top_n)
+
+
+COMMITS_PER_PAGE = 100
+REPOSITORY_FIELDS = (
+    "full_name", "stargazers_count", "watchers_count", "forks_count", "open_issues_count", "language",
+)
+
+
+def compact_repositories(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Оставляет в ответе поиска только поля, которые сохраняются в таблицу top100.
 
-            logger.info("Получены репозитории с GitHub")
-            return data["items"]
+    :param data: Ответ GitHub API на запрос search/repositories.
+    :return: Ответ с урезанным списком items.
+    """
+    if "items" not in data:
+        return data
+
+    compacted = {key: data[key] for key in ("total_count", "incomplete_results") if key in data}
+    items = []
+    for repo in data["items"]:
+        item = {field: repo[field] for field in REPOSITORY_FIELDS if field in repo}
+        if "owner" in repo:
+            item["owner"] = {"login": repo["owner"].get("login")}
+        items.append(item)
+    compacted["items"] = items
+    return compacted
+
+
+def parse_link_header(link_header: Optional[str]) -> Dict[str, str]:
+    """
+    Разбирает заголовок Link ответа GitHub API.
+
+    :param link_header: Значение заголовка Link (может отсутствовать).
+    :return: Словарь вида {rel: url}, например {"next": ..., "last": ...}.
+    """
+    links = {}
+    if not link_header:
+        return links
+
+    for part in link_header.split(","):
+        url_part, _, params_part = part.partition(";")
+        url = url_part.strip().lstrip("<").rstrip(">")
+        for param in params_part.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "rel":
+                links[value.strip('"')] = url
+    return links
+
+
+def get_page_number(url: Optional[str]) -> int:
+    """
+    Извлекает номер страницы из ссылки пагинации GitHub API.
+
+    :param url: Ссылка на страницу (из заголовка Link).
+    :return: Номер страницы или 1, если параметр page отсутствует.
+    """
+    if not url:
+        return 1
+    page = parse_qs(urlparse(url).query).get("page")
+    return int(page[0]) if page else 1
+
+
+def aggregate_commits(
+    commits: List[Dict[str, Any]],
+    activity: Dict[str, Dict[str, Any]],
+    start_date: date,
+    end_date: date,
+    repo_full_name: str,
+) -> None:
+    """
+    Добавляет коммиты одной страницы в посуточные корзины активности.
+
+    Даты GitHub приходят в фиксированном формате YYYY-MM-DDTHH:MM:SSZ (UTC), поэтому
+    день берётся срезом строки, а сравнение с границами интервала идёт по строкам ISO.
+    День коммита определяется датой автора, а last_commit_at — датой коммитера (если она есть):
+    по ней GitHub фильтрует коммиты параметром since, поэтому водяной знак по дате автора
+    пропустил бы коммиты, отправленные или перебазированные позже, но с более старой датой автора.
+
+    :param commits: Список коммитов из ответа GitHub API.
+    :param activity: Накопитель вида {YYYY-MM-DD: {"commits": int, "authors": set, "last_commit_at": str}}.
+    :param start_date: Начальная дата интервала.
+    :param end_date: Конечная дата интервала.
+    :param repo_full_name: Полное имя репозитория (owner/repo) для логирования.
+    """
+    start_str = start_date.isoformat()
+    end_str = end_date.isoformat()
+
+    for commit in commits:
+        try:
+            committed_at = commit["commit"]["author"]["date"]
+            date_str = committed_at[:10]
+            if len(committed_at) < 10 or committed_at[4] != "-" or committed_at[7] != "-":
+                logger.error(f"Некорректная дата коммита {committed_at!r} для {repo_full_name}.")
+                continue
+
+            if not (start_str <= date_str <= end_str):
+                logger.warning(
+                    f"Пропуск коммита с датой {date_str} для {repo_full_name}, "
+                    f"так как он не входит в заданный интервал."
+                )
+                continue
+
+            author = commit["commit"]["author"]["name"]
+            committed_at = (commit["commit"].get("committer") or {}).get("date") or committed_at
+            bucket = activity.get(date_str)
+            if bucket is None:
+                bucket = activity[date_str] = {"commits": 0, "authors": set(), "last_commit_at": ""}
+            bucket["commits"] += 1
+            bucket["authors"].add(author)
+            if committed_at > bucket["last_commit_at"]:
+                bucket["last_commit_at"] = committed_at
+        except KeyError as e:
+            logger.error(f"Ошибка в данных коммита: {commit}. Отсутствует ключ: {e}")
+            continue
+        except TypeError:
+            logger.error(f"Ошибка в данных коммита: {commit}. Некорректный тип поля.")
+            continue
+
+
+class CommitFetchError(Exception):
+    """
+    Исключение, возникающее, когда страницу коммитов репозитория не удалось получить после всех повторов.
+    """
+
+
+async def fetch_commits_page(
+    client: GitHubClient,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    repo_full_name: str,
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Загружает одну страницу коммитов через клиент GitHub API.
+
+    Ответ 409 GitHub возвращает для пустого репозитория, он считается страницей без коммитов.
+
+    :param client: Клиент GitHub API.
+    :param url: URL страницы.
+    :param params: Параметры запроса (None, если они уже входят в URL).
+    :param repo_full_name: Полное имя репозитория (owner/repo) для логирования.
+    :return: Кортеж (коммиты, ссылки из заголовка Link).
+    :raises CommitFetchError: Если страницу не удалось получить после всех повторов.
+    """
+    try:
+        with client.profiler.phase("pagination"):
+            commits, response_headers = await client.get_json(
+                url, params=params, label=repo_full_name, decode=decode_commit_page
+            )
+        return commits, parse_link_header(response_headers.get("Link"))
+    except aiohttp.ClientResponseError as e:
+        if e.status == 409:
+            logger.warning(f"Репозиторий {repo_full_name} пуст.")
+            return [], {}
+        logger.error(f"Не удалось загрузить страницу коммитов для {repo_full_name}: {e}")
+        raise CommitFetchError(f"Не удалось загрузить коммиты {repo_full_name}: {e}") from e
+    except Exception as e:
+        logger.error(f"Не удалось загрузить страницу коммитов для {repo_full_name}: {e}")
+        raise CommitFetchError(f"Не удалось загрузить коммиты {repo_full_name}: {e}") from e
 
 
 async def fetch_activity_for_repo(
-    session: aiohttp.ClientSession, repo_full_name: str, interval_days: int, config: Config
+    client: GitHubClient,
+    repo_full_name: str,
+    interval_days: int,
+    since: Optional[date] = None,
 ) -> List[Dict[str, Any]]:
     """
     Получает информацию об активности репозитория через API GitHub.
 
-    :param config: Конфигурация приложения.
-    :param session: Сессия AIOHTTP.
+    Первая страница коммитов загружается отдельно: из её заголовка Link становится
+    известен номер последней страницы, после чего остальные страницы запрашиваются
+    параллельно и агрегируются по мере поступления. Если не удалось получить хотя бы одну
+    страницу, остальные запросы отменяются и репозиторий считается незагруженным целиком:
+    неполная активность занизила бы коммиты и авторов, а в инкрементальном режиме
+    водяной знак прошёл бы мимо пропущенных коммитов.
+
+    :param client: Клиент GitHub API.
     :param repo_full_name: Полное имя репозитория (owner/repo).
     :param interval_days: Количество дней для получения активности.
-    :return: Список записей активности.
+    :param since: Дата, начиная с которой нужно загрузить коммиты (в инкрементальном режиме);
+        не может быть раньше начала интервала.
+    :return: Список записей активности. Каждая запись содержит также last_commit_at —
+        время последнего коммита за этот день. Пустой список — GitHub вернул пустую страницу.
+    :raises CommitFetchError: Если страницу коммитов не удалось получить после всех повторов.
     """
-    url = f"https://api.github.com/repos/{repo_full_name}/commits"
-    headers = {"Authorization": f"token {config.github_token}"}
+    url = f"{client.config.github_api_url}/repos/{repo_full_name}/commits"
 
     end_date = datetime.now(timezone.utc).date()
     start_date = end_date - timedelta(days=interval_days)
+    if since is not None and since > start_date:
+        start_date = min(since, end_date)
 
+    # until не передаётся: по умолчанию это текущий момент, а меняющаяся каждый день граница
+    # делала бы ключ кэша ответов уникальным, и условные запросы никогда не получали бы 304.
     params = {
         "since": start_date.isoformat() + "T00:00:00Z",
-        "until": end_date.isoformat() + "T23:59:59Z",
+        "per_page": COMMITS_PER_PAGE,
     }
 
-    retries = 3
     logger.info(
         f"Начало обработки репозитория {repo_full_name}: "
         f"интервал с {start_date.isoformat()} по {end_date.isoformat()}."
     )
 
-    while retries > 0:
+    commits, links = await fetch_commits_page(client, url, params, repo_full_name)
+    if not commits:
+        logger.warning(
+            f"Репозиторий {repo_full_name} не содержит коммитов за последние {interval_days} дней."
+        )
+        return []
+
+    activity = {}
+    with client.profiler.phase("aggregation"):
+        aggregate_commits(commits, activity, start_date, end_date, repo_full_name)
+    total_commits = len(commits)
+
+    last_page = get_page_number(links.get("last"))
+    if last_page > 1:
+        logger.info(f"Репозиторий {repo_full_name}: {last_page} страниц коммитов, загрузка остальных параллельно.")
+        pages = [
+            asyncio.create_task(fetch_commits_page(client, url, {**params, "page": page}, repo_full_name))
+            for page in range(2, last_page + 1)
+        ]
         try:
-            async with session.get(url, headers=headers, params=params, timeout=10) as response:
-                logger.info(f"Выполняется запрос к API для {repo_full_name}. URL: {response.url}")
-                response.raise_for_status()
-                commits = await response.json()
+            for page_task in asyncio.as_completed(pages):
+                page_result = await page_task
+                with client.profiler.phase("aggregation"):
+                    aggregate_commits(page_result[0], activity, start_date, end_date, repo_full_name)
+                total_commits += len(page_result[0])
+        except BaseException:
+            for page in pages:
+                page.cancel()
+            await asyncio.gather(*pages, return_exceptions=True)
+            raise
+    else:
+        next_url = links.get("next")
+        while next_url:
+            page_result = await fetch_commits_page(client, next_url, None, repo_full_name)
+            with client.profiler.phase("aggregation"):
+                aggregate_commits(page_result[0], activity, start_date, end_date, repo_full_name)
+            total_commits += len(page_result[0])
+            next_url = page_result[1].get("next")
 
-                if not commits:
-                    logger.warning(
-                        f"Репозиторий {repo_full_name} не содержит коммитов за последние {interval_days} дней."
-                    )
-                    return []
-
-                logger.info(f"Получено {len(commits)} коммитов для репозитория {repo_full_name}.")
-
-                activity = {}
-                for commit in commits:
-                    try:
-                        commit_date = datetime.strptime(
-                            commit["commit"]["author"]["date"], "%Y-%m-%dT%H:%M:%SZ"
-                        ).date()
-
-                        if not (start_date <= commit_date <= end_date):
-                            logger.warning(
-                                f"Пропуск коммита с датой {commit_date} для {repo_full_name}, "
-                                f"так как он не входит в заданный интервал."
-                            )
-                            continue
-
-                        date_str = commit_date.strftime("%Y-%m-%d")
-                        author = commit["commit"]["author"]["name"]
-                        if date_str not in activity:
-                            activity[date_str] = {"commits": 0, "authors": set()}
-                        activity[date_str]["commits"] += 1
-                        activity[date_str]["authors"].add(author)
-                    except KeyError as e:
-                        logger.error(f"Ошибка в данных коммита: {commit}. Отсутствует ключ: {e}")
-                        continue
-
-                return [
-                    {"date": date, "commits": data["commits"], "authors": list(data["authors"])}
-                    for date, data in activity.items()
-                ]
-        except aiohttp.ClientError as e:
-            retries -= 1
-            logger.warning(f"Ошибка соединения для {repo_full_name}: {e}. Осталось попыток: {retries}.")
-            await asyncio.sleep(5)
-        except asyncio.TimeoutError:
-            retries -= 1
-            logger.warning(f"Тайм-аут для {repo_full_name}. Осталось попыток: {retries}.")
-            await asyncio.sleep(5)
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка для {repo_full_name}: {e}")
-            return []
+    logger.info(f"Получено {total_commits} коммитов для репозитория {repo_full_name}.")
+
+    return build_activity_records(activity)
+
+
+def build_activity_records(activity: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Преобразует посуточные корзины активности в список записей.
+
+    :param activity: Накопитель, заполненный aggregate_commits.
+    :return: Список записей активности.
+    """
+    return [
+        {
+            "date": date_str,
+            "commits": data["commits"],
+            "authors": list(data["authors"]),
+            "last_commit_at": data["last_commit_at"],
+        }
+        for date_str, data in activity.items()
+    ]
+
+
+async def fetch_activity_graphql(
+    client: GitHubClient,
+    repo_names: List[str],
+    interval_days: int,
+    since: Optional[Dict[str, date]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Получает активность многих репозиториев пакетными GraphQL-запросами.
+
+    Результат для каждого репозитория совпадает с тем, что вернул бы fetch_activity_for_repo.
 
-    logger.error(f"Репозиторий {repo_full_name} не удалось обработать после нескольких попыток.")
-    return []
+    :param client: Клиент GitHub API.
+    :param repo_names: Полные имена репозиториев (owner/repo).
+    :param interval_days: Количество дней для получения активности.
+    :param since: Словарь {repo: дата}, начиная с которой загружать коммиты (в инкрементальном режиме).
+    :return: Словарь {repo: список записей активности}.
+    """
+    since = since or {}
+
+    end_date = datetime.now(timezone.utc).date()
+    window_start = end_date - timedelta(days=interval_days)
+    start_dates = {
+        repo: min(max(since.get(repo, window_start), window_start), end_date) for repo in repo_names
+    }
+    activities = {repo: {} for repo in repo_names}
+
+    def on_page(repo: str, commits: List[Dict[str, Any]]) -> None:
+        with client.profiler.phase("aggregation"):
+            aggregate_commits(commits, activities[repo], start_dates[repo], end_date, repo)
+
+    logger.info(f"Загрузка активности {len(repo_names)} репозиториев через GraphQL.")
+    completed = await fetch_histories(
+        client,
+        {repo: start_date.isoformat() + "T00:00:00Z" for repo, start_date in start_dates.items()},
+        end_date.isoformat() + "T23:59:59Z",
+        on_page,
+    )
+
+    result = {}
+    for repo, activity in activities.items():
+        if not completed[repo]:
+            logger.error(f"История репозитория {repo} загружена не полностью, данные пропущены.")
+            continue
+        result[repo] = build_activity_records(activity)
+    return result
+
+
+async def fetch_activity_stats(
+    client: GitHubClient,
+    repo_names: List[str],
+    interval_days: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Получает активность пакета репозиториев из предвычисленной статистики GitHub (/stats/commit_activity).
+
+    Один запрос на репозиторий вместо постраничного обхода коммитов, но статистика содержит
+    только количество коммитов по дням: авторы загружаются списком коммитов лишь за последние
+    config.stats_author_days дней (0 — авторы не загружаются). Репозитории, для которых статистика
+    так и не была готова, загружаются обычным списком коммитов.
+
+    :param client: Клиент GitHub API.
+    :param repo_names: Полные имена репозиториев (owner/repo).
+    :param interval_days: Количество дней для получения активности.
+    :return: Словарь {repo: список записей активности}.
+    """
+    config = client.config
+    end_date = datetime.now(timezone.utc).date()
+    start_date = end_date - timedelta(days=interval_days)
+
+    logger.info(f"Загрузка статистики коммитов {len(repo_names)} репозиториев.")
+    stats = await fetch_commit_activity(client, repo_names)
+
+    async def build(repo: str, weeks: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if weeks is None:
+            logger.warning(f"Статистика для {repo} недоступна, активность загружается списком коммитов.")
+            return await fetch_activity_for_repo(client, repo, interval_days)
+
+        records = {
+            date_str: {"date": date_str, "commits": commits, "authors": [], "last_commit_at": None}
+            for date_str, commits in daily_commits(weeks, start_date, end_date).items()
+        }
+        if config.stats_author_days > 0:
+            recent = await fetch_activity_for_repo(client, repo, min(config.stats_author_days, interval_days))
+            for record in recent:
+                records[record["date"]] = record
+        return sorted(records.values(), key=lambda record: record["date"])
+
+    activities = await asyncio.gather(*(build(repo, weeks) for repo, weeks in stats.items()))
+    return dict(zip(stats.keys(), activities))
+
+
+ACTIVITY_COLUMNS = ["repo", "date", "commits", "author_ids"]
+TOP100_CHANNEL = "top100_changed"
+
+
+def flatten_activities(all_activities: List[Dict[str, Any]]) -> List[Tuple[str, date, int, List[str]]]:
+    """
+    Преобразует записи активности в кортежи для загрузки в базу данных.
+
+    :param all_activities: Список активностей.
+    :return: Список кортежей (repo, date, commits, authors).
+    """
+    return [
+        (
+            activity["repo"],
+            datetime.strptime(activity["date"], "%Y-%m-%d").date(),
+            activity["commits"],
+            activity["authors"],
+        )
+        for activity in all_activities
+    ]
+
+
+STREAM_STAGING_TABLE = "activity_stream_staging"
+
+
+async def copy_activities_to_staging(conn, records: List[Tuple[str, date, int, List[str]]]) -> None:
+    """
+    Создаёт временную таблицу activity_staging и загружает в неё записи через COPY,
+    заменив имена авторов идентификаторами из словаря authors.
+    Таблица удаляется при завершении транзакции, поэтому вызывать функцию нужно внутри неё.
+
+    :param conn: Соединение AsyncPG с открытой транзакцией.
+    :param records: Кортежи (repo, date, commits, authors).
+    """
+    encoded = await AuthorDictionary().encode(conn, records)
+    await conn.execute("""
+        CREATE TEMP TABLE activity_staging (
+            repo TEXT NOT NULL,
+            date DATE NOT NULL,
+            commits INTEGER NOT NULL,
+            author_ids INTEGER[] NOT NULL
+        ) ON COMMIT DROP;
+    """)
+    await conn.copy_records_to_table("activity_staging", records=encoded, columns=ACTIVITY_COLUMNS)
 
 
 async def save_activity_to_db(conn_or_pool, all_activities: List[Dict[str, Any]]) -> None:
     """
-    Сохраняет активности в базу данных, удаляя старые записи перед вставкой новых.
+    Сохраняет активности в базу данных, заменяя старые записи новыми.
+
+    Данные загружаются через COPY во временную таблицу, а затем одной транзакцией
+    переносятся в activity, поэтому читатели видят либо старый, либо новый набор целиком.
 
     :param conn_or_pool: Либо соединение (asyncpg.Connection), либо пул (asyncpg.Pool).
     :param all_activities: Список активностей для сохранения.
@@ -136,33 +589,19 @@ async def save_activity_to_db(conn_or_pool, all_activities: List[Dict[str, Any]]
         return
 
     try:
-        delete_query = "DELETE FROM activity;"
-        insert_query = """
-            INSERT INTO activity (repo, date, commits, authors)
-            VALUES ($1, $2, $3, $4);
-        """
-
-        flattened_data = [
-            (
-                activity["repo"],
-                datetime.strptime(activity["date"], "%Y-%m-%d").date(),
-                activity["commits"],
-                activity["authors"],
-            )
-            for activity in all_activities
-        ]
+        records = flatten_activities(all_activities)
 
-        logger.info(f"Данные для сохранения: {flattened_data}")
+        logger.info(f"Подготовлено {len(records)} записей активности для сохранения.")
 
         if isinstance(conn_or_pool, asyncpg.pool.Pool):
             async with conn_or_pool.acquire() as conn:
                 async with conn.transaction():
-                    await conn.execute(delete_query)
-                    await conn.executemany(insert_query, flattened_data)
+                    await copy_activities_to_staging(conn, records)
+                    await replace_activity_from_staging(conn, "activity_staging")
         else:
             async with conn_or_pool.transaction():
-                await conn_or_pool.execute(delete_query)
-                await conn_or_pool.executemany(insert_query, flattened_data)
+                await copy_activities_to_staging(conn_or_pool, records)
+                await replace_activity_from_staging(conn_or_pool, "activity_staging")
 
         logger.info("Активности успешно сохранены в базу данных.")
     except Exception as e:
@@ -170,126 +609,717 @@ async def save_activity_to_db(conn_or_pool, all_activities: List[Dict[str, Any]]
         raise
 
 
-async def save_repositories_to_db(conn, repositories: List[Dict[str, Any]]) -> None:
+async def discard_staged_repos(conn, staging_table: str, repos: List[str]) -> None:
     """
-    Сохраняет данные о репозиториях в таблицу top100, удаляя старые записи и обновляя поле prev из current.
+    Удаляет из staging-таблицы строки незавершённых репозиториев. Вызывается в транзакции публикации:
+    частично загруженные строки не должны ни сталкиваться с сохранённой активностью, ни перезаписывать её.
 
     :param conn: Соединение AsyncPG.
-    :param repositories: Список репозиториев.
+    :param staging_table: Имя staging-таблицы.
+    :param repos: Репозитории, исчерпавшие попытки загрузки.
+    """
+    if repos:
+        await conn.execute(f"DELETE FROM {staging_table} WHERE repo = ANY($1::text[]);", repos)
+
+
+async def replace_activity_from_staging(conn, staging_table: str, keep_repos: Optional[List[str]] = None) -> None:
+    """
+    Заменяет содержимое activity данными из staging-таблицы. Вызывается внутри транзакции.
+
+    :param conn: Соединение AsyncPG.
+    :param staging_table: Имя staging-таблицы.
+    :param keep_repos: Репозитории, активность которых загрузить не удалось: их строки остаются прежними.
+    """
+    if keep_repos:
+        await conn.execute("DELETE FROM activity WHERE NOT (repo = ANY($1::text[]));", keep_repos)
+    else:
+        await conn.execute("DELETE FROM activity;")
+    await conn.execute(f"""
+        INSERT INTO activity (repo, date, commits, author_ids)
+        SELECT repo, date, commits, author_ids
+        FROM {staging_table};
+    """)
+
+
+async def merge_activity_from_staging(
+    conn,
+    staging_table: str,
+    watermarks: Dict[str, str],
+    repo_names: List[str],
+    retention_start: date,
+) -> None:
+    """
+    Переносит данные из staging-таблицы в activity инкрементально. Вызывается внутри транзакции.
+
+    :param conn: Соединение AsyncPG.
+    :param staging_table: Имя staging-таблицы.
+    :param watermarks: Словарь {repo: время последнего загруженного коммита в формате ...Z}.
+    :param repo_names: Репозитории текущего топа; активность остальных удаляется.
+    :param retention_start: Первая дата окна хранения.
+    """
+    watermark_query = """
+        INSERT INTO repo_watermarks (repo, last_commit_at)
+        VALUES ($1, $2)
+        ON CONFLICT (repo) DO UPDATE
+        SET last_commit_at = GREATEST(repo_watermarks.last_commit_at, EXCLUDED.last_commit_at),
+            updated_at = now();
+    """
+    watermark_data = [
+        (repo, datetime.strptime(last_commit_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc))
+        for repo, last_commit_at in watermarks.items()
+    ]
+
+    await conn.execute(f"""
+        INSERT INTO activity (repo, date, commits, author_ids)
+        SELECT repo, date, commits, author_ids
+        FROM {staging_table}
+        ON CONFLICT (repo, date) DO UPDATE
+        SET commits = EXCLUDED.commits,
+            author_ids = EXCLUDED.author_ids;
+    """)
+    await conn.executemany(watermark_query, watermark_data)
+    await conn.execute(
+        "DELETE FROM activity WHERE date < $1 OR NOT (repo = ANY($2::text[]))",
+        retention_start,
+        repo_names,
+    )
+    await conn.execute(
+        "DELETE FROM repo_watermarks WHERE NOT (repo = ANY($1::text[]))",
+        repo_names,
+    )
+
+
+def collect_watermark(watermarks: Dict[str, str], activity: Dict[str, Any]) -> None:
+    """
+    Продвигает водяной знак репозитория по записи активности.
+
+    :param watermarks: Накопитель {repo: время последнего коммита в формате ...Z}.
+    :param activity: Запись активности с полями repo и last_commit_at.
+    """
+    if activity.get("last_commit_at"):
+        watermarks[activity["repo"]] = max(watermarks.get(activity["repo"], ""), activity["last_commit_at"])
+
+
+async def ensure_incremental_schema(conn) -> None:
+    """
+    Создаёт таблицу водяных знаков и уникальный индекс activity (repo, date), нужные инкрементальному режиму.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS repo_watermarks (
+            repo TEXT PRIMARY KEY,
+            last_commit_at TIMESTAMPTZ NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS activity_repo_date_idx ON activity (repo, date);
+    """)
+
+
+async def fetch_watermarks(conn) -> Dict[str, datetime]:
+    """
+    Загружает водяные знаки репозиториев: время последнего полностью загруженного коммита.
+
+    :param conn: Соединение AsyncPG.
+    :return: Словарь {repo: last_commit_at}.
+    """
+    records = await conn.fetch("SELECT repo, last_commit_at FROM repo_watermarks")
+    return {record["repo"]: record["last_commit_at"] for record in records}
+
+
+async def upsert_activity_to_db(
+    conn,
+    all_activities: List[Dict[str, Any]],
+    repo_names: List[str],
+    retention_start: date,
+) -> None:
+    """
+    Инкрементально сохраняет активности: обновляет только затронутые пары (repo, date),
+    продвигает водяные знаки и удаляет записи вне окна хранения.
+
+    Дни, начиная с водяного знака, загружаются из GitHub целиком, поэтому
+    затронутые строки заменяются, а не суммируются.
+
+    :param conn: Соединение AsyncPG.
+    :param all_activities: Список новых активностей.
+    :param repo_names: Репозитории текущего топа; активность остальных удаляется.
+    :param retention_start: Первая дата окна хранения.
     """
     try:
-        repo_data = [
-            {
-                "repo": repo["full_name"],
-                "owner": repo["owner"]["login"],
-                "stars": repo.get("stargazers_count", 0),
-                "watchers": repo.get("watchers_count", 0),
-                "forks": repo.get("forks_count", 0),
-                "open_issues": repo.get("open_issues_count", 0),
-                "language": repo.get("language", "Unknown"),
-                "position_cur": position,
-            }
-            for position, repo in enumerate(repositories, start=1)
-        ]
+        upsert_data = flatten_activities(all_activities)
 
-        repo_names = [repo["repo"] for repo in repo_data]
-        query_delete_old = """
-            DELETE FROM top100
-            WHERE repo NOT IN (SELECT UNNEST($1::text[]))
-        """
-        await conn.execute(query_delete_old, repo_names)
+        watermarks = {}
+        for activity in all_activities:
+            collect_watermark(watermarks, activity)
 
-        logger.info("Старые записи успешно удалены.")
+        async with conn.transaction():
+            await copy_activities_to_staging(conn, upsert_data)
+            await merge_activity_from_staging(conn, "activity_staging", watermarks, repo_names, retention_start)
 
-        query_fetch_existing = """
-            SELECT repo, position_cur
-            FROM top100
-        """
-        existing_records = await conn.fetch(query_fetch_existing)
-        existing_map = {record["repo"]: record["position_cur"] for record in existing_records}
-
-        query_insert_or_update = """
-            INSERT INTO top100 (repo, owner, position_cur, position_prev, stars, watchers, forks, open_issues, language)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-            ON CONFLICT (repo) DO UPDATE
-            SET position_cur = EXCLUDED.position_cur,
-                position_prev = EXCLUDED.position_prev,
-                owner = EXCLUDED.owner,
-                stars = EXCLUDED.stars,
-                watchers = EXCLUDED.watchers,
-                forks = EXCLUDED.forks,
-                open_issues = EXCLUDED.open_issues,
-                language = EXCLUDED.language;
-        """
-        insert_data = [
-            (
-                repo["repo"],
-                repo["owner"],
-                repo["position_cur"],
-                existing_map.get(repo["repo"]),
-                repo["stars"],
-                repo["watchers"],
-                repo["forks"],
-                repo["open_issues"],
-                repo["language"],
-            )
-            for repo in repo_data
-        ]
+        logger.info(
+            f"Инкрементально сохранено {len(upsert_data)} записей активности, "
+            f"обновлено водяных знаков: {len(watermarks)}."
+        )
+    except Exception as e:
+        logger.error(f"Ошибка инкрементального сохранения активностей: {e}")
+        raise
 
-        await conn.executemany(query_insert_or_update, insert_data)
 
-        logger.info("Данные о репозиториях успешно сохранены.")
+async def ensure_rank_history_schema(conn) -> None:
+    """
+    Создаёт таблицу истории позиций top100_history: по строке на репозиторий за каждую публикацию.
+    Первичный ключ (repo, captured_at) позволяет читать историю репозитория за интервал без полного просмотра.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS top100_history (
+            repo TEXT NOT NULL,
+            captured_at TIMESTAMPTZ NOT NULL,
+            position INTEGER NOT NULL,
+            stars INTEGER NOT NULL,
+            forks INTEGER NOT NULL,
+            PRIMARY KEY (repo, captured_at)
+        );
+    """)
+
+
+async def ensure_top100_indexes(conn) -> None:
+    """
+    Создаёт индексы (поле сортировки, repo) таблицы top100 для keyset-пагинации списка репозиториев в API.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS top100_stars_repo_idx ON top100 (stars, repo);
+        CREATE INDEX IF NOT EXISTS top100_watchers_repo_idx ON top100 (watchers, repo);
+        CREATE INDEX IF NOT EXISTS top100_forks_repo_idx ON top100 (forks, repo);
+        CREATE INDEX IF NOT EXISTS top100_open_issues_repo_idx ON top100 (open_issues, repo);
+        CREATE INDEX IF NOT EXISTS top100_language_repo_idx ON top100 ((COALESCE(language, '')), repo);
+    """)
+
+
+async def save_repositories_to_db(conn, repositories: List[Dict[str, Any]]) -> None:
+    """
+    Сохраняет данные о репозиториях в таблицу top100 одним запросом: удаляет выбывшие репозитории,
+    переносит текущую позицию в position_prev и дописывает снимок позиций в top100_history.
+
+    :param conn: Соединение AsyncPG.
+    :param repositories: Список репозиториев.
+    """
+    try:
+        query_merge = """
+            WITH incoming AS (
+                SELECT repo, owner, position::integer AS position, stars, watchers, forks, open_issues, language
+                FROM unnest(
+                    $1::text[], $2::text[], $3::integer[], $4::integer[], $5::integer[], $6::integer[], $7::text[]
+                ) WITH ORDINALITY AS t(repo, owner, stars, watchers, forks, open_issues, language, position)
+            ),
+            removed AS (
+                DELETE FROM top100
+                WHERE NOT (repo = ANY($1::text[]))
+            ),
+            merged AS (
+                INSERT INTO top100 (repo, owner, position_cur, position_prev, stars, watchers, forks, open_issues, language)
+                SELECT i.repo, i.owner, i.position, t.position_cur, i.stars, i.watchers, i.forks, i.open_issues, i.language
+                FROM incoming i
+                LEFT JOIN top100 t ON t.repo = i.repo
+                ON CONFLICT (repo) DO UPDATE
+                SET position_cur = EXCLUDED.position_cur,
+                    position_prev = EXCLUDED.position_prev,
+                    owner = EXCLUDED.owner,
+                    stars = EXCLUDED.stars,
+                    watchers = EXCLUDED.watchers,
+                    forks = EXCLUDED.forks,
+                    open_issues = EXCLUDED.open_issues,
+                    language = EXCLUDED.language
+            )
+            INSERT INTO top100_history (repo, captured_at, position, stars, forks)
+            SELECT repo, now(), position, stars, forks
+            FROM incoming;
+        """
+        await conn.execute(
+            query_merge,
+            [repo["full_name"] for repo in repositories],
+            [repo["owner"]["login"] for repo in repositories],
+            [repo.get("stargazers_count", 0) for repo in repositories],
+            [repo.get("watchers_count", 0) for repo in repositories],
+            [repo.get("forks_count", 0) for repo in repositories],
+            [repo.get("open_issues_count", 0) for repo in repositories],
+            [repo.get("language", "Unknown") for repo in repositories],
+        )
+
+        logger.info(f"Данные о {len(repositories)} репозиториях успешно сохранены.")
     except Exception as e:
         logger.error(f"Ошибка сохранения репозиториев: {e}")
         raise
 
 
-async def run_parser():
+async def prepare_stream_staging(pool, reset: bool = True) -> None:
+    """
+    Создаёт нежурналируемую staging-таблицу для потоковой записи активности.
+
+    :param pool: Пул соединений AsyncPG.
+    :param reset: Пересоздать пустую таблицу (для нового запуска; при продолжении запуска строки сохраняются).
+    """
+    async with pool.acquire() as conn:
+        if reset:
+            await conn.execute(f"DROP TABLE IF EXISTS {STREAM_STAGING_TABLE};")
+        await conn.execute(f"""
+            CREATE UNLOGGED TABLE IF NOT EXISTS {STREAM_STAGING_TABLE} (
+                repo TEXT NOT NULL,
+                date DATE NOT NULL,
+                commits INTEGER NOT NULL,
+                author_ids INTEGER[] NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {STREAM_STAGING_TABLE}_repo_idx ON {STREAM_STAGING_TABLE} (repo);
+        """)
+
+
+async def stream_activities_to_staging(
+    client: GitHubClient,
+    pool,
+    watermarks: Dict[str, datetime],
+    run_id: int,
+    worker_id: str,
+    deadline: Optional[float] = None,
+) -> Tuple[int, float]:
+    """
+    Загружает активность репозиториев запуска потоковым конвейером и пакетами пишет её в staging-таблицу.
+
+    Репозитории захватываются из таблицы состояния запуска (аренда через
+    FOR UPDATE SKIP LOCKED), поэтому несколько воркеров делят запуск между собой,
+    а аренду упавшего воркера по истечении срока подхватывают остальные. Пока воркер
+    работает, аренда его репозиториев продлевается фоновой задачей.
+
+    Захватывает репозитории сам загрузчик, когда освобождается (по одному для REST, пакетом
+    для GraphQL и статистики), поэтому воркер арендует не больше, чем загружает одновременно,
+    а попытка засчитывается репозиторию в момент начала загрузки. Строки сбрасываются через COPY каждые pipeline_flush_rows
+    строк или pipeline_flush_seconds секунд; перед записью имена авторов пакетно заменяются
+    идентификаторами из словаря authors. Репозиторий отмечается завершённым в той же
+    транзакции, в которой записываются его последние строки. После deadline новые
+    репозитории не захватываются.
+
+    :param client: Клиент GitHub API.
+    :param pool: Пул соединений AsyncPG.
+    :param watermarks: Водяные знаки репозиториев (пустой словарь вне инкрементального режима).
+        Загрузка начинается за incremental_lookback_days дней до дня водяного знака, и строки
+        этих дней заменяются целиком: так учитываются коммиты, перебазированные с более старой датой автора.
+    :param run_id: Идентификатор запуска.
+    :param worker_id: Идентификатор воркера.
+    :param deadline: Момент по time.monotonic(), после которого новые репозитории не захватываются.
+    :return: Кортеж (количество записанных строк, время записи в staging-таблицу в секундах).
+    """
+    config = client.config
+    profiler = client.profiler
+
+    lookback = timedelta(days=config.incremental_lookback_days)
+    repo_since = {repo: watermark.date() - lookback for repo, watermark in watermarks.items()}
+    outstanding = {}
+    progress = {}
+    authors = AuthorDictionary()
+
+    if config.fetch_backend == "graphql":
+        claim_size = config.graphql_batch_size
+
+        async def fetch_records(batch: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+            return await fetch_activity_graphql(client, batch, config.activity_days, since=repo_since)
+    elif config.fetch_backend == "stats":
+        claim_size = config.stats_batch_size
+
+        async def fetch_records(batch: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+            return await fetch_activity_stats(client, batch, config.activity_days)
+    else:
+        claim_size = 1
+
+        async def fetch_records(batch: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+            records = await fetch_activity_for_repo(
+                client, batch[0], config.activity_days, since=repo_since.get(batch[0])
+            )
+            return {batch[0]: records}
+
+    exhausted = False
+
+    async def jobs():
+        # Задания — лишь приглашения захватить работу: сами репозитории захватывает освободившийся загрузчик.
+        while not exhausted:
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning("Время запуска исчерпано, оставшиеся репозитории будут загружены при следующем вызове.")
+                return
+            yield None
+
+    async def claim() -> List[str]:
+        nonlocal exhausted
+        if exhausted:
+            return []
+        if deadline is not None and time.monotonic() >= deadline:
+            # Приглашения, оставшиеся в очереди после deadline, не должны захватывать новую работу.
+            exhausted = True
+            return []
+        async with pool.acquire() as conn:
+            with profiler.phase("db_claim"):
+                claimed = await claim_repos(
+                    conn,
+                    run_id,
+                    worker_id,
+                    claim_size,
+                    config.lease_seconds,
+                    config.run_max_attempts,
+                    STREAM_STAGING_TABLE,
+                )
+        if not claimed:
+            exhausted = True
+        return claimed
+
+    async def fetch(_) -> List[Dict[str, Any]]:
+        job_repos = await claim()
+        if not job_repos:
+            return []
+        started = time.perf_counter()
+        try:
+            with profiler.phase("fetch"):
+                result = await fetch_records(job_repos)
+        except Exception:
+            async with pool.acquire() as conn:
+                await release_repos(conn, run_id, worker_id, job_repos)
+            raise
+        for repo in job_repos:
+            profiler.record_repo(repo, time.perf_counter() - started)
+
+        records = []
+        empty = {}
+        for repo, repo_records in result.items():
+            repo_watermark = {}
+            for record in repo_records:
+                record = {**record, "repo": repo}
+                collect_watermark(repo_watermark, record)
+                records.append(record)
+            progress[repo] = (len(repo_records), repo_watermark.get(repo))
+            outstanding[repo] = len(repo_records)
+            if not repo_records:
+                empty[repo] = progress[repo]
+
+        failed = [repo for repo in job_repos if repo not in result]
+        if empty or failed:
+            async with pool.acquire() as conn:
+                if empty:
+                    await mark_repos_done(conn, run_id, worker_id, empty)
+                if failed:
+                    await release_repos(conn, run_id, worker_id, failed)
+        return records
+
+    def aggregate(record: Dict[str, Any]) -> Tuple[str, date, int, List[str]]:
+        return flatten_activities([record])[0]
+
+    write_seconds = 0.0
+
+    async def write(rows: List[Tuple[str, date, int, List[str]]]) -> None:
+        nonlocal write_seconds
+        started = time.perf_counter()
+        finished = {}
+        for row in rows:
+            outstanding[row[0]] -= 1
+            if outstanding[row[0]] == 0:
+                finished[row[0]] = progress[row[0]]
+        async with pool.acquire() as conn:
+            with profiler.phase("db_encode_authors"):
+                rows = await authors.encode(conn, rows)
+            async with conn.transaction():
+                insert_started = time.perf_counter()
+                owned = set(await lock_owned_repos(conn, run_id, worker_id, list({row[0] for row in rows})))
+                owned_rows = [row for row in rows if row[0] in owned]
+                if len(owned_rows) < len(rows):
+                    logger.warning(
+                        f"Воркер {worker_id} потерял аренду части репозиториев, "
+                        f"{len(rows) - len(owned_rows)} строк отброшено."
+                    )
+                if owned_rows:
+                    await conn.copy_records_to_table(
+                        STREAM_STAGING_TABLE, records=owned_rows, columns=ACTIVITY_COLUMNS
+                    )
+                finished = {repo: value for repo, value in finished.items() if repo in owned}
+                if finished:
+                    await mark_repos_done(conn, run_id, worker_id, finished)
+                commit_started = time.perf_counter()
+                profiler.add("db_insert", commit_started - insert_started)
+            profiler.add("db_commit", time.perf_counter() - commit_started)
+        write_seconds += time.perf_counter() - started
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(config.lease_seconds / 3)
+            async with pool.acquire() as conn:
+                await extend_leases(conn, run_id, worker_id, config.lease_seconds)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        written = await run_pipeline(
+            jobs(),
+            fetch,
+            aggregate,
+            write,
+            workers=config.pipeline_workers,
+            queue_size=config.pipeline_queue_size,
+            flush_rows=config.pipeline_flush_rows,
+            flush_seconds=config.pipeline_flush_seconds,
+        )
+    finally:
+        heartbeat_task.cancel()
+        async with pool.acquire() as conn:
+            await release_repos(conn, run_id, worker_id)
+
+    return written, write_seconds
+
+
+async def start_or_resume_run(client: GitHubClient, pool) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """
+    Продолжает незавершённый запуск или начинает новый с поиска топа репозиториев.
+
+    Поиск и создание запуска выполняются под advisory-блокировкой: из одновременно стартовавших
+    воркеров запуск создаёт только первый, остальные присоединяются к нему. Сам поиск по GitHub
+    идёт без блокировки и без занятого соединения пула; если за это время запуск создал другой
+    воркер, результат поиска отбрасывается и воркер присоединяется к его запуску.
+
+    :param client: Клиент GitHub API.
+    :param pool: Пул соединений AsyncPG.
+    :return: Кортеж (run_id, список репозиториев запуска); run_id равен None, если репозитории не найдены.
+    """
+    async def resume(conn) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        active = await find_active_run(conn, client.config.run_max_age_hours)
+        if active is None:
+            return None
+        run_id, repositories = active
+        await prepare_stream_staging(pool, reset=False)
+        await reconcile_staging(conn, run_id, STREAM_STAGING_TABLE)
+        logger.info(f"Продолжение запуска {run_id}.")
+        return run_id, repositories
+
+    async with pool.acquire() as conn:
+        await ensure_run_state_schema(conn)
+        await lock_runs(conn)
+        try:
+            await ensure_author_schema(conn)
+            await ensure_rank_history_schema(conn)
+            await ensure_top100_indexes(conn)
+            await ensure_data_version_schema(conn)
+            await ensure_rollup_schema(conn)
+            active = await resume(conn)
+        finally:
+            await unlock_runs(conn)
+    if active is not None:
+        return active
+
+    with client.profiler.phase("search"):
+        repositories = await get_top_repositories(client)
+    if not repositories:
+        return None, []
+
+    async with pool.acquire() as conn:
+        await lock_runs(conn)
+        try:
+            active = await resume(conn)
+            if active is not None:
+                return active
+
+            due = None
+            if client.config.adaptive_refresh:
+                await ensure_refresh_schema(conn)
+                due = await select_due_repos(conn, [repo["full_name"] for repo in repositories], client.config)
+
+            await prepare_stream_staging(pool)
+            run_id = await create_run(conn, repositories, due)
+            return run_id, repositories
+        finally:
+            await unlock_runs(conn)
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def run_parser(config: Optional[Config] = None) -> Dict[str, Any]:
     """
     Основная логика парсера для получения и сохранения данных о репозиториях и их активности.
+
+    Активность загружается потоковым конвейером в staging-таблицу, после чего
+    top100 и activity обновляются одной короткой транзакцией.
+
+    Каждый вызов работает как воркер запуска: захватывает незавершённые репозитории,
+    загружает их и отмечает завершёнными. Несколько процессов или вызовов облачной функции
+    делят один запуск между собой, а прерванный вызов или исчерпанный бюджет времени
+    run_time_budget продолжается следующим вызовом. Результат публикует воркер,
+    закончивший последним.
+
+    В режиме адаптивного обновления (ADAPTIVE_REFRESH) запуск загружает только репозитории,
+    срок обновления которых наступил, и сливает их активность с уже сохранённой.
+
+    :param config: Конфигурация приложения (по умолчанию читается из окружения).
+    :return: Сводка вызова: success, complete, run_id, repositories, activity_rows, requests, db_write_seconds.
     """
 
-    config = Config()
+    config = config or Config()
+    deadline = time.monotonic() + config.run_time_budget if config.run_time_budget else None
+    worker_id = make_worker_id()
 
     pool = await asyncpg.create_pool(config.db_url)
+    client = GitHubClient(config)
+    profiler = client.profiler
+    if config.run_profile:
+        profiler.start_profile()
+    summary = {
+        "success": False,
+        "complete": False,
+        "run_id": None,
+        "repositories": 0,
+        "activity_rows": 0,
+        "requests": 0,
+        "db_write_seconds": 0.0,
+    }
 
     try:
-        repositories = await get_top_repositories(config)
+        run_id, repositories = await start_or_resume_run(client, pool)
+        summary["run_id"] = run_id
+        summary["repositories"] = len(repositories)
 
-        if not repositories:
+        if run_id is None:
             logger.warning("Не удалось получить ни одного репозитория.")
-            return
+            return summary
+
+        incremental = config.incremental or config.adaptive_refresh
+        watermarks = {}
+        if incremental:
+            async with pool.acquire() as conn:
+                await ensure_incremental_schema(conn)
+                watermarks = await fetch_watermarks(conn)
 
+        written, write_seconds = await stream_activities_to_staging(
+            client, pool, watermarks, run_id, worker_id, deadline
+        )
+        summary["activity_rows"] = written
+
+        publish_started = time.perf_counter()
         async with pool.acquire() as conn:
+            progress = await fetch_run_progress(conn, run_id, config.run_max_attempts)
+            if progress["pending"] or progress["leased"]:
+                logger.info(
+                    f"Воркер {worker_id} закончил свою часть запуска {run_id}: "
+                    f"ожидают загрузки {progress['pending']}, в работе у других воркеров {progress['leased']}."
+                )
+                summary["success"] = True
+                return summary
+            if progress["failed"]:
+                logger.error(f"Активность {progress['failed']} репозиториев загрузить не удалось, они будут пропущены.")
+
             async with conn.transaction():
-                await save_repositories_to_db(conn, repositories)
+                if not await lock_running_run(conn, run_id):
+                    logger.info(f"Запуск {run_id} уже опубликован другим воркером.")
+                    summary["success"] = True
+                    summary["complete"] = True
+                    return summary
 
-                async with aiohttp.ClientSession() as session:
-                    tasks = [
-                        fetch_activity_for_repo(session, repo["full_name"], config.activity_days)
-                        for repo in repositories
-                    ]
+                with profiler.phase("publish_top100"):
+                    await save_repositories_to_db(conn, repositories)
+                    await bump_data_version(conn, "top100")
 
-                    activities = await asyncio.gather(*tasks, return_exceptions=True)
+                activity_started = time.perf_counter()
+                failed = await fetch_unfinished_repos(conn, run_id)
+                await discard_staged_repos(conn, STREAM_STAGING_TABLE, failed)
+                retention_start = datetime.now(timezone.utc).date() - timedelta(days=config.activity_days)
+                if incremental:
+                    repo_names = [repo["full_name"] for repo in repositories]
+                    version = await bump_activity_versions(conn, STREAM_STAGING_TABLE, repo_names, retention_start)
+                    await merge_activity_from_staging(
+                        conn,
+                        STREAM_STAGING_TABLE,
+                        await fetch_run_watermarks(conn, run_id),
+                        repo_names,
+                        retention_start,
+                    )
+                    await refresh_rollups(conn, version, retention_start, STREAM_STAGING_TABLE)
+                    if config.adaptive_refresh:
+                        await record_refreshes(conn, run_id, repo_names, config)
+                elif await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM {STREAM_STAGING_TABLE})"):
+                    version = await bump_activity_versions(conn, STREAM_STAGING_TABLE, keep_repos=failed)
+                    await replace_activity_from_staging(conn, STREAM_STAGING_TABLE, failed)
+                    await refresh_rollups(conn, version, retention_start)
+                else:
+                    logger.warning("Нет данных для сохранения. Старые записи в базе данных не будут удалены.")
+                profiler.add("publish_activity", time.perf_counter() - activity_started)
 
-                    all_activities = []
-                    for repo, activity in zip(repositories, activities):
-                        if isinstance(activity, Exception):
-                            logger.error(f"Ошибка при обработке {repo['full_name']}: {activity}")
-                            continue
-                        for record in activity:
-                            record["repo"] = repo["full_name"]
-                            all_activities.append(record)
+                await complete_run(conn, run_id)
+                # Уведомление доставляется слушателям (кэшу API) только после фиксации транзакции.
+                await conn.execute("SELECT pg_notify($1, $2)", TOP100_CHANNEL, str(run_id))
+                commit_started = time.perf_counter()
+            profiler.add("publish_commit", time.perf_counter() - commit_started)
+        summary["db_write_seconds"] = write_seconds + time.perf_counter() - publish_started
 
-                    await save_activity_to_db(conn, all_activities)
+        logger.info(f"Сохранено {written} записей активности.")
 
         logger.info("Все операции успешно выполнены.")
+        summary["success"] = True
+        summary["complete"] = True
     except Exception as e:
         logger.error(f"Ошибка во время выполнения парсера: {e}")
     finally:
+        await client.close()
+        client.log_stats()
+        summary["requests"] = client.scheduler.requests
+        await save_run_report(client, pool, worker_id, summary)
         await pool.close()
         logger.info("Парсер завершил работу.")
 
+    return summary
+
+
+async def save_run_report(client: GitHubClient, pool, worker_id: str, summary: Dict[str, Any]) -> None:
+    """
+    Сохраняет машиночитаемый отчёт о вызове: время фаз, гистограмму задержек репозиториев,
+    статистику запросов и, если включён RUN_PROFILE, самые затратные функции.
+    Отчёт пишется строкой parser_run_reports (RUN_REPORT_DB) и JSON-файлом в RUN_REPORT_DIR.
+    Ошибка сохранения отчёта не влияет на результат вызова.
+
+    :param client: Клиент GitHub API, накопивший замеры.
+    :param pool: Пул соединений AsyncPG.
+    :param worker_id: Идентификатор воркера.
+    :param summary: Сводка вызова run_parser.
+    """
+    config = client.config
+    report = client.profiler.report(
+        hotspots_limit=config.run_profile_top if config.run_profile else 0,
+        worker_id=worker_id,
+        fetch_backend=config.fetch_backend,
+        **summary,
+        github=client.stats(),
+    )
+    try:
+        if config.run_report_dir:
+            path = write_report_file(config.run_report_dir, report)
+            logger.info(f"Отчёт о вызове записан в {path}.")
+        if config.run_report_db:
+            async with pool.acquire() as conn:
+                await save_report_to_db(conn, report)
+    except Exception as e:
+        logger.error(f"Не удалось сохранить отчёт о вызове: {e}")
+
+
+def run_parser_process() -> Dict[str, Any]:
+    """
+    Точка входа процесса-воркера для run_parser_workers.
+    """
+    return asyncio.run(run_parser())
+
+
+def run_parser_workers(workers: int) -> List[Dict[str, Any]]:
+    """
+    Запускает несколько процессов-воркеров, которые делят один запуск парсера между собой.
+
+    :param workers: Количество процессов.
+    :return: Сводки всех воркеров.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_parser_process) for _ in range(workers)]
+        return [future.result() for future in futures]
+
 
 def handler(event, context):
     """
@@ -298,6 +1328,19 @@ def handler(event, context):
     :param event: Событие.
     :param context: Контекст выполнения.
     """
-    asyncio.run(run_parser())
+    config = Config()
+    if config.parser_workers > 1:
+        summaries = run_parser_workers(config.parser_workers)
+        summary = {
+            "success": all(item["success"] for item in summaries),
+            "complete": any(item["complete"] for item in summaries),
+            "run_id": summaries[0]["run_id"],
+        }
+    else:
+        summary = asyncio.run(run_parser(config))
+    if not summary["success"]:
+        return {"statusCode": 500, "body": f"Ошибка выполнения парсера, запуск {summary['run_id']}"}
+    if not summary["complete"]:
+        return {"statusCode": 202, "body": f"Запуск {summary['run_id']} приостановлен и продолжится при следующем вызове"}
     logger.info("Парсер успешно запущен!")
     return {"statusCode": 200, "body": "Парсер успешно выполнен"}
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from github_client import GitHubClient
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 100
+
+
+def build_history_query(aliases: List[str]) -> str:
+    """
+    Собирает один GraphQL-запрос с псевдонимом на каждый репозиторий пакета.
+    Владелец, имя, начало интервала и курсор передаются отдельными переменными для каждого псевдонима.
+
+    :param aliases: Псевдонимы репозиториев (r0, r1, ...).
+    :return: Текст запроса.
+    """
+    variables = ["$until: GitTimestamp!"]
+    fields = []
+    for alias in aliases:
+        variables += [
+            f"${alias}_owner: String!",
+            f"${alias}_name: String!",
+            f"${alias}_since: GitTimestamp!",
+            f"${alias}_cursor: String",
+        ]
+        fields.append(
+            f"""
+            {alias}: repository(owner: ${alias}_owner, name: ${alias}_name) {{
+                defaultBranchRef {{
+                    target {{
+                        ... on Commit {{
+                            history(
+                                since: ${alias}_since, until: $until,
+                                first: {HISTORY_PAGE_SIZE}, after: ${alias}_cursor
+                            ) {{
+                                pageInfo {{ hasNextPage endCursor }}
+                                nodes {{ author {{ name date }} committedDate }}
+                            }}
+                        }}
+                    }}
+                }}
+            }}"""
+        )
+    return f"query({', '.join(variables)}) {{{''.join(fields)}\n}}"
+
+
+def to_utc(value: str) -> str:
+    return datetime.fromisoformat(value).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def to_rest_commit(node: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Приводит узел истории GraphQL к виду коммита REST API, который понимает агрегатор.
+
+    GraphQL отдаёт даты со смещением часового пояса, а агрегатор ожидает UTC в формате ...Z.
+
+    :param node: Узел history.nodes.
+    :return: Коммит вида {"commit": {"author": {"date": ..., "name": ...}, "committer": {"date": ...}}}.
+    """
+    author = node.get("author") or {}
+    commit_author = {}
+    if author.get("date"):
+        commit_author["date"] = to_utc(author["date"])
+    if author.get("name") is not None:
+        # Коммит без имени автора, как и REST-коммит без автора, агрегатор пропускает.
+        commit_author["name"] = author["name"]
+    commit = {"author": commit_author}
+    if node.get("committedDate"):
+        commit["committer"] = {"date": to_utc(node["committedDate"])}
+    return {"commit": commit}
+
+
+async def fetch_histories(
+    client: GitHubClient,
+    repo_since: Dict[str, str],
+    until: str,
+    on_page: Callable[[str, List[Dict[str, Any]]], None],
+) -> Dict[str, bool]:
+    """
+    Загружает историю коммитов сразу для многих репозиториев пакетными GraphQL-запросами.
+
+    Каждый запрос содержит до graphql_batch_size репозиториев, пакеты одного раунда
+    отправляются параллельно. Репозитории, у которых есть следующая страница,
+    попадают в следующий раунд со своим курсором.
+
+    :param client: Клиент GitHub API.
+    :param repo_since: Словарь {owner/repo: начало интервала в формате ISO 8601}.
+    :param until: Конец интервала в формате ISO 8601.
+    :param on_page: Вызывается для каждой полученной страницы: on_page(repo, commits).
+    :return: Словарь {repo: True, если история загружена полностью}.
+    """
+    completed = {repo: False for repo in repo_since}
+    batch_size = client.config.graphql_batch_size
+
+    async def fetch_batch(batch: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[str]]]:
+        aliases = [f"r{index}" for index in range(len(batch))]
+        variables: Dict[str, Any] = {"until": until}
+        for alias, (repo, cursor) in zip(aliases, batch):
+            owner, name = repo.split("/", 1)
+            variables.update({
+                f"{alias}_owner": owner,
+                f"{alias}_name": name,
+                f"{alias}_since": repo_since[repo],
+                f"{alias}_cursor": cursor,
+            })
+
+        try:
+            data, _ = await client.post_json(
+                client.config.github_graphql_url,
+                {"query": build_history_query(aliases), "variables": variables},
+                label=f"graphql ({len(batch)} репозиториев)",
+            )
+        except Exception as e:
+            logger.error(f"Ошибка GraphQL-запроса для {', '.join(repo for repo, _ in batch)}: {e}")
+            return []
+
+        for error in data.get("errors") or []:
+            logger.warning(f"GraphQL вернул ошибку: {error.get('message')}")
+
+        next_pages = []
+        results = data.get("data") or {}
+        for alias, (repo, _) in zip(aliases, batch):
+            repository = results.get(alias)
+            if repository is None:
+                logger.error(f"Не удалось получить историю репозитория {repo} через GraphQL.")
+                continue
+
+            target = (repository.get("defaultBranchRef") or {}).get("target") or {}
+            history = target.get("history")
+            if history is None:
+                completed[repo] = True
+                continue
+
+            on_page(repo, [to_rest_commit(node) for node in history["nodes"]])
+
+            page_info = history["pageInfo"]
+            if page_info["hasNextPage"]:
+                next_pages.append((repo, page_info["endCursor"]))
+            else:
+                completed[repo] = True
+        return next_pages
+
+    pending: List[Tuple[str, Optional[str]]] = [(repo, None) for repo in repo_since]
+    while pending:
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        pending = []
+        for next_pages in await asyncio.gather(*(fetch_batch(batch) for batch in batches)):
+            pending.extend(next_pages)
+
+    return completed
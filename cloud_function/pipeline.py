@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, List, Union
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+async def run_pipeline(
+    jobs: Union[Iterable[Any], AsyncIterable[Any]],
+    fetch: Callable[[Any], Awaitable[List[Any]]],
+    aggregate: Callable[[Any], Any],
+    write: Callable[[List[Any]], Awaitable[None]],
+    workers: int,
+    queue_size: int,
+    flush_rows: int,
+    flush_seconds: float,
+) -> int:
+    """
+    Запускает потоковый конвейер: очередь заданий -> N загрузчиков -> агрегация -> пакетная запись.
+
+    Все очереди ограничены, поэтому медленная запись притормаживает загрузку, и объём данных
+    в памяти не зависит от числа заданий.
+
+    :param jobs: Задания для загрузчиков (например, имена репозиториев): обычный или асинхронный итератор.
+        Задания извлекаются по мере освобождения места в очереди.
+    :param fetch: Загружает одно задание и возвращает список записей.
+    :param aggregate: Преобразует запись в строку для записи в базу данных.
+    :param write: Записывает пакет строк.
+    :param workers: Количество параллельных загрузчиков.
+    :param queue_size: Ёмкость очередей заданий и записей.
+    :param flush_rows: Пакет сбрасывается, когда в нём набирается столько строк.
+    :param flush_seconds: Пакет сбрасывается не реже, чем раз в столько секунд.
+    :return: Общее количество записанных строк.
+    """
+    job_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    record_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    row_queue: asyncio.Queue = asyncio.Queue(maxsize=max(queue_size, flush_rows))
+    written = 0
+
+    async def produce() -> None:
+        if hasattr(jobs, "__aiter__"):
+            async for job in jobs:
+                await job_queue.put(job)
+        else:
+            for job in jobs:
+                await job_queue.put(job)
+        for _ in range(workers):
+            await job_queue.put(_DONE)
+
+    async def fetch_worker() -> None:
+        while True:
+            job = await job_queue.get()
+            if job is _DONE:
+                return
+            try:
+                records = await fetch(job)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке {job}: {e}")
+                continue
+            for record in records:
+                await record_queue.put(record)
+
+    async def fetch_stage() -> None:
+        await asyncio.gather(*(fetch_worker() for _ in range(workers)))
+        await record_queue.put(_DONE)
+
+    async def aggregate_stage() -> None:
+        while True:
+            record = await record_queue.get()
+            if record is _DONE:
+                await row_queue.put(_DONE)
+                return
+            await row_queue.put(aggregate(record))
+
+    async def write_stage() -> None:
+        nonlocal written
+        batch = []
+        deadline = time.monotonic() + flush_seconds
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                row = await asyncio.wait_for(row_queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                row = None
+
+            finished = row is _DONE
+            if row is not None and not finished:
+                batch.append(row)
+
+            if batch and (finished or row is None or len(batch) >= flush_rows):
+                await write(batch)
+                written += len(batch)
+                logger.info(f"Записан пакет из {len(batch)} строк, всего {written}.")
+                batch = []
+            if row is None or not batch:
+                deadline = time.monotonic() + flush_seconds
+            if finished:
+                return
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(produce())
+        group.create_task(fetch_stage())
+        group.create_task(aggregate_stage())
+        group.create_task(write_stage())
+
+    return written
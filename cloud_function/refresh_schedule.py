@@ -0,0 +1,185 @@
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from config import Config
+from run_state import REPO_DONE
+
+logger = logging.getLogger(__name__)
+
+COMMITS_PER_REQUEST = 100
+
+
+async def ensure_refresh_schema(conn) -> None:
+    """
+    Создаёт таблицу расписания обновлений repo_refresh: темп коммитов репозитория,
+    время последнего изменения и момент, когда репозиторий нужно загрузить снова.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS repo_refresh (
+            repo TEXT PRIMARY KEY,
+            commit_rate DOUBLE PRECISION NOT NULL DEFAULT 0,
+            last_changed_at TIMESTAMPTZ,
+            refreshed_at TIMESTAMPTZ NOT NULL,
+            next_refresh_at TIMESTAMPTZ NOT NULL
+        );
+    """)
+
+
+def refresh_interval(commit_rate: float, config: Config) -> float:
+    """
+    Интервал обновления репозитория: за интервал в репозитории должно накопиться около
+    config.refresh_target_commits коммитов. Активные репозитории обновляются чаще, неактивные — реже.
+
+    :param commit_rate: Средний темп коммитов в день.
+    :param config: Конфигурация приложения.
+    :return: Интервал в часах в пределах [refresh_min_interval_hours, refresh_max_interval_hours].
+    """
+    if commit_rate <= 0:
+        return config.refresh_max_interval_hours
+    hours = config.refresh_target_commits / commit_rate * 24
+    return min(config.refresh_max_interval_hours, max(config.refresh_min_interval_hours, hours))
+
+
+def estimate_requests(commit_rate: float, elapsed_days: float, activity_days: int) -> int:
+    """
+    Оценка числа запросов к GitHub API на загрузку коммитов, накопившихся с прошлого обновления.
+
+    :param commit_rate: Средний темп коммитов в день.
+    :param elapsed_days: Дней с прошлого обновления.
+    :param activity_days: Окно хранения активности в днях (больше него загружать не нужно).
+    """
+    commits = commit_rate * min(elapsed_days, activity_days)
+    return 1 + math.ceil(commits / COMMITS_PER_REQUEST)
+
+
+def plan_refresh(
+    repo_names: List[str],
+    schedule: Dict[str, Dict[str, Any]],
+    now: datetime,
+    config: Config,
+) -> List[str]:
+    """
+    Выбирает репозитории, которые нужно загрузить в этом запуске.
+
+    Сначала берутся репозитории без расписания (новые в топе) в порядке позиций,
+    затем те, чей срок обновления наступил, — от самых просроченных относительно своего интервала.
+    Новые репозитории загружаются за всё окно хранения, их темп оценивается средним по известным.
+    Репозитории добавляются, пока их оценочная стоимость укладывается в config.refresh_request_budget
+    (0 — без ограничения); первый выбранный репозиторий берётся всегда.
+
+    :param repo_names: Репозитории текущего топа в порядке позиций.
+    :param schedule: Словарь {repo: запись repo_refresh}.
+    :param now: Текущее время.
+    :param config: Конфигурация приложения.
+    :return: Список репозиториев к загрузке.
+    """
+    rates = [entry["commit_rate"] for entry in schedule.values()]
+    average_rate = sum(rates) / len(rates) if rates else 0
+    new_repo_cost = estimate_requests(average_rate, config.activity_days, config.activity_days)
+
+    due = []
+    for position, repo in enumerate(repo_names):
+        entry = schedule.get(repo)
+        if entry is None:
+            due.append((math.inf, -position, repo, new_repo_cost))
+            continue
+        if entry["next_refresh_at"] > now:
+            continue
+        interval = max((entry["next_refresh_at"] - entry["refreshed_at"]).total_seconds(), 1)
+        elapsed = (now - entry["refreshed_at"]).total_seconds()
+        cost = estimate_requests(entry["commit_rate"], elapsed / 86400, config.activity_days)
+        due.append((elapsed / interval, -position, repo, cost))
+
+    due.sort(reverse=True)
+    selected = []
+    spent = 0
+    for _, _, repo, cost in due:
+        if config.refresh_request_budget and selected and spent + cost > config.refresh_request_budget:
+            continue
+        selected.append(repo)
+        spent += cost
+
+    logger.info(
+        f"К обновлению выбрано {len(selected)} из {len(repo_names)} репозиториев "
+        f"(срок наступил у {len(due)}, оценка запросов {spent})."
+    )
+    return selected
+
+
+async def select_due_repos(conn, repo_names: List[str], config: Config) -> List[str]:
+    """
+    Загружает расписание обновлений и выбирает репозитории к загрузке (см. plan_refresh).
+
+    :param conn: Соединение AsyncPG.
+    :param repo_names: Репозитории текущего топа в порядке позиций.
+    :param config: Конфигурация приложения.
+    :return: Список репозиториев к загрузке.
+    """
+    records = await conn.fetch(
+        """
+        SELECT repo, commit_rate, refreshed_at, next_refresh_at
+        FROM repo_refresh
+        WHERE repo = ANY($1::text[])
+        """,
+        repo_names,
+    )
+    schedule = {record["repo"]: dict(record) for record in records}
+    return plan_refresh(repo_names, schedule, datetime.now(timezone.utc), config)
+
+
+async def record_refreshes(conn, run_id: int, repo_names: List[str], config: Config) -> None:
+    """
+    Обновляет расписание по итогам запуска. Вызывается в транзакции публикации,
+    после переноса активности в activity и до удаления состояния запуска.
+
+    Темп коммитов считается по activity за последние config.refresh_rate_days дней,
+    следующий срок обновления — по refresh_interval. Репозитории, загрузить которые
+    не удалось, остаются в расписании со старым сроком и выбираются снова.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param repo_names: Репозитории текущего топа; расписание остальных удаляется.
+    :param config: Конфигурация приложения.
+    """
+    refreshed = await conn.fetch(
+        "SELECT repo, last_commit_at FROM parser_run_repos WHERE run_id = $1 AND status = $2",
+        run_id,
+        REPO_DONE,
+    )
+    commits = await conn.fetch(
+        """
+        SELECT repo, sum(commits) AS commits
+        FROM activity
+        WHERE repo = ANY($1::text[]) AND date > current_date - $2::int
+        GROUP BY repo
+        """,
+        [record["repo"] for record in refreshed],
+        config.refresh_rate_days,
+    )
+    totals = {record["repo"]: record["commits"] for record in commits}
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for record in refreshed:
+        rate = totals.get(record["repo"], 0) / max(config.refresh_rate_days, 1)
+        next_refresh_at = now + timedelta(hours=refresh_interval(rate, config))
+        rows.append((record["repo"], rate, record["last_commit_at"], now, next_refresh_at))
+
+    await conn.executemany(
+        """
+        INSERT INTO repo_refresh (repo, commit_rate, last_changed_at, refreshed_at, next_refresh_at)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (repo) DO UPDATE
+        SET commit_rate = EXCLUDED.commit_rate,
+            last_changed_at = GREATEST(repo_refresh.last_changed_at, EXCLUDED.last_changed_at),
+            refreshed_at = EXCLUDED.refreshed_at,
+            next_refresh_at = EXCLUDED.next_refresh_at;
+        """,
+        rows,
+    )
+    await conn.execute("DELETE FROM repo_refresh WHERE NOT (repo = ANY($1::text[]))", repo_names)
+    logger.info(f"Расписание обновлено для {len(rows)} репозиториев.")
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHED_HEADERS = ("ETag", "Last-Modified", "Link")
+
+
+class ResponseCache:
+    """
+    Дисковый кэш ответов GitHub API для условных запросов (If-None-Match / If-Modified-Since).
+
+    Каждая запись хранится в отдельном JSON-файле и содержит валидаторы ответа
+    и уже сжатый результат. Размер кэша ограничен, при превышении удаляются
+    записи, к которым дольше всего не обращались (LRU по времени модификации файла).
+
+    Ключ записи включает параметры запроса, поэтому 304 возможен только для повторного запроса
+    с теми же параметрами. Страницы коммитов запрашиваются с since, который в полном режиме
+    сдвигается каждый день вместе с окном активности, — для них кэш работает в пределах суток;
+    в инкрементальном режиме since стоит на месте, пока в репозитории нет новых коммитов.
+    Между вызовами облачной функции кэш сохраняется, только если GITHUB_CACHE_DIR указывает
+    на постоянное хранилище (в deploy_yc_function.sh — смонтированный бакет GITHUB_CACHE_BUCKET).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(
+            entry.stat().st_size for entry in os.scandir(cache_dir) if entry.name.endswith(".json")
+        )
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Формирует ключ записи по URL и параметрам запроса.
+        """
+        raw = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает запись кэша и отмечает её как недавно использованную.
+
+        :param key: Ключ записи.
+        :return: Словарь {"headers": {...}, "data": ...} или None, если записи нет.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Повреждённая запись кэша {path}: {e}")
+            return None
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Формирует заголовки условного запроса по записи кэша.
+        """
+        if not entry:
+            return {}
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def set(self, key: str, headers, data: Any) -> None:
+        """
+        Сохраняет ответ в кэш, если у него есть валидаторы, и при необходимости вытесняет старые записи.
+
+        :param key: Ключ записи.
+        :param headers: Заголовки ответа.
+        :param data: Сжатый результат разбора ответа.
+        """
+        stored_headers = {name: headers[name] for name in CACHED_HEADERS if headers.get(name)}
+        if "ETag" not in stored_headers and "Last-Modified" not in stored_headers:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"headers": stored_headers, "data": data}, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path) - old_size
+        except OSError as e:
+            logger.warning(f"Не удалось записать кэш {path}: {e}")
+            return
+
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Удаляет самые давно использованные записи, пока размер кэша превышает лимит.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+        self._size = total
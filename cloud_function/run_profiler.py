@@ -0,0 +1,178 @@
+import bisect
+import cProfile
+import json
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+SLOWEST_REPOS = 20
+
+
+class RunProfiler:
+    """
+    Замеры одного вызова парсера: суммарное время и число входов в каждую фазу,
+    задержка загрузки каждого репозитория и число запросов к GitHub по подписи запроса.
+
+    Фазы выполняются конкурентно, поэтому их время — сумма по всем задачам,
+    а не доля времени вызова.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.repo_seconds: Dict[str, float] = {}
+        self.requests: Dict[str, int] = {}
+        self.profile: Optional[cProfile.Profile] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Засекает время фазы на время блока with.
+
+        :param name: Название фазы.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Учитывает замер фазы, время которой нельзя охватить одним блоком with.
+
+        :param name: Название фазы.
+        :param seconds: Длительность в секундах.
+        """
+        stats = self.phases.setdefault(name, {"calls": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+
+    def record_repo(self, repo: str, seconds: float) -> None:
+        self.repo_seconds[repo] = self.repo_seconds.get(repo, 0.0) + seconds
+
+    def count_request(self, label: str) -> None:
+        self.requests[label] = self.requests.get(label, 0) + 1
+
+    def start_profile(self) -> None:
+        """
+        Включает детерминированный профилировщик cProfile до вызова report.
+        """
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def hotspots(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Самые затратные функции по собственному времени из cProfile.
+
+        :param limit: Количество функций.
+        :return: Список {function, calls, self_seconds, cumulative_seconds}.
+        """
+        if self.profile is None:
+            return []
+        self.profile.disable()
+        stats = pstats.Stats(self.profile).stats
+        top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "self_seconds": round(self_seconds, 6),
+                "cumulative_seconds": round(cumulative_seconds, 6),
+            }
+            for (filename, line, name), (_, calls, self_seconds, cumulative_seconds, _) in top
+        ]
+
+    def histogram(self) -> Dict[str, int]:
+        """
+        Гистограмма задержек загрузки репозиториев: {верхняя граница корзины в секундах: количество}.
+        """
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for seconds in self.repo_seconds.values():
+            counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        labels = [f"<={bound}" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}"]
+        return dict(zip(labels, counts))
+
+    def report(self, hotspots_limit: int = 0, **summary: Any) -> Dict[str, Any]:
+        """
+        Собирает машиночитаемый отчёт о вызове.
+
+        :param hotspots_limit: Сколько функций профилировщика включить в отчёт.
+        :param summary: Дополнительные поля отчёта (сводка вызова, статистика клиента).
+        :return: Словарь, сериализуемый в JSON.
+        """
+        slowest = sorted(self.repo_seconds.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_REPOS]
+        return {
+            **summary,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "phases": {
+                name: {"calls": stats["calls"], "seconds": round(stats["seconds"], 3)}
+                for name, stats in sorted(self.phases.items())
+            },
+            "repo_latency_histogram": self.histogram(),
+            "slowest_repos": [
+                {"repo": repo, "seconds": round(seconds, 3), "requests": self.requests.get(repo, 0)}
+                for repo, seconds in slowest
+            ],
+            "requests_by_label": dict(sorted(self.requests.items(), key=lambda item: item[1], reverse=True)),
+            "hotspots": self.hotspots(hotspots_limit),
+        }
+
+
+async def ensure_report_schema(conn) -> None:
+    """
+    Создаёт таблицу отчётов о вызовах парсера parser_run_reports.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS parser_run_reports (
+            id BIGSERIAL PRIMARY KEY,
+            run_id BIGINT,
+            worker_id TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            report JSONB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS parser_run_reports_created_at_idx ON parser_run_reports (created_at);
+    """)
+
+
+async def save_report_to_db(conn, report: Dict[str, Any]) -> None:
+    """
+    Сохраняет отчёт о вызове строкой parser_run_reports.
+
+    :param conn: Соединение AsyncPG.
+    :param report: Отчёт RunProfiler.report.
+    """
+    await ensure_report_schema(conn)
+    await conn.execute(
+        "INSERT INTO parser_run_reports (run_id, worker_id, report) VALUES ($1, $2, $3::jsonb)",
+        report.get("run_id"),
+        report["worker_id"],
+        json.dumps(report),
+    )
+
+
+def write_report_file(report_dir: str, report: Dict[str, Any]) -> str:
+    """
+    Записывает отчёт о вызове JSON-файлом в каталог отчётов.
+
+    :param report_dir: Каталог отчётов.
+    :param report: Отчёт RunProfiler.report.
+    :return: Путь к файлу.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    worker = report["worker_id"].replace(":", "_").replace("/", "_")
+    path = os.path.join(report_dir, f"run_{report.get('run_id')}_{worker}.json")
+    with open(path, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
+    return path
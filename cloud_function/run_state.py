@@ -0,0 +1,414 @@
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_ABANDONED = "abandoned"
+
+REPO_PENDING = "pending"
+REPO_DONE = "done"
+
+
+async def ensure_run_state_schema(conn) -> None:
+    """
+    Создаёт таблицы состояния запусков парсера: parser_runs и parser_run_repos.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS parser_runs (
+            run_id BIGSERIAL PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'running',
+            repositories JSONB NOT NULL,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        );
+        CREATE TABLE IF NOT EXISTS parser_run_repos (
+            run_id BIGINT NOT NULL REFERENCES parser_runs (run_id) ON DELETE CASCADE,
+            repo TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            rows INTEGER NOT NULL DEFAULT 0,
+            last_commit_at TIMESTAMPTZ,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (run_id, repo)
+        );
+        ALTER TABLE parser_run_repos
+            ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+            ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+    """)
+
+
+async def lock_runs(conn) -> None:
+    """
+    Берёт сессионную advisory-блокировку, под которой воркеры ищут или создают запуск,
+    чтобы одновременно стартовавшие воркеры не создали несколько запусков.
+
+    :param conn: Соединение AsyncPG.
+    """
+    await conn.execute("SELECT pg_advisory_lock(hashtext('parser_runs'))")
+
+
+async def unlock_runs(conn) -> None:
+    await conn.execute("SELECT pg_advisory_unlock(hashtext('parser_runs'))")
+
+
+async def find_active_run(conn, max_age_hours: float) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Ищет незавершённый запуск, который можно продолжить. Более старые незавершённые запуски
+    помечаются как брошенные.
+
+    :param conn: Соединение AsyncPG.
+    :param max_age_hours: Максимальный возраст запуска в часах, после которого он не продолжается.
+    :return: Кортеж (run_id, список репозиториев запуска) или None.
+    """
+    await conn.execute(
+        """
+        UPDATE parser_runs
+        SET status = $1, finished_at = now()
+        WHERE status = $2 AND started_at < now() - make_interval(secs => $3)
+        """,
+        RUN_ABANDONED,
+        RUN_RUNNING,
+        max_age_hours * 3600,
+    )
+    record = await conn.fetchrow(
+        """
+        SELECT run_id, repositories
+        FROM parser_runs
+        WHERE status = $1
+        ORDER BY run_id DESC
+        LIMIT 1
+        """,
+        RUN_RUNNING,
+    )
+    if record is None:
+        return None
+    return record["run_id"], json.loads(record["repositories"])
+
+
+async def create_run(conn, repositories: List[Dict[str, Any]], due: Optional[List[str]] = None) -> int:
+    """
+    Регистрирует новый запуск и его репозитории к загрузке в статусе pending.
+
+    :param conn: Соединение AsyncPG.
+    :param repositories: Список репозиториев из поиска GitHub.
+    :param due: Репозитории, активность которых нужно загрузить (по умолчанию все).
+    :return: Идентификатор запуска.
+    """
+    due = set(due) if due is not None else None
+    async with conn.transaction():
+        run_id = await conn.fetchval(
+            "INSERT INTO parser_runs (repositories) VALUES ($1::jsonb) RETURNING run_id",
+            json.dumps(repositories),
+        )
+        await conn.executemany(
+            "INSERT INTO parser_run_repos (run_id, repo, position) VALUES ($1, $2, $3)",
+            [
+                (run_id, repo["full_name"], position)
+                for position, repo in enumerate(repositories, start=1)
+                if due is None or repo["full_name"] in due
+            ],
+        )
+    logger.info(
+        f"Начат запуск {run_id}: {len(repositories)} репозиториев"
+        + (f", к загрузке {len(due)}." if due is not None else ".")
+    )
+    return run_id
+
+
+async def claim_repos(
+    conn,
+    run_id: int,
+    worker_id: str,
+    limit: int,
+    lease_seconds: float,
+    max_attempts: int,
+    staging_table: str,
+) -> List[str]:
+    """
+    Захватывает очередную порцию незавершённых репозиториев запуска в аренду воркера.
+
+    Свободными считаются репозитории без аренды или с истёкшей арендой, у которых
+    не исчерпаны попытки. Строки, оставленные в staging-таблице предыдущим владельцем,
+    удаляются в той же транзакции; при первой попытке строк быть не может, и удаление
+    выполняется только для повторно захваченных репозиториев (по индексу staging-таблицы на repo).
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param worker_id: Идентификатор воркера.
+    :param limit: Максимальное число репозиториев в порции.
+    :param lease_seconds: Срок аренды в секундах.
+    :param max_attempts: Максимальное число попыток загрузки репозитория.
+    :param staging_table: Имя staging-таблицы.
+    :return: Имена захваченных репозиториев в порядке позиций в топе.
+    """
+    async with conn.transaction():
+        records = await conn.fetch(
+            """
+            UPDATE parser_run_repos
+            SET lease_owner = $2,
+                lease_expires_at = now() + make_interval(secs => $3),
+                attempts = attempts + 1,
+                updated_at = now()
+            WHERE run_id = $1 AND repo IN (
+                SELECT repo
+                FROM parser_run_repos
+                WHERE run_id = $1
+                  AND status <> $4
+                  AND attempts < $5
+                  AND (lease_expires_at IS NULL OR lease_expires_at < now())
+                ORDER BY position
+                LIMIT $6
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING repo, position, attempts
+            """,
+            run_id,
+            worker_id,
+            lease_seconds,
+            REPO_DONE,
+            max_attempts,
+            limit,
+        )
+        records = sorted(records, key=lambda record: record["position"])
+        repos = [record["repo"] for record in records]
+        retried = [record["repo"] for record in records if record["attempts"] > 1]
+        if retried:
+            await conn.execute(f"DELETE FROM {staging_table} WHERE repo = ANY($1::text[])", retried)
+    return repos
+
+
+async def extend_leases(conn, run_id: int, worker_id: str, lease_seconds: float) -> None:
+    """
+    Продлевает аренду всех незавершённых репозиториев воркера (heartbeat).
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param worker_id: Идентификатор воркера.
+    :param lease_seconds: Срок аренды в секундах.
+    """
+    await conn.execute(
+        """
+        UPDATE parser_run_repos
+        SET lease_expires_at = now() + make_interval(secs => $3)
+        WHERE run_id = $1 AND lease_owner = $2 AND status <> $4
+        """,
+        run_id,
+        worker_id,
+        lease_seconds,
+        REPO_DONE,
+    )
+
+
+async def release_repos(conn, run_id: int, worker_id: str, repos: Optional[List[str]] = None) -> None:
+    """
+    Снимает аренду воркера с незавершённых репозиториев, чтобы их мог захватить другой воркер.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param worker_id: Идентификатор воркера.
+    :param repos: Репозитории, аренду которых нужно снять (по умолчанию все репозитории воркера).
+    """
+    await conn.execute(
+        """
+        UPDATE parser_run_repos
+        SET lease_owner = NULL, lease_expires_at = NULL, updated_at = now()
+        WHERE run_id = $1 AND lease_owner = $2 AND status <> $3
+          AND ($4::text[] IS NULL OR repo = ANY($4::text[]))
+        """,
+        run_id,
+        worker_id,
+        REPO_DONE,
+        repos,
+    )
+
+
+async def fetch_run_progress(conn, run_id: int, max_attempts: int) -> Dict[str, int]:
+    """
+    Подсчитывает незавершённые репозитории запуска.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param max_attempts: Максимальное число попыток загрузки репозитория.
+    :return: Словарь с ключами pending (можно захватить), leased (в аренде у воркеров)
+        и failed (попытки исчерпаны).
+    """
+    record = await conn.fetchrow(
+        """
+        SELECT
+            COUNT(*) FILTER (WHERE lease_expires_at >= now()) AS leased,
+            COUNT(*) FILTER (WHERE (lease_expires_at IS NULL OR lease_expires_at < now()) AND attempts < $3) AS pending,
+            COUNT(*) FILTER (WHERE (lease_expires_at IS NULL OR lease_expires_at < now()) AND attempts >= $3) AS failed
+        FROM parser_run_repos
+        WHERE run_id = $1 AND status <> $2
+        """,
+        run_id,
+        REPO_DONE,
+        max_attempts,
+    )
+    return {"pending": record["pending"], "leased": record["leased"], "failed": record["failed"]}
+
+
+async def reconcile_staging(conn, run_id: int, staging_table: str) -> None:
+    """
+    Проверяет staging-таблицу перед продолжением запуска.
+
+    Если строк в ней меньше, чем записано завершёнными репозиториями
+    (нежурналируемая таблица очищается при аварийном перезапуске PostgreSQL),
+    все репозитории возвращаются в pending.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param staging_table: Имя staging-таблицы.
+    """
+    async with conn.transaction():
+        expected = await conn.fetchval(
+            "SELECT COALESCE(SUM(rows), 0) FROM parser_run_repos WHERE run_id = $1 AND status = $2",
+            run_id,
+            REPO_DONE,
+        )
+        actual = await conn.fetchval(f"SELECT COUNT(*) FROM {staging_table}")
+        if actual < expected:
+            logger.warning(
+                f"Запуск {run_id}: в staging-таблице {actual} строк вместо {expected}, загрузка начнётся заново."
+            )
+            await conn.execute(f"TRUNCATE {staging_table}")
+            await conn.execute(
+                """
+                UPDATE parser_run_repos
+                SET status = $2, rows = 0, last_commit_at = NULL, attempts = 0,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE run_id = $1
+                """,
+                run_id,
+                REPO_PENDING,
+            )
+
+
+async def lock_owned_repos(conn, run_id: int, worker_id: str, repos: List[str]) -> List[str]:
+    """
+    Блокирует до конца транзакции репозитории, которые всё ещё арендованы воркером.
+    Строки репозиториев, аренду которых успел перехватить другой воркер, записывать нельзя.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param worker_id: Идентификатор воркера.
+    :param repos: Проверяемые репозитории.
+    :return: Репозитории, которыми воркер по-прежнему владеет.
+    """
+    records = await conn.fetch(
+        """
+        SELECT repo
+        FROM parser_run_repos
+        WHERE run_id = $1 AND lease_owner = $2 AND repo = ANY($3::text[])
+        FOR UPDATE
+        """,
+        run_id,
+        worker_id,
+        repos,
+    )
+    return [record["repo"] for record in records]
+
+
+async def mark_repos_done(
+    conn, run_id: int, worker_id: str, progress: Dict[str, Tuple[int, Optional[str]]]
+) -> None:
+    """
+    Отмечает арендованные воркером репозитории завершёнными.
+    Вызывается в той же транзакции, что и запись их последних строк.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :param worker_id: Идентификатор воркера.
+    :param progress: Словарь {repo: (число строк, время последнего коммита в формате ...Z или None)}.
+    """
+    await conn.executemany(
+        """
+        UPDATE parser_run_repos
+        SET status = $3, rows = $4, last_commit_at = $5,
+            lease_owner = NULL, lease_expires_at = NULL, updated_at = now()
+        WHERE run_id = $1 AND repo = $2 AND lease_owner = $6
+        """,
+        [
+            (
+                run_id,
+                repo,
+                REPO_DONE,
+                rows,
+                datetime.strptime(last_commit_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+                if last_commit_at
+                else None,
+                worker_id,
+            )
+            for repo, (rows, last_commit_at) in progress.items()
+        ],
+    )
+
+
+async def fetch_run_watermarks(conn, run_id: int) -> Dict[str, str]:
+    """
+    Собирает водяные знаки, накопленные запуском по всем его репозиториям.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :return: Словарь {repo: время последнего коммита в формате ...Z}.
+    """
+    records = await conn.fetch(
+        "SELECT repo, last_commit_at FROM parser_run_repos WHERE run_id = $1 AND last_commit_at IS NOT NULL",
+        run_id,
+    )
+    return {
+        record["repo"]: record["last_commit_at"].astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for record in records
+    }
+
+
+async def fetch_unfinished_repos(conn, run_id: int) -> List[str]:
+    """
+    Возвращает репозитории запуска, которые не завершены. При публикации это репозитории,
+    исчерпавшие попытки загрузки: их прежняя активность не должна удаляться.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :return: Имена репозиториев.
+    """
+    records = await conn.fetch(
+        "SELECT repo FROM parser_run_repos WHERE run_id = $1 AND status <> $2",
+        run_id,
+        REPO_DONE,
+    )
+    return [record["repo"] for record in records]
+
+
+async def lock_running_run(conn, run_id: int) -> bool:
+    """
+    Блокирует запись запуска до конца транзакции публикации.
+    Если несколько воркеров закончили одновременно, публикует только первый из них.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    :return: True, если запуск ещё не завершён и его результат нужно публиковать.
+    """
+    status = await conn.fetchval("SELECT status FROM parser_runs WHERE run_id = $1 FOR UPDATE", run_id)
+    return status == RUN_RUNNING
+
+
+async def complete_run(conn, run_id: int) -> None:
+    """
+    Помечает запуск завершённым. Вызывается в транзакции публикации результатов.
+
+    :param conn: Соединение AsyncPG.
+    :param run_id: Идентификатор запуска.
+    """
+    await conn.execute(
+        "UPDATE parser_runs SET status = $2, finished_at = now() WHERE run_id = $1",
+        run_id,
+        RUN_COMPLETED,
+    )
+    await conn.execute("DELETE FROM parser_run_repos WHERE run_id = $1", run_id)
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from config import Config
+from response_cache import ResponseCache
+from token_pool import TokenPool, request_resource
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """
+    Исключение, возникающее при исчерпании попыток из-за ограничений GitHub API.
+    """
+
+
+class RequestScheduler:
+    """
+    Общий планировщик запросов к GitHub API.
+
+    Ограничивает число одновременных запросов, выравнивает их темп с помощью
+    token bucket, учитывает заголовки X-RateLimit-Remaining, X-RateLimit-Reset
+    и Retry-After, а при ошибках повторяет запрос с экспоненциальной задержкой и джиттером.
+    Если настроен кэш ответов, каждый запрос отправляется как условный, а ответ 304
+    обслуживается из кэша.
+
+    Запросы распределяются по пулу токенов: лимиты темпа и параллельности задаются
+    на один токен и растут пропорционально их числу, а ограничение GitHub откладывает
+    только получивший его токен и только для исчерпанного ресурса (core, search, graphql).
+    """
+
+    def __init__(self, config: Config):
+        self.max_retries = config.github_max_retries
+        self.backoff_base = config.github_backoff_base
+        self.backoff_max = config.github_backoff_max
+        self.tokens = TokenPool(config.github_tokens)
+        self.rate = config.github_requests_per_second * len(self.tokens)
+        self.capacity = max(1.0, self.rate)
+
+        self._semaphore = asyncio.Semaphore(config.github_max_concurrency * len(self.tokens))
+        self._bucket_lock = asyncio.Lock()
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self.cache = (
+            ResponseCache(config.github_cache_dir, config.github_cache_max_bytes)
+            if config.github_cache_dir
+            else None
+        )
+
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttle_delay = 0.0
+
+    async def _acquire_token(self) -> None:
+        """
+        Забирает токен из token bucket, при необходимости дожидаясь его пополнения.
+        """
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await self._sleep((1 - self._tokens) / self.rate)
+
+    async def _sleep(self, delay: float) -> None:
+        self.throttle_delay += delay
+        await asyncio.sleep(delay)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """
+        Экспоненциальная задержка с полным джиттером.
+
+        :param attempt: Номер попытки, начиная с 1.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _rate_limit_delay(headers) -> Optional[float]:
+        """
+        Вычисляет, сколько нужно ждать по заголовкам ответа GitHub.
+
+        :return: Задержка в секундах или None, если ограничение не достигнуто.
+        """
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+
+        if headers.get("X-RateLimit-Remaining") == "0":
+            reset = headers.get("X-RateLimit-Reset")
+            if reset is not None:
+                return max(0.0, float(reset) - time.time()) + 1
+        return None
+
+    async def get_json(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        label: str = "",
+        compact: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+    ) -> Tuple[Any, Dict[str, str]]:
+        """
+        Выполняет GET-запрос через планировщик.
+
+        :param session: Сессия AIOHTTP.
+        :param url: URL запроса.
+        :param headers: Заголовки запроса.
+        :param params: Параметры запроса.
+        :param label: Подпись запроса для логирования (например, имя репозитория).
+        :param compact: Функция, оставляющая в ответе только нужные поля; её результат попадает в кэш.
+        :param decode: Собственный разбор тела ответа вместо response.json() (например, потоковый).
+        :return: Кортеж (разобранный и сжатый JSON, заголовки ответа).
+        :raises RateLimitExceeded: Если лимит GitHub API не удалось переждать за отведённые попытки.
+        :raises aiohttp.ClientError: При неустранимой ошибке запроса.
+        """
+        return await self.request_json(
+            session, "GET", url, headers=headers, params=params, label=label, compact=compact, decode=decode
+        )
+
+    async def post_json(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        json_body: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        label: str = "",
+    ) -> Tuple[Any, Dict[str, str]]:
+        """
+        Выполняет POST-запрос с JSON-телом через планировщик (например, к GraphQL API).
+        Такие ответы не кэшируются.
+
+        :param session: Сессия AIOHTTP.
+        :param url: URL запроса.
+        :param json_body: Тело запроса.
+        :param headers: Заголовки запроса.
+        :param label: Подпись запроса для логирования.
+        :return: Кортеж (разобранный JSON, заголовки ответа).
+        """
+        return await self.request_json(session, "POST", url, headers=headers, json_body=json_body, label=label)
+
+    async def request_json(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Dict[str, Any]] = None,
+        label: str = "",
+        compact: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+    ) -> Tuple[Any, Dict[str, str]]:
+        """
+        Выполняет запрос через планировщик: ожидание токена, ограничение параллельности,
+        обработка лимитов GitHub API и повторы. GET-запросы обслуживаются кэшем ответов.
+        """
+        use_cache = self.cache is not None and method == "GET"
+        cache_key = self.cache.make_key(url, params) if use_cache else None
+        cached = self.cache.get(cache_key) if use_cache else None
+        if cached:
+            headers = {**(headers or {}), **self.cache.conditional_headers(cached)}
+
+        resource = request_resource(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._acquire_token()
+            token = await self.tokens.acquire(resource)
+            response_headers = None
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    async with session.request(
+                        method, url, headers={**(headers or {}), **token.headers}, params=params, json=json_body
+                    ) as response:
+                        logger.info(f"Выполняется запрос к API для {label}. URL: {response.url}")
+                        response_headers = response.headers
+                        delay = self._rate_limit_delay(response.headers)
+
+                        if response.status in (403, 429) and delay is not None:
+                            self.throttled += 1
+                            retry_after = delay
+                            if attempt > self.max_retries:
+                                raise RateLimitExceeded(f"Превышен лимит запросов GitHub API для {label}.")
+                            self.retries += 1
+                            logger.warning(
+                                f"Лимит запросов GitHub API для {label} (токен {token.name}), "
+                                f"токен отложен на {delay:.1f} с. Попытка {attempt} из {self.max_retries}."
+                            )
+                            continue
+
+                        if response.status == 304 and cached:
+                            self.cache.hits += 1
+                            return cached["data"], cached["headers"]
+
+                        if response.status < 500 or attempt > self.max_retries:
+                            response.raise_for_status()
+                            data = await decode(response) if decode is not None else await response.json()
+                            if compact is not None:
+                                data = compact(data)
+                            retry_after = delay
+                            if use_cache and response.status == 200:
+                                self.cache.misses += 1
+                                self.cache.set(cache_key, response.headers, data)
+                            return data, dict(response.headers)
+
+                        error = f"ошибка сервера {response.status}"
+            except aiohttp.ClientResponseError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt > self.max_retries:
+                    raise
+                error = f"ошибка соединения {e!r}"
+            finally:
+                self.tokens.release(token, response_headers, retry_after, resource)
+
+            self.retries += 1
+            backoff = self._backoff_delay(attempt)
+            logger.warning(
+                f"Запрос для {label} завершился неудачно ({error}). Повтор через {backoff:.1f} с. "
+                f"Попытка {attempt} из {self.max_retries}."
+            )
+            await self._sleep(backoff)
+
+    def log_stats(self) -> None:
+        """
+        Записывает в лог статистику запуска: пропускную способность, задержки и повторы.
+        """
+        elapsed = time.monotonic() - self.started_at
+        throughput = self.requests / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Статистика запросов к GitHub API: запросов {self.requests}, "
+            f"{throughput:.2f} запр/с, повторов {self.retries}, "
+            f"ответов об ограничении {self.throttled}, "
+            f"суммарная задержка на ограничения {self.throttle_delay:.1f} с, "
+            f"время работы {elapsed:.1f} с."
+        )
+        if self.cache:
+            logger.info(
+                f"Кэш ответов GitHub API: не изменилось (304) {self.cache.hits}, "
+                f"загружено заново {self.cache.misses}."
+            )
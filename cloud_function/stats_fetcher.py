@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from github_client import GitHubClient
+
+logger = logging.getLogger(__name__)
+
+
+def poll_delay(attempt: int, interval: float, max_interval: float) -> float:
+    """
+    Задержка перед очередным опросом статистики: интервал удваивается с каждой попыткой.
+
+    :param attempt: Номер опроса, начиная с 1.
+    """
+    return min(max_interval, interval * 2 ** (attempt - 1))
+
+
+def daily_commits(weeks: List[Dict[str, Any]], start_date: date, end_date: date) -> Dict[str, int]:
+    """
+    Разворачивает недельную статистику /stats/commit_activity в количество коммитов по дням.
+
+    :param weeks: Ответ эндпоинта: недели с полями week (начало недели, Unix time) и days (7 чисел).
+    :param start_date: Начальная дата интервала.
+    :param end_date: Конечная дата интервала.
+    :return: Словарь {YYYY-MM-DD: количество коммитов} только для дней с коммитами.
+    """
+    result = {}
+    for week in weeks:
+        week_start = datetime.fromtimestamp(week["week"], tz=timezone.utc).date()
+        for offset, commits in enumerate(week.get("days") or []):
+            day = week_start + timedelta(days=offset)
+            if commits and start_date <= day <= end_date:
+                result[day.isoformat()] = commits
+    return result
+
+
+async def decode_stats_response(response) -> Dict[str, Any]:
+    """
+    Разбирает ответ эндпоинта статистики, сохраняя код ответа: 202 означает, что статистика
+    ещё считается, 204 — что у репозитория нет коммитов.
+
+    :param response: Ответ AIOHTTP.
+    :return: Словарь {"status": код ответа, "weeks": список недель или None}.
+    """
+    weeks = await response.json() if response.status == 200 else None
+    return {"status": response.status, "weeks": weeks if isinstance(weeks, list) else None}
+
+
+async def fetch_commit_activity(
+    client: GitHubClient, repo_names: List[str]
+) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+    """
+    Загружает годовую статистику коммитов /stats/commit_activity для пакета репозиториев.
+
+    Пока GitHub считает статистику, он отвечает 202. Все репозитории пакета запрашиваются
+    параллельно, неготовые опрашиваются повторно по расписанию с удваивающимся интервалом.
+    Ожидание занимает только этот пакет: остальные загрузчики конвейера продолжают работу.
+
+    :param client: Клиент GitHub API.
+    :param repo_names: Полные имена репозиториев (owner/repo).
+    :return: Словарь {repo: список недель или None, если статистику получить не удалось}.
+    """
+    config = client.config
+    result: Dict[str, Optional[List[Dict[str, Any]]]] = {repo: None for repo in repo_names}
+
+    async def fetch_one(repo: str) -> bool:
+        url = f"{config.github_api_url}/repos/{repo}/stats/commit_activity"
+        try:
+            data, _ = await client.get_json(url, label=f"{repo} (статистика)", decode=decode_stats_response)
+        except Exception as e:
+            logger.error(f"Не удалось получить статистику коммитов для {repo}: {e}")
+            return True
+        if data["status"] == 202:
+            return False
+        if data["status"] == 204:
+            result[repo] = []
+        elif data["weeks"] is not None:
+            result[repo] = data["weeks"]
+        return True
+
+    pending = list(repo_names)
+    attempt = 0
+    while pending:
+        attempt += 1
+        done = await asyncio.gather(*(fetch_one(repo) for repo in pending))
+        pending = [repo for repo, finished in zip(pending, done) if not finished]
+        if not pending:
+            break
+        if attempt >= config.stats_poll_attempts:
+            logger.warning(f"Статистика не готова после {attempt} опросов: {', '.join(pending)}.")
+            break
+        delay = poll_delay(attempt, config.stats_poll_interval, config.stats_poll_max_interval)
+        logger.info(f"Статистика GitHub ещё считается для {len(pending)} репозиториев, повтор через {delay:.0f} с.")
+        await asyncio.sleep(delay)
+
+    return result
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT = 5000
+DEFAULT_RATE_LIMITS = {"core": 5000, "search": 30, "graphql": 5000}
+
+
+def request_resource(url: str) -> str:
+    """
+    Определяет квоту GitHub API (X-RateLimit-Resource), которую расходует запрос.
+
+    :param url: URL запроса.
+    :return: search, graphql или core.
+    """
+    path = urlparse(str(url)).path
+    if path.startswith("/search/"):
+        return "search"
+    if path.rstrip("/").endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class RateLimitBudget:
+    """
+    Квота одного токена по одному ресурсу GitHub API: остаток, время сброса и откладывание.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.parked_until = 0.0
+        self.in_flight = 0
+
+
+class TokenState:
+    """
+    Состояние одного токена GitHub: квоты по ресурсам (core, search, graphql) и статистика использования.
+    """
+
+    def __init__(self, token: Optional[str], index: int):
+        self.token = token
+        self.name = f"#{index} (...{token[-4:]})" if token else f"#{index} (без токена)"
+        self.budgets: Dict[str, RateLimitBudget] = {}
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"token {self.token}"} if self.token else {}
+
+    def budget(self, resource: str) -> RateLimitBudget:
+        if resource not in self.budgets:
+            self.budgets[resource] = RateLimitBudget(DEFAULT_RATE_LIMITS.get(resource, DEFAULT_RATE_LIMIT))
+        return self.budgets[resource]
+
+
+class TokenPool:
+    """
+    Пул токенов GitHub API.
+
+    Квоты GitHub раздельны для ресурсов core, search и graphql, поэтому каждый токен хранит
+    остаток, время сброса и откладывание по каждому ресурсу (заголовок X-RateLimit-Resource).
+    Запрос получает токен с наибольшим остатком квоты своего ресурса. Исчерпанная квота
+    или Retry-After откладывает токен только для этого ресурса, а запросы идут через остальные
+    токены. Если для ресурса отложены все токены, запрос ждёт ближайшего освобождения.
+    """
+
+    def __init__(self, tokens: List[Optional[str]]):
+        self.tokens = [TokenState(token, index) for index, token in enumerate(tokens or [None], start=1)]
+        self.wait_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _available(self, now: float, resource: str) -> List[TokenState]:
+        available = []
+        for state in self.tokens:
+            budget = state.budget(resource)
+            if budget.parked_until > now:
+                continue
+            if budget.remaining <= 0 and budget.reset_at <= time.time():
+                budget.remaining = budget.limit
+                budget.reset_at = 0.0
+            if budget.remaining > 0:
+                available.append(state)
+        return available
+
+    async def acquire(self, resource: str = "core") -> TokenState:
+        """
+        Выдаёт токен с наибольшим остатком квоты ресурса, при необходимости дожидаясь освобождения.
+
+        :param resource: Ресурс GitHub API, квоту которого расходует запрос (request_resource).
+        :return: Состояние выбранного токена. После ответа его нужно передать в release с тем же ресурсом.
+        """
+        while True:
+            now = time.monotonic()
+            available = self._available(now, resource)
+            if available:
+                state = max(
+                    available,
+                    key=lambda item: (
+                        item.budget(resource).remaining - item.budget(resource).in_flight,
+                        -item.in_flight,
+                    ),
+                )
+                state.budget(resource).in_flight += 1
+                state.in_flight += 1
+                state.requests += 1
+                return state
+
+            delay = min(self._free_in(state.budget(resource), now) for state in self.tokens)
+            logger.warning(f"Все токены GitHub исчерпаны для {resource}, ожидание {delay:.1f} с.")
+            self.wait_seconds += delay
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _free_in(budget: RateLimitBudget, now: float) -> float:
+        if budget.parked_until > now:
+            return budget.parked_until - now
+        return max(0.0, budget.reset_at - time.time()) + 1
+
+    def release(
+        self, state: TokenState, headers=None, retry_after: Optional[float] = None, resource: str = "core"
+    ) -> None:
+        """
+        Возвращает токен в пул, обновляя квоту ресурса по заголовкам ответа.
+        Ресурс берётся из заголовка X-RateLimit-Resource, а без него — ресурс запроса.
+
+        :param state: Состояние токена, выданного acquire.
+        :param headers: Заголовки ответа (None, если ответ не получен).
+        :param retry_after: Задержка, на которую токен нужно отложить для ресурса (ответ об ограничении).
+        :param resource: Ресурс, переданный в acquire.
+        """
+        state.in_flight -= 1
+        state.budget(resource).in_flight -= 1
+        if headers is not None and headers.get("X-RateLimit-Resource"):
+            resource = headers["X-RateLimit-Resource"]
+        budget = state.budget(resource)
+        if headers is not None:
+            if headers.get("X-RateLimit-Limit") is not None:
+                budget.limit = int(headers["X-RateLimit-Limit"])
+            if headers.get("X-RateLimit-Remaining") is not None:
+                budget.remaining = int(headers["X-RateLimit-Remaining"])
+            if headers.get("X-RateLimit-Reset") is not None:
+                budget.reset_at = float(headers["X-RateLimit-Reset"])
+
+        if retry_after is not None:
+            state.throttled += 1
+            budget.parked_until = max(budget.parked_until, time.monotonic() + retry_after)
+            logger.warning(f"Токен {state.name} отложен для {resource} на {retry_after:.1f} с.")
+
+    def log_usage(self) -> None:
+        """
+        Записывает в лог использование каждого токена: запросы, ограничения и остаток квоты.
+        """
+        for state in self.tokens:
+            budgets = []
+            for resource, budget in sorted(state.budgets.items()):
+                reset = time.strftime("%H:%M:%S", time.localtime(budget.reset_at)) if budget.reset_at else "-"
+                budgets.append(f"{resource} {budget.remaining} из {budget.limit} (сброс в {reset})")
+            logger.info(
+                f"Токен {state.name}: запросов {state.requests}, ответов об ограничении {state.throttled}, "
+                f"остаток квоты: {', '.join(budgets) or '-'}."
+            )
+        if self.wait_seconds:
+            logger.info(f"Ожидание освобождения токенов: {self.wait_seconds:.1f} с.")
@@ -67,7 +67,7 @@ fi
 
 if [ -d "cloud_function" ]; then
   cd cloud_function || exit
-  if ! zip -r "${FUNCTION_NAME}.zip" github_parser.py requirements.txt; then
+  if ! zip -r "${FUNCTION_NAME}.zip" github_parser.py config.py scheduler.py response_cache.py graphql_fetcher.py pipeline.py github_client.py commit_decoder.py run_state.py token_pool.py author_dictionary.py stats_fetcher.py refresh_schedule.py run_profiler.py data_versions.py activity_rollups.py requirements.txt; then
     echo "Ошибка: не удалось создать архив ${FUNCTION_NAME}.zip."
     exit 1
   fi
@@ -101,6 +101,21 @@ else
 fi
 
 
+# Кэш ответов GitHub API переживает вызовы функции, только если лежит в постоянном хранилище:
+# при заданном GITHUB_CACHE_BUCKET бакет монтируется в /function/storage/github_cache.
+# Иначе кэш хранится в /tmp и живёт, пока жив экземпляр функции.
+CACHE_ARGS=()
+if [ -n "$GITHUB_CACHE_BUCKET" ]; then
+  CACHE_ARGS=(
+    --storage-mounts "mount-point-name=github_cache,bucket=${GITHUB_CACHE_BUCKET},prefix=github_cache,read-only=false"
+    --environment GITHUB_CACHE_DIR="/function/storage/github_cache"
+  )
+  echo "Кэш ответов GitHub API хранится в бакете $GITHUB_CACHE_BUCKET."
+else
+  CACHE_ARGS=(--environment GITHUB_CACHE_DIR="${GITHUB_CACHE_DIR:-/tmp/github_cache}")
+fi
+
+
 if ! yc serverless function version create \
   --function-name "$FUNCTION_NAME" \
   --runtime python312 \
@@ -113,6 +128,7 @@ if ! yc serverless function version create \
   --environment POSTGRES_PASSWORD="$POSTGRES_PASSWORD" \
   --environment POSTGRES_DB="$POSTGRES_DB" \
   --environment POSTGRES_PORT="$POSTGRES_PORT" \
+  "${CACHE_ARGS[@]}" \
   --package-bucket-name "$BUCKET_NAME" \
   --package-object-name "${FUNCTION_NAME}.zip"; then
   echo "Ошибка: не удалось создать новую версию функции $FUNCTION_NAME."
@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock, MagicMock
+from datetime import date
+import pytest
+from cloud_function.activity_rollups import ensure_rollup_schema, refresh_rollups
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.transaction.return_value = AsyncMock()
+    conn.execute = AsyncMock()
+    conn.fetchval = AsyncMock()
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_refresh_rollups_rebuilds_changed_repos():
+    conn = make_conn()
+
+    await refresh_rollups(conn, 5, date(2024, 11, 6))
+
+    rebuild_delete, retention_delete, insert_call = conn.execute.call_args_list
+    assert "DELETE FROM activity_rollups" in rebuild_delete[0][0]
+    assert "FROM activity_versions WHERE version = $1::bigint" in rebuild_delete[0][0]
+    assert rebuild_delete[0][1] == 5
+    assert "r.period_start < $1::date" in retention_delete[0][0]
+    assert retention_delete[0][1] == date(2024, 11, 6)
+    assert "INSERT INTO activity_rollups" in insert_call[0][0]
+    assert insert_call[0][1:] == (5, ["week", "month"], date(2024, 11, 6))
+
+
+@pytest.mark.asyncio
+async def test_refresh_rollups_after_merge_rebuilds_from_first_staged_day():
+    conn = make_conn()
+
+    await refresh_rollups(conn, 5, date(2024, 11, 6), "activity_stream_staging")
+
+    rebuild_delete, _, insert_call = conn.execute.call_args_list
+    for call in (rebuild_delete, insert_call):
+        assert "min(date) AS first_day FROM activity_stream_staging" in call[0][0]
+    assert "r.period_start >= date_trunc(r.granularity, c.first_day)::date" in rebuild_delete[0][0]
+    assert "a.date >= date_trunc(g.granularity, c.first_day)::date" in insert_call[0][0]
+
+
+@pytest.mark.asyncio
+async def test_ensure_rollup_schema_backfills_existing_activity():
+    conn = make_conn()
+    conn.fetchval.return_value = True
+
+    await ensure_rollup_schema(conn)
+
+    assert conn.execute.call_count == 4
+    assert conn.execute.call_args_list[3][0][1:] == (None, ["week", "month"], None)
@@ -0,0 +1,67 @@
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from app.database.cache import ResponseCache
+
+
+def test_response_cache_expires_by_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.database.cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache("top100_changed", ttl=60)
+
+    cache.set(("stars", "desc", 100), b"[]")
+    assert cache.get(("stars", "desc", 100)) == b"[]"
+
+    now[0] += 60
+    assert cache.get(("stars", "desc", 100)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_response_cache_cleared_by_notification():
+    cache = ResponseCache("top100_changed", ttl=60)
+    cache.set(("stars", "desc", 100), b"[]")
+
+    cache._on_notify(None, 1, "top100_changed", "7")
+
+    assert cache.get(("stars", "desc", 100)) is None
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache("top100_changed", ttl=60, max_entries=2)
+    cache.set(("stars", "desc", 1), b"1")
+    cache.set(("stars", "desc", 2), b"2")
+    cache.get(("stars", "desc", 1))
+
+    cache.set(("stars", "desc", 3), b"3")
+
+    assert list(cache.entries) == [("stars", "desc", 1), ("stars", "desc", 3)]
+
+
+def test_response_cache_skips_response_read_before_notification():
+    cache = ResponseCache("top100_changed", ttl=60)
+    generation = cache.generation
+
+    cache._on_notify(None, 1, "top100_changed", "8")
+    cache.set(("stars", "desc", 100), b"[]", generation)
+
+    assert cache.get(("stars", "desc", 100)) is None
+
+
+@pytest.mark.asyncio
+async def test_response_cache_bypassed_and_reconnected_after_listen_connection_loss(monkeypatch):
+    connection = MagicMock()
+    connection.add_listener = AsyncMock()
+    connect = AsyncMock(return_value=connection)
+    monkeypatch.setattr("app.database.cache.asyncpg.connect", connect)
+    monkeypatch.setattr("app.database.cache.asyncio.sleep", AsyncMock())
+    cache = ResponseCache("top100_changed", ttl=60)
+    await cache.listen("postgresql://db")
+    cache.set(("stars", "desc", 100), b"[]")
+
+    cache._on_terminate(connection)
+    cache.set(("stars", "desc", 100), b"[]")
+    assert cache.get(("stars", "desc", 100)) is None
+
+    await cache.reconnect_task
+    assert connect.await_count == 2
+    cache.set(("stars", "desc", 100), b"[]")
+    assert cache.get(("stars", "desc", 100)) == b"[]"
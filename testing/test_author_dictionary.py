@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, MagicMock
+from datetime import date
+import pytest
+from cloud_function.author_dictionary import AuthorDictionary
+
+
+@pytest.mark.asyncio
+async def test_encode_resolves_known_and_new_names():
+    conn = MagicMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [{"id": 1, "name": "Author1"}],
+        [{"id": 7, "name": "Author2"}],
+    ])
+    authors = AuthorDictionary()
+
+    encoded = await authors.encode(conn, [
+        ("owner/repo", date(2024, 11, 1), 3, ["Author2", "Author1"]),
+        ("owner/repo", date(2024, 11, 2), 1, ["Author1"]),
+    ])
+
+    assert encoded == [
+        ("owner/repo", date(2024, 11, 1), 3, [7, 1]),
+        ("owner/repo", date(2024, 11, 2), 1, [1]),
+    ]
+    assert conn.fetch.call_args_list[0][0][1] == ["Author1", "Author2"]
+    assert "INSERT INTO authors" in conn.fetch.call_args_list[1][0][0]
+    assert conn.fetch.call_args_list[1][0][1] == ["Author2"]
+
+
+@pytest.mark.asyncio
+async def test_resolve_uses_cache_within_run():
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[{"id": 1, "name": "Author1"}])
+    authors = AuthorDictionary()
+
+    await authors.resolve(conn, ["Author1"])
+    await authors.resolve(conn, ["Author1"])
+
+    assert conn.fetch.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_encode_skips_null_names():
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[{"id": 1, "name": "Author1"}])
+    authors = AuthorDictionary()
+
+    encoded = await authors.encode(conn, [("owner/repo", date(2024, 11, 1), 2, ["Author1", None])])
+
+    assert encoded == [("owner/repo", date(2024, 11, 1), 2, [1])]
+    assert conn.fetch.call_args_list[0][0][1] == ["Author1"]
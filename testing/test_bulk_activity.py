@@ -0,0 +1,141 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+import json
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.database.utils import get_db_pool
+from app.routers import activity
+from app.routers.activity import MAX_BULK_REPOS, encode_bulk_activity, parse_bulk_repos
+
+ROWS = [
+    ("owner/a", {"date": date(2024, 11, 1), "commits": 3, "authors": ["alice"]}),
+    ("owner/a", {"date": date(2024, 11, 2), "commits": 1, "authors": ["bob"]}),
+    ("owner/b", {"date": date(2024, 11, 1), "commits": 2, "authors": []}),
+]
+
+
+async def stream(rows):
+    for row in rows:
+        yield row[0], dict(row[1])
+
+
+async def collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.parametrize("repos", [",", " , "])
+def test_parse_bulk_repos_rejects_empty_list(repos):
+    with pytest.raises(HTTPException) as err:
+        parse_bulk_repos(repos, None)
+    assert err.value.status_code == 400
+
+
+def test_parse_bulk_repos_rejects_too_many_repos():
+    repos = ",".join(f"owner/repo{i}" for i in range(MAX_BULK_REPOS + 1))
+
+    with pytest.raises(HTTPException) as err:
+        parse_bulk_repos(repos, None)
+    assert err.value.status_code == 400
+
+
+def test_parse_bulk_repos_drops_duplicates():
+    assert parse_bulk_repos("owner/b, owner/a,owner/b", None) == ["owner/b", "owner/a"]
+
+
+def test_parse_bulk_repos_requires_exactly_one_selector():
+    with pytest.raises(HTTPException):
+        parse_bulk_repos(None, None)
+    with pytest.raises(HTTPException):
+        parse_bulk_repos("owner/a", 10)
+
+
+@pytest.mark.asyncio
+async def test_encode_bulk_activity_groups_rows_by_repo():
+    body = json.loads(await collect(encode_bulk_activity(stream(ROWS))))
+
+    assert body == {
+        "owner/a": [
+            {"date": "2024-11-01", "commits": 3, "authors": ["alice"]},
+            {"date": "2024-11-02", "commits": 1, "authors": ["bob"]},
+        ],
+        "owner/b": [{"date": "2024-11-01", "commits": 2, "authors": []}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_encode_bulk_activity_without_rows():
+    assert await collect(encode_bulk_activity(stream([]))) == b"{}"
+
+
+@pytest.mark.asyncio
+async def test_encode_bulk_activity_splits_large_bodies_into_chunks(monkeypatch):
+    monkeypatch.setattr(activity, "STREAM_CHUNK_BYTES", 64)
+    rows = [("owner/a", {"date": date(2024, 11, day), "commits": day, "authors": []}) for day in range(1, 11)]
+
+    chunks = [chunk async for chunk in encode_bulk_activity(stream(rows))]
+
+    assert len(chunks) > 1
+    assert len(json.loads(b"".join(chunks))["owner/a"]) == 10
+
+
+def make_client(monkeypatch, rows):
+    app = FastAPI()
+    app.include_router(activity.router, prefix="/api/repos")
+    app.dependency_overrides[get_db_pool] = lambda: MagicMock()
+    monkeypatch.setattr(activity, "fetch_data_versions", AsyncMock(return_value={"activity": 4, "top100": 2}))
+    stream_bulk_activity = MagicMock(side_effect=lambda *args, **kwargs: stream(rows))
+    monkeypatch.setattr(activity, "stream_bulk_activity", stream_bulk_activity)
+    return TestClient(app), stream_bulk_activity
+
+
+def test_bulk_activity_omits_unknown_repos(monkeypatch):
+    client, stream_bulk_activity = make_client(monkeypatch, ROWS[:2])
+
+    response = client.get(
+        "/api/repos/activity",
+        params={"repos": "owner/a,owner/unknown,owner/a", "start_date": "2024-11-01", "end_date": "2024-11-02"},
+    )
+
+    assert response.status_code == 200
+    assert list(response.json()) == ["owner/a"]
+    assert stream_bulk_activity.call_args[1]["repos"] == ["owner/a", "owner/unknown"]
+
+
+def test_bulk_activity_returns_304_for_matching_etag(monkeypatch):
+    client, stream_bulk_activity = make_client(monkeypatch, ROWS)
+    params = {"top_n": 10, "start_date": "2024-11-01", "end_date": "2024-11-02"}
+
+    etag = client.get("/api/repos/activity", params=params).headers["etag"]
+    response = client.get("/api/repos/activity", params=params, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert stream_bulk_activity.call_count == 1
+
+
+async def failing_stream(rows):
+    for row in rows:
+        yield row[0], dict(row[1])
+    raise ConnectionError("connection lost")
+
+
+def test_bulk_activity_returns_500_when_query_fails(monkeypatch):
+    client, stream_bulk_activity = make_client(monkeypatch, [])
+    stream_bulk_activity.side_effect = lambda *args, **kwargs: failing_stream([])
+
+    response = client.get(
+        "/api/repos/activity", params={"top_n": 10, "start_date": "2024-11-01", "end_date": "2024-11-02"}
+    )
+
+    assert response.status_code == 500
+
+
+def test_bulk_activity_aborts_stream_failing_after_first_chunk(monkeypatch):
+    monkeypatch.setattr(activity, "STREAM_CHUNK_BYTES", 64)
+    client, stream_bulk_activity = make_client(monkeypatch, [])
+    rows = [("owner/a", {"date": date(2024, 11, day), "commits": day, "authors": []}) for day in range(1, 11)]
+    stream_bulk_activity.side_effect = lambda *args, **kwargs: failing_stream(rows)
+
+    with pytest.raises(ConnectionError):
+        client.get("/api/repos/activity", params={"top_n": 10, "start_date": "2024-11-01", "end_date": "2024-11-30"})
@@ -0,0 +1,48 @@
+import json
+from cloud_function import commit_decoder
+from cloud_function.commit_decoder import decode_commit_page_bytes
+from cloud_function.github_parser import aggregate_commits
+from datetime import date
+
+BODY = json.dumps([
+    {
+        "sha": "abc",
+        "commit": {
+            "author": {"name": "Author1", "email": "a@example.com", "date": "2024-11-01T10:00:00Z"},
+            "committer": {"name": "GitHub", "email": "noreply@github.com", "date": "2024-11-03T08:00:00Z"},
+            "tree": {"sha": "def"},
+            "verification": {"verified": False},
+        },
+        "parents": [],
+    },
+    {"sha": "ghi", "commit": {"author": None, "committer": None}},
+]).encode()
+
+EXPECTED = [
+    {
+        "commit": {
+            "author": {"name": "Author1", "date": "2024-11-01T10:00:00Z"},
+            "committer": {"date": "2024-11-03T08:00:00Z"},
+        }
+    },
+    {},
+]
+
+
+def test_decode_commit_page_bytes_keeps_only_author_and_committer_date():
+    assert decode_commit_page_bytes(BODY) == EXPECTED
+
+
+def test_decode_commit_page_bytes_without_ijson(monkeypatch):
+    monkeypatch.setattr(commit_decoder, "ijson", None)
+
+    assert decode_commit_page_bytes(BODY) == EXPECTED
+
+
+def test_watermark_follows_committer_date():
+    activity = {}
+
+    aggregate_commits(EXPECTED[:1], activity, date(2024, 10, 1), date(2024, 11, 30), "owner/repo")
+
+    assert list(activity) == ["2024-11-01"]
+    assert activity["2024-11-01"]["last_commit_at"] == "2024-11-03T08:00:00Z"
@@ -0,0 +1,35 @@
+from unittest.mock import AsyncMock, MagicMock
+from datetime import date
+import pytest
+from cloud_function.data_versions import bump_activity_versions
+
+
+def make_conn(version):
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.fetchval = AsyncMock(return_value=version)
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_bump_activity_versions_for_merge():
+    conn = make_conn(5)
+
+    version = await bump_activity_versions(conn, "staging", ["owner/repo"], date(2024, 10, 3))
+
+    assert version == 5
+    upsert_call, delete_call = conn.execute.call_args_list
+    assert upsert_call[0][1:] == (5, date(2024, 10, 3))
+    assert delete_call[0] == ("DELETE FROM activity_versions WHERE NOT (repo = ANY($1::text[]))", ["owner/repo"])
+
+
+@pytest.mark.asyncio
+async def test_bump_activity_versions_for_replace():
+    conn = make_conn(6)
+
+    await bump_activity_versions(conn, "staging", keep_repos=["owner/failed"])
+
+    upsert_call, delete_call = conn.execute.call_args_list
+    assert upsert_call[0][1:] == (6, None)
+    assert "repo NOT IN (SELECT repo FROM staging) AND NOT (repo = ANY($1::text[]))" in delete_call[0][0]
+    assert delete_call[0][1] == ["owner/failed"]
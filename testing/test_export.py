@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+from contextlib import asynccontextmanager
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.database.utils import get_db_pool
+from app.routers import export
+from app.routers.export import csv_header, encode_rows
+
+COLUMNS = ("repo", "date", "commits", "authors")
+ROWS = [
+    {"repo": "owner/repo", "date": date(2024, 11, 1), "commits": 3, "authors": ["alice", "bob"]},
+    {"repo": "owner/repo", "date": date(2024, 11, 2), "commits": 0, "authors": []},
+]
+
+
+def test_encode_rows_ndjson():
+    body = encode_rows("ndjson", COLUMNS, ROWS).decode()
+
+    assert body.splitlines() == [
+        '{"repo": "owner/repo", "date": "2024-11-01", "commits": 3, "authors": ["alice", "bob"]}',
+        '{"repo": "owner/repo", "date": "2024-11-02", "commits": 0, "authors": []}',
+    ]
+
+
+def test_encode_rows_csv():
+    body = csv_header(COLUMNS) + encode_rows("csv", COLUMNS, ROWS)
+
+    assert body.decode().splitlines() == [
+        "repo,date,commits,authors",
+        "owner/repo,2024-11-01,3,alice;bob",
+        "owner/repo,2024-11-02,0,",
+    ]
+
+
+ACTIVITY = [
+    {"repo": "owner/a", "date": date(2024, 11, 1), "commits": 3, "authors": ["alice", "bob"]},
+    {"repo": "owner/a", "date": date(2024, 11, 2), "commits": 1, "authors": ["carol, jr."]},
+    {"repo": "owner/b", "date": date(2024, 11, 1), "commits": 2, "authors": []},
+    {"repo": "owner/b", "date": date(2024, 11, 3), "commits": 5, "authors": ["dave"]},
+    {"repo": "owner/c", "date": date(2024, 11, 2), "commits": 1, "authors": ["eve"]},
+]
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetches = []
+
+    async def fetch(self, count):
+        self.fetches.append(count)
+        rows, self.rows = self.rows[:count], self.rows[count:]
+        return rows
+
+
+def make_client(monkeypatch, rows):
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    cursor = FakeCursor(rows)
+    conn = MagicMock()
+    conn.transaction.return_value = AsyncMock()
+    conn.cursor = AsyncMock(return_value=cursor)
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def acquire():
+        yield conn
+
+    pool.acquire = acquire
+    app = FastAPI()
+    app.include_router(export.router, prefix="/api/export")
+    app.dependency_overrides[get_db_pool] = lambda: pool
+    return TestClient(app), conn, cursor
+
+
+def test_export_activity_ndjson_round_trip(monkeypatch):
+    client, conn, cursor = make_client(monkeypatch, ACTIVITY)
+
+    response = client.get("/api/export/activity", params={"format": "ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {**row, "date": row["date"].isoformat()} for row in ACTIVITY
+    ]
+    assert cursor.fetches == [2, 2, 2]
+    assert conn.transaction.call_args[1] == {"isolation": "repeatable_read", "readonly": True}
+
+
+def test_export_activity_csv_round_trip(monkeypatch):
+    client, conn, _ = make_client(monkeypatch, ACTIVITY)
+
+    response = client.get(
+        "/api/export/activity",
+        params={"format": "csv", "repos": "owner/a,owner/b", "start_date": "2024-11-01", "end_date": "2024-11-03"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="activity.csv"'
+    assert list(csv.DictReader(io.StringIO(response.text))) == [
+        {
+            "repo": row["repo"],
+            "date": row["date"].isoformat(),
+            "commits": str(row["commits"]),
+            "authors": ";".join(row["authors"]),
+        }
+        for row in ACTIVITY
+    ]
+    assert conn.cursor.call_args[0][1:] == (["owner/a", "owner/b"], date(2024, 11, 1), date(2024, 11, 3))
+
+
+def test_export_without_rows_has_only_csv_header(monkeypatch):
+    client, _, _ = make_client(monkeypatch, [])
+
+    response = client.get("/api/export/top100", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.text.splitlines() == [",".join(export.EXPORT_COLUMNS["top100"])]
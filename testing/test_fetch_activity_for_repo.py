@@ -1,8 +1,10 @@
-from cloud_function.github_parser import fetch_activity_for_repo
+from cloud_function.github_parser import CommitFetchError, fetch_activity_for_repo
+from cloud_function.github_client import GitHubClient
+from cloud_function.config import Config
 from aioresponses import aioresponses
 from datetime import datetime, timedelta, timezone
 import pytest
-import aiohttp
+import re
 
 MOCK_ACTIVITY = [
     {"repo": "test_owner/test_repo", "date": "2024-11-01", "commits": 10, "authors": ["Author1", "Author2"]},
@@ -18,7 +20,7 @@ async def test_fetch_activity_for_repo():
     url = (
         f"https://api.github.com/repos/test_owner/test_repo/commits"
         f"?since={start_date.isoformat()}T00:00:00Z"
-        f"&until={end_date.isoformat()}T23:59:59Z"
+        f"&per_page=100"
     )
 
     with aioresponses() as mocked:
@@ -45,9 +47,89 @@ async def test_fetch_activity_for_repo():
             ],
         )
 
-        async with aiohttp.ClientSession() as session:
-            activity = await fetch_activity_for_repo(session, "test_owner/test_repo", 7)
+        async with GitHubClient(Config()) as client:
+            activity = await fetch_activity_for_repo(client, "test_owner/test_repo", 7)
 
         assert len(activity) == 2
         assert activity[0]["date"] == str(start_date)
         assert "Author1" in activity[0]["authors"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_activity_for_repo_paginated():
+    end_date = datetime.now(timezone.utc).date()
+    start_date = end_date - timedelta(days=7)
+
+    url = (
+        f"https://api.github.com/repos/test_owner/test_repo/commits"
+        f"?since={start_date.isoformat()}T00:00:00Z"
+        f"&per_page=100"
+    )
+    link_header = (
+        f'<{url}&page=2>; rel="next", '
+        f'<{url}&page=3>; rel="last"'
+    )
+
+    def page(author):
+        return [{"commit": {"author": {"date": f"{end_date}T10:00:00Z", "name": author}}}]
+
+    with aioresponses() as mocked:
+        mocked.get(url, status=200, payload=page("Author1"), headers={"Link": link_header})
+        mocked.get(f"{url}&page=2", status=200, payload=page("Author2"))
+        mocked.get(f"{url}&page=3", status=200, payload=page("Author3"))
+
+        async with GitHubClient(Config()) as client:
+            activity = await fetch_activity_for_repo(client, "test_owner/test_repo", 7)
+
+        assert len(activity) == 1
+        assert activity[0]["commits"] == 3
+        assert sorted(activity[0]["authors"]) == ["Author1", "Author2", "Author3"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_activity_for_repo_raises_on_server_errors(monkeypatch):
+    monkeypatch.setenv("GITHUB_MAX_RETRIES", "0")
+    monkeypatch.setenv("GITHUB_CACHE_DIR", "")
+
+    with aioresponses() as mocked:
+        mocked.get(re.compile(r".*/repos/test_owner/test_repo/commits.*"), status=502, repeat=True)
+
+        async with GitHubClient(Config()) as client:
+            with pytest.raises(CommitFetchError):
+                await fetch_activity_for_repo(client, "test_owner/test_repo", 7)
+
+
+@pytest.mark.asyncio
+async def test_fetch_activity_for_repo_empty_repository(monkeypatch):
+    monkeypatch.setenv("GITHUB_CACHE_DIR", "")
+
+    with aioresponses() as mocked:
+        mocked.get(re.compile(r".*/repos/test_owner/test_repo/commits.*"), status=409)
+
+        async with GitHubClient(Config()) as client:
+            assert await fetch_activity_for_repo(client, "test_owner/test_repo", 7) == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_activity_for_repo_fails_when_a_page_fails(monkeypatch):
+    monkeypatch.setenv("GITHUB_MAX_RETRIES", "0")
+    monkeypatch.setenv("GITHUB_CACHE_DIR", "")
+    end_date = datetime.now(timezone.utc).date()
+    start_date = end_date - timedelta(days=7)
+
+    url = (
+        f"https://api.github.com/repos/test_owner/test_repo/commits"
+        f"?since={start_date.isoformat()}T00:00:00Z"
+        f"&per_page=100"
+    )
+    link_header = f'<{url}&page=2>; rel="next", <{url}&page=3>; rel="last"'
+    page = [{"commit": {"author": {"date": f"{end_date}T10:00:00Z", "name": "Author1"}}}]
+
+    with aioresponses() as mocked:
+        mocked.get(url, status=200, payload=page, headers={"Link": link_header})
+        mocked.get(f"{url}&page=2", status=502)
+        mocked.get(f"{url}&page=3", status=200, payload=page)
+
+        async with GitHubClient(Config()) as client:
+            with pytest.raises(CommitFetchError):
+                await fetch_activity_for_repo(client, "test_owner/test_repo", 7)
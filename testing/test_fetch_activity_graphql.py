@@ -0,0 +1,61 @@
+from cloud_function.github_parser import fetch_activity_graphql
+from cloud_function.github_client import GitHubClient
+from cloud_function.config import Config
+from aioresponses import aioresponses
+from datetime import datetime, timezone
+import pytest
+
+GRAPHQL_URL = "http://localhost:8081/graphql"
+
+
+def history(nodes, has_next_page=False, end_cursor=None):
+    return {
+        "defaultBranchRef": {
+            "target": {
+                "history": {
+                    "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+                    "nodes": nodes,
+                }
+            }
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_fetch_activity_graphql(monkeypatch):
+    monkeypatch.setenv("GITHUB_GRAPHQL_URL", GRAPHQL_URL)
+    today = datetime.now(timezone.utc).date()
+    node = {"author": {"name": "Author1", "date": f"{today}T10:00:00+00:00"}}
+
+    with aioresponses() as mocked:
+        mocked.post(
+            GRAPHQL_URL,
+            payload={"data": {"r0": history([node], True, "cursor1"), "r1": history([node])}},
+        )
+        mocked.post(GRAPHQL_URL, payload={"data": {"r0": history([node])}})
+
+        async with GitHubClient(Config()) as client:
+            activity = await fetch_activity_graphql(client, ["test_owner/repo1", "test_owner/repo2"], 7)
+
+    assert activity["test_owner/repo1"][0]["commits"] == 2
+    assert activity["test_owner/repo2"][0]["commits"] == 1
+    assert activity["test_owner/repo2"][0]["authors"] == ["Author1"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_activity_graphql_skips_commits_without_author_name(monkeypatch):
+    monkeypatch.setenv("GITHUB_GRAPHQL_URL", GRAPHQL_URL)
+    today = datetime.now(timezone.utc).date()
+    nodes = [
+        {"author": {"name": "Author1", "date": f"{today}T10:00:00+00:00"}},
+        {"author": {"name": None, "date": f"{today}T11:00:00+00:00"}},
+    ]
+
+    with aioresponses() as mocked:
+        mocked.post(GRAPHQL_URL, payload={"data": {"r0": history(nodes)}})
+
+        async with GitHubClient(Config()) as client:
+            activity = await fetch_activity_graphql(client, ["test_owner/repo1"], 7)
+
+    assert activity["test_owner/repo1"][0]["commits"] == 1
+    assert activity["test_owner/repo1"][0]["authors"] == ["Author1"]
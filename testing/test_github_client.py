@@ -0,0 +1,27 @@
+from aioresponses import aioresponses
+import pytest
+from cloud_function.github_client import GitHubClient, endpoint_key
+from cloud_function.config import Config
+
+
+def test_endpoint_key_hides_owner_and_repo():
+    assert endpoint_key("https://api.github.com/repos/owner/repo/commits?page=2") == "/repos/{owner}/{repo}/commits"
+    assert endpoint_key("https://api.github.com/search/repositories") == "/search/repositories"
+
+
+@pytest.mark.asyncio
+async def test_github_client_reuses_session():
+    url = "https://api.github.com/search/repositories"
+
+    with aioresponses() as mocked:
+        mocked.get(url, payload={"items": []}, repeat=True)
+
+        async with GitHubClient(Config()) as client:
+            session = client.session
+            await client.get_json(url)
+            await client.get_json(url)
+
+            assert client.session is session
+            assert client.scheduler.requests == 2
+
+    assert client.session is None
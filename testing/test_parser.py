@@ -1,18 +1,119 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
 from aioresponses import aioresponses
 import pytest
-from cloud_function.github_parser import get_top_repositories
+from cloud_function import github_parser
+from cloud_function.github_parser import get_top_repositories, rank_repositories, start_or_resume_run
+from cloud_function.github_client import GitHubClient
+from cloud_function.config import Config
 
 
 @pytest.mark.asyncio
 async def test_get_top_repositories():
-    url = "https://api.github.com/search/repositories?q=stars%3A%3E1&sort=stars&order=desc&per_page=100"
+    url = "https://api.github.com/search/repositories?q=stars%3A%3E1&sort=stars&order=desc&per_page=100&page=1"
     with aioresponses() as mocked:
         mocked.get(
             url,
             payload={"items": [{"full_name": "test/repo1"}, {"full_name": "test/repo2"}]},
         )
 
-        repos = await get_top_repositories()
+        async with GitHubClient(Config()) as client:
+            repos = await get_top_repositories(client)
 
         assert len(repos) == 2
         assert repos[0]["full_name"] == "test/repo1"
+
+
+def test_rank_repositories_deduplicates_and_sorts():
+    repositories = [
+        {"full_name": "test/repo1", "stargazers_count": 10},
+        {"full_name": "test/repo2", "stargazers_count": 30},
+        {"full_name": "test/repo1", "stargazers_count": 12},
+        {"full_name": "test/repo3", "stargazers_count": 20},
+    ]
+
+    ranked = rank_repositories(repositories, 2)
+
+    assert [repo["full_name"] for repo in ranked] == ["test/repo2", "test/repo3"]
+    assert len(rank_repositories(repositories, 10)) == 3
+
+
+def patch_run_start(monkeypatch, active_runs):
+    locked = []
+    for name in (
+        "ensure_run_state_schema",
+        "ensure_author_schema",
+        "ensure_rank_history_schema",
+        "ensure_top100_indexes",
+        "ensure_data_version_schema",
+        "ensure_rollup_schema",
+        "prepare_stream_staging",
+        "reconcile_staging",
+    ):
+        monkeypatch.setattr(github_parser, name, AsyncMock())
+
+    async def lock_runs(conn):
+        locked.append(True)
+
+    async def unlock_runs(conn):
+        locked.pop()
+
+    async def get_top_repositories(client):
+        assert not locked, "поиск по GitHub не должен идти под блокировкой"
+        return [{"full_name": "test/repo1"}]
+
+    monkeypatch.setattr(github_parser, "lock_runs", lock_runs)
+    monkeypatch.setattr(github_parser, "unlock_runs", unlock_runs)
+    monkeypatch.setattr(github_parser, "get_top_repositories", get_top_repositories)
+    monkeypatch.setattr(github_parser, "find_active_run", AsyncMock(side_effect=active_runs))
+    create_run = AsyncMock(return_value=3)
+    monkeypatch.setattr(github_parser, "create_run", create_run)
+
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def acquire():
+        yield MagicMock()
+
+    pool.acquire = acquire
+    client = MagicMock()
+    client.config = Config()
+    return client, pool, create_run, locked
+
+
+@pytest.mark.asyncio
+async def test_start_or_resume_run_searches_without_lock(monkeypatch):
+    client, pool, create_run, locked = patch_run_start(monkeypatch, [None, None])
+
+    run_id, repositories = await start_or_resume_run(client, pool)
+
+    assert run_id == 3
+    assert repositories == [{"full_name": "test/repo1"}]
+    create_run.assert_awaited_once()
+    assert not locked
+
+
+@pytest.mark.asyncio
+async def test_start_or_resume_run_joins_run_created_during_search(monkeypatch):
+    other_run = (5, [{"full_name": "test/repo2"}])
+    client, pool, create_run, locked = patch_run_start(monkeypatch, [None, other_run])
+
+    assert await start_or_resume_run(client, pool) == other_run
+    create_run.assert_not_awaited()
+    assert not locked
+
+
+@pytest.mark.parametrize("summary, status", [
+    ({"success": True, "complete": True, "run_id": 3}, 200),
+    ({"success": True, "complete": False, "run_id": 3}, 202),
+    ({"success": False, "complete": False, "run_id": 3}, 500),
+])
+def test_handler_status_follows_summary(monkeypatch, summary, status):
+    monkeypatch.setenv("PARSER_WORKERS", "1")
+    monkeypatch.setattr(github_parser, "run_parser", AsyncMock(return_value=summary))
+
+    response = github_parser.handler({}, None)
+
+    assert response["statusCode"] == status
+    if status != 200:
+        assert "3" in response["body"]
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from cloud_function.pipeline import run_pipeline
+
+
+@pytest.mark.asyncio
+async def test_run_pipeline_flushes_in_batches():
+    batches = []
+
+    async def fetch(repo):
+        await asyncio.sleep(0)
+        return [{"repo": repo, "day": day} for day in range(3)]
+
+    async def write(rows):
+        batches.append(list(rows))
+
+    written = await run_pipeline(
+        [f"owner/repo{i}" for i in range(10)],
+        fetch,
+        lambda record: (record["repo"], record["day"]),
+        write,
+        workers=3,
+        queue_size=2,
+        flush_rows=7,
+        flush_seconds=10,
+    )
+
+    assert written == 30
+    assert [len(batch) for batch in batches] == [7, 7, 7, 7, 2]
+    assert sorted(row for batch in batches for row in batch) == sorted(
+        (f"owner/repo{i}", day) for i in range(10) for day in range(3)
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_pipeline_skips_failed_jobs():
+    rows = []
+
+    async def fetch(repo):
+        if repo == "owner/broken":
+            raise ValueError("boom")
+        return [repo]
+
+    async def write(batch):
+        rows.extend(batch)
+
+    written = await run_pipeline(
+        ["owner/ok", "owner/broken"], fetch, lambda record: record, write,
+        workers=2, queue_size=1, flush_rows=10, flush_seconds=0.1,
+    )
+
+    assert written == 1
+    assert rows == ["owner/ok"]
+
+
+@pytest.mark.asyncio
+async def test_run_pipeline_accepts_async_job_source():
+    rows = []
+
+    async def jobs():
+        for batch in (["owner/a", "owner/b"], ["owner/c"]):
+            await asyncio.sleep(0)
+            for repo in batch:
+                yield repo
+
+    async def fetch(repo):
+        return [repo]
+
+    async def write(batch):
+        rows.extend(batch)
+
+    written = await run_pipeline(
+        jobs(), fetch, lambda record: record, write, workers=2, queue_size=1, flush_rows=10, flush_seconds=10
+    )
+
+    assert written == 3
+    assert sorted(rows) == ["owner/a", "owner/b", "owner/c"]
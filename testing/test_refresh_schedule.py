@@ -0,0 +1,78 @@
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timedelta, timezone
+import pytest
+from cloud_function.config import Config
+from cloud_function.refresh_schedule import plan_refresh, record_refreshes, refresh_interval
+
+NOW = datetime(2024, 11, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def make_config(monkeypatch, **env):
+    for key, value in env.items():
+        monkeypatch.setenv(key, str(value))
+    return Config()
+
+
+def entry(rate, refreshed_hours_ago, interval_hours):
+    refreshed_at = NOW - timedelta(hours=refreshed_hours_ago)
+    return {
+        "commit_rate": rate,
+        "refreshed_at": refreshed_at,
+        "next_refresh_at": refreshed_at + timedelta(hours=interval_hours),
+    }
+
+
+def test_refresh_interval_follows_commit_rate(monkeypatch):
+    config = make_config(monkeypatch, REFRESH_TARGET_COMMITS=100, REFRESH_MIN_INTERVAL_HOURS=1,
+                         REFRESH_MAX_INTERVAL_HOURS=168)
+
+    assert refresh_interval(0, config) == 168
+    assert refresh_interval(0.1, config) == 168
+    assert refresh_interval(50, config) == 48
+    assert refresh_interval(5000, config) == 1
+
+
+def test_plan_refresh_picks_new_and_overdue_repos(monkeypatch):
+    config = make_config(monkeypatch, REFRESH_REQUEST_BUDGET=0)
+    schedule = {
+        "owner/hot": entry(500, 2, 1),
+        "owner/fresh": entry(500, 0.5, 1),
+        "owner/dormant": entry(0, 200, 168),
+    }
+
+    due = plan_refresh(["owner/hot", "owner/fresh", "owner/dormant", "owner/new"], schedule, NOW, config)
+
+    assert due == ["owner/new", "owner/hot", "owner/dormant"]
+
+
+def test_plan_refresh_respects_request_budget(monkeypatch):
+    config = make_config(monkeypatch, REFRESH_REQUEST_BUDGET=5, ACTIVITY_DAYS=30)
+    schedule = {
+        "owner/hot": entry(2400, 3, 1),
+        "owner/quiet": entry(1, 100, 96),
+    }
+
+    due = plan_refresh(["owner/hot", "owner/quiet"], schedule, NOW, config)
+
+    assert due == ["owner/hot"]
+
+
+@pytest.mark.asyncio
+async def test_record_refreshes_schedules_next_refresh(monkeypatch):
+    config = make_config(monkeypatch, REFRESH_RATE_DAYS=7, REFRESH_TARGET_COMMITS=70)
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.executemany = AsyncMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [{"repo": "owner/repo", "last_commit_at": NOW}],
+        [{"repo": "owner/repo", "commits": 140}],
+    ])
+
+    await record_refreshes(conn, 7, ["owner/repo"], config)
+
+    repo, rate, last_changed_at, refreshed_at, next_refresh_at = conn.executemany.call_args[0][1][0]
+    assert (repo, rate, last_changed_at) == ("owner/repo", 20, NOW)
+    assert next_refresh_at - refreshed_at == timedelta(hours=84)
+    conn.execute.assert_called_once_with(
+        "DELETE FROM repo_refresh WHERE NOT (repo = ANY($1::text[]))", ["owner/repo"]
+    )
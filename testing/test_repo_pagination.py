@@ -0,0 +1,136 @@
+import base64
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.database.db import fetch_repositories_page
+from app.database.utils import get_db_pool
+from app.routers import repos
+from app.routers.repos import decode_cursor, encode_cursor
+
+TOP100 = [
+    {
+        "repo": f"owner/repo{i}", "owner": "owner", "position_cur": i + 1, "position_prev": None,
+        "stars": stars, "watchers": 0, "forks": 0, "open_issues": 0, "language": None,
+    }
+    for i, stars in enumerate([500, 300, 300, 300, 200, 100, 100])
+]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("language", "asc", "Python", "owner/repo")
+
+    assert decode_cursor(cursor, "language", "asc") == ("Python", "owner/repo")
+
+
+def test_cursor_rejects_other_sort():
+    cursor = encode_cursor("stars", "desc", 1000, "owner/repo")
+
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor, "forks", "desc")
+    assert err.value.status_code == 400
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(HTTPException) as err:
+        decode_cursor("not-a-cursor", "stars", "desc")
+    assert err.value.status_code == 400
+
+
+@pytest.mark.parametrize("sort_by, payload", [
+    ("stars", ["stars", "desc", "x", "owner/repo"]),
+    ("stars", ["stars", "desc", True, "owner/repo"]),
+    ("stars", ["stars", "desc", 2 ** 40, "owner/repo"]),
+    ("stars", ["stars", "desc", 1000, 42]),
+    ("language", ["language", "desc", 5, "owner/repo"]),
+    ("stars", ["x", "repo"]),
+    ("stars", {"sort_by": "stars"}),
+])
+def test_cursor_rejects_wrong_value_types(sort_by, payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor, sort_by, "desc")
+    assert err.value.status_code == 400
+
+
+async def fake_page(pool, sort_by, order, limit, after=None):
+    """Keyset-пагинация fetch_repositories_page над списком в памяти: сравнение пар (значение, repo)."""
+    rows = [{**row, "sort_value": row[sort_by]} for row in TOP100]
+    rows.sort(key=lambda row: (row["sort_value"], row["repo"]), reverse=order == "desc")
+    if after is not None:
+        after = tuple(after)
+        rows = [
+            row for row in rows
+            if ((row["sort_value"], row["repo"]) < after if order == "desc" else (row["sort_value"], row["repo"]) > after)
+        ]
+    return rows[:limit]
+
+
+def make_client(monkeypatch):
+    app = FastAPI()
+    app.include_router(repos.router, prefix="/api/repos")
+    app.dependency_overrides[get_db_pool] = lambda: MagicMock()
+    monkeypatch.setattr(repos, "fetch_data_version", AsyncMock(return_value=1))
+    monkeypatch.setattr(repos, "fetch_repositories_page", fake_page)
+    return TestClient(app)
+
+
+def walk(client, order, limit):
+    names, cursor, pages = [], None, 0
+    while True:
+        params = {"sort_by": "stars", "order": order, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/repos", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        names += [item["repo"] for item in body["items"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return names, pages
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_pages_cover_top_once_across_ties(monkeypatch, order, limit):
+    client = make_client(monkeypatch)
+
+    names, pages = walk(client, order, limit)
+
+    expected = sorted(TOP100, key=lambda row: (row["stars"], row["repo"]), reverse=order == "desc")
+    assert names == [row["repo"] for row in expected]
+    assert pages == -(-len(TOP100) // limit)
+
+
+def test_last_page_has_no_next_cursor(monkeypatch):
+    client = make_client(monkeypatch)
+
+    body = client.get("/api/repos", params={"sort_by": "stars", "order": "desc", "limit": 100}).json()
+
+    assert len(body["items"]) == len(TOP100)
+    assert body["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("order, comparison", [("desc", "<"), ("asc", ">")])
+async def test_fetch_repositories_page_continues_after_cursor(order, comparison):
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[])
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def acquire():
+        yield conn
+
+    pool.acquire = acquire
+
+    await fetch_repositories_page(pool, "stars", order, 3, (300, "owner/repo2"))
+
+    query, *params = conn.fetch.call_args[0]
+    assert f"WHERE (stars, repo) {comparison} ($2, $3)" in query
+    assert f"ORDER BY stars {order}, repo {order}" in query
+    assert params == [3, 300, "owner/repo2"]
@@ -0,0 +1,37 @@
+import os
+from cloud_function.response_cache import ResponseCache
+
+
+def test_response_cache_roundtrip(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1024 * 1024)
+    key = cache.make_key("https://api.github.com/search/repositories", {"q": "stars:>1"})
+
+    cache.set(key, {"ETag": '"abc"', "Link": "<next>; rel=\"next\""}, {"items": []})
+    entry = cache.get(key)
+
+    assert entry["data"] == {"items": []}
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"abc"'}
+
+
+def test_response_cache_skips_responses_without_validators(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1024 * 1024)
+    key = cache.make_key("https://api.github.com/repos/a/b/commits")
+
+    cache.set(key, {}, [])
+
+    assert cache.get(key) is None
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=200)
+    keys = [cache.make_key(f"https://api.github.com/repos/a/{i}/commits") for i in range(3)]
+
+    for i, key in enumerate(keys):
+        cache.set(key, {"ETag": f'"{i}"'}, ["x" * 50])
+        os.utime(cache._path(key), (i, i))
+
+    cache.get(keys[0])
+    cache.set(keys[0], {"ETag": '"0"'}, ["x" * 50])
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
@@ -0,0 +1,61 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from cloud_function.run_profiler import RunProfiler, save_report_to_db, write_report_file
+
+
+def test_run_profiler_report():
+    profiler = RunProfiler()
+    with profiler.phase("fetch"):
+        pass
+    with profiler.phase("fetch"):
+        pass
+    profiler.add("db_commit", 0.5)
+    profiler.record_repo("owner/fast", 0.05)
+    profiler.record_repo("owner/slow", 3)
+    profiler.record_repo("owner/slow", 4)
+    profiler.count_request("owner/slow")
+    profiler.count_request("owner/slow")
+
+    report = profiler.report(run_id=7, worker_id="host:1")
+
+    assert report["run_id"] == 7
+    assert report["phases"]["fetch"]["calls"] == 2
+    assert report["phases"]["db_commit"] == {"calls": 1, "seconds": 0.5}
+    assert report["repo_latency_histogram"]["<=0.1"] == 1
+    assert report["repo_latency_histogram"]["<=10"] == 1
+    assert report["slowest_repos"][0] == {"repo": "owner/slow", "seconds": 7, "requests": 2}
+    assert report["hotspots"] == []
+
+
+def test_run_profiler_hotspots():
+    profiler = RunProfiler()
+    profiler.start_profile()
+    sorted(range(1000), key=lambda value: -value)
+
+    hotspots = profiler.report(hotspots_limit=3, worker_id="host:1")["hotspots"]
+
+    assert 0 < len(hotspots) <= 3
+    assert {"function", "calls", "self_seconds", "cumulative_seconds"} <= set(hotspots[0])
+
+
+def test_write_report_file(tmp_path):
+    path = write_report_file(str(tmp_path), {"run_id": 7, "worker_id": "host:1:abc"})
+
+    with open(path, encoding="utf-8") as report_file:
+        assert json.load(report_file)["run_id"] == 7
+
+
+@pytest.mark.asyncio
+async def test_save_report_to_db():
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+
+    await save_report_to_db(conn, {"run_id": 7, "worker_id": "host:1"})
+
+    conn.execute.assert_called_with(
+        "INSERT INTO parser_run_reports (run_id, worker_id, report) VALUES ($1, $2, $3::jsonb)",
+        7,
+        "host:1",
+        json.dumps({"run_id": 7, "worker_id": "host:1"}),
+    )
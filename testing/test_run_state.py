@@ -0,0 +1,101 @@
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timezone
+import pytest
+from cloud_function.run_state import (
+    claim_repos,
+    fetch_run_watermarks,
+    mark_repos_done,
+    reconcile_staging,
+)
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.transaction.return_value = AsyncMock()
+    conn.execute = AsyncMock()
+    conn.executemany = AsyncMock()
+    conn.fetch = AsyncMock()
+    conn.fetchval = AsyncMock()
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_mark_repos_done_stores_rows_and_watermark():
+    conn = make_conn()
+
+    await mark_repos_done(
+        conn, 7, "worker-1", {"owner/repo": (3, "2024-11-02T09:30:00Z"), "owner/empty": (0, None)}
+    )
+
+    assert conn.executemany.call_args[0][1] == [
+        (7, "owner/repo", "done", 3, datetime(2024, 11, 2, 9, 30, tzinfo=timezone.utc), "worker-1"),
+        (7, "owner/empty", "done", 0, None, "worker-1"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_staging_keeps_matching_rows():
+    conn = make_conn()
+    conn.fetchval.side_effect = [5, 5]
+
+    await reconcile_staging(conn, 7, "activity_stream_staging")
+
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_staging_restarts_when_rows_are_lost():
+    conn = make_conn()
+    conn.fetchval.side_effect = [5, 0]
+
+    await reconcile_staging(conn, 7, "activity_stream_staging")
+
+    executed = [call[0][0] for call in conn.execute.call_args_list]
+    assert "TRUNCATE activity_stream_staging" in executed
+    assert any("UPDATE parser_run_repos" in statement for statement in executed)
+
+
+@pytest.mark.asyncio
+async def test_claim_repos_clears_staging_rows_of_reclaimed_repos():
+    conn = make_conn()
+    conn.fetch.return_value = [
+        {"repo": "owner/c", "position": 3, "attempts": 1},
+        {"repo": "owner/b", "position": 2, "attempts": 2},
+        {"repo": "owner/a", "position": 1, "attempts": 3},
+    ]
+
+    claimed = await claim_repos(conn, 7, "worker-1", 20, 300, 3, "activity_stream_staging")
+
+    assert claimed == ["owner/a", "owner/b", "owner/c"]
+    assert "FOR UPDATE SKIP LOCKED" in conn.fetch.call_args[0][0]
+    conn.execute.assert_called_once_with(
+        "DELETE FROM activity_stream_staging WHERE repo = ANY($1::text[])", ["owner/a", "owner/b"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_claim_repos_skips_staging_delete_on_first_attempt():
+    conn = make_conn()
+    conn.fetch.return_value = [{"repo": "owner/a", "position": 1, "attempts": 1}]
+
+    assert await claim_repos(conn, 7, "worker-1", 20, 300, 3, "activity_stream_staging") == ["owner/a"]
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_claim_repos_returns_nothing_when_queue_is_empty():
+    conn = make_conn()
+    conn.fetch.return_value = []
+
+    assert await claim_repos(conn, 7, "worker-1", 20, 300, 3, "activity_stream_staging") == []
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_run_watermarks_formats_timestamps():
+    conn = make_conn()
+    conn.fetch.return_value = [
+        {"repo": "owner/repo", "last_commit_at": datetime(2024, 11, 2, 9, 30, tzinfo=timezone.utc)},
+    ]
+
+    assert await fetch_run_watermarks(conn, 7) == {"owner/repo": "2024-11-02T09:30:00Z"}
@@ -16,23 +16,27 @@ async def test_save_activity_to_db():
     mock_transaction = AsyncMock()
     mock_conn.transaction.return_value = mock_transaction
     mock_conn.execute = AsyncMock()
-    mock_conn.executemany = AsyncMock()
+    mock_conn.copy_records_to_table = AsyncMock()
+    mock_conn.fetch = AsyncMock(return_value=[{"id": 1, "name": "Author1"}, {"id": 2, "name": "Author2"}])
 
     await save_activity_to_db(mock_conn, MOCK_ACTIVITY)
 
-    mock_conn.execute.assert_called_once_with("DELETE FROM activity;")
+    mock_conn.execute.assert_any_call("DELETE FROM activity;")
 
-    actual_query = mock_conn.executemany.call_args[0][0].replace(" ", "").replace("\n", "")
+    actual_query = mock_conn.execute.call_args_list[-1][0][0].replace(" ", "").replace("\n", "")
     expected_query = """
-        INSERT INTO activity (repo, date, commits, authors)
-        VALUES ($1, $2, $3, $4);
+        INSERT INTO activity (repo, date, commits, author_ids)
+        SELECT repo, date, commits, author_ids
+        FROM activity_staging;
     """.replace(" ", "").replace("\n", "")
 
     assert actual_query == expected_query, f"Actual query: {actual_query}, Expected query: {expected_query}"
 
-    actual_data = mock_conn.executemany.call_args[0][1]
+    copy_args = mock_conn.copy_records_to_table.call_args
+    assert copy_args[0][0] == "activity_staging"
     expected_data = [
-        ("test_owner/test_repo", datetime(2024, 11, 1).date(), 10, ["Author1", "Author2"]),
-        ("test_owner/test_repo", datetime(2024, 11, 2).date(), 5, ["Author1"]),
+        ("test_owner/test_repo", datetime(2024, 11, 1).date(), 10, [1, 2]),
+        ("test_owner/test_repo", datetime(2024, 11, 2).date(), 5, [1]),
     ]
+    actual_data = copy_args[1]["records"]
     assert actual_data == expected_data, f"Actual data: {actual_data}, Expected data: {expected_data}"
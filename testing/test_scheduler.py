@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock
+from aioresponses import aioresponses
+import aiohttp
+import pytest
+from cloud_function.scheduler import RequestScheduler, RateLimitExceeded
+
+URL = "https://api.github.com/repos/test_owner/test_repo/commits"
+
+
+def make_config(max_retries=3):
+    config = MagicMock()
+    config.github_max_concurrency = 2
+    config.github_requests_per_second = 1000
+    config.github_max_retries = max_retries
+    config.github_backoff_base = 0
+    config.github_backoff_max = 0
+    config.github_cache_dir = None
+    config.github_tokens = ["test_token"]
+    return config
+
+
+@pytest.mark.asyncio
+async def test_get_json_retries_server_errors():
+    scheduler = RequestScheduler(make_config())
+
+    with aioresponses() as mocked:
+        mocked.get(URL, status=502)
+        mocked.get(URL, status=200, payload=[{"sha": "1"}])
+
+        async with aiohttp.ClientSession() as session:
+            data, _ = await scheduler.get_json(session, URL, label="test_owner/test_repo")
+
+    assert data == [{"sha": "1"}]
+    assert scheduler.requests == 2
+    assert scheduler.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_get_json_waits_for_retry_after():
+    scheduler = RequestScheduler(make_config())
+
+    with aioresponses() as mocked:
+        mocked.get(URL, status=429, headers={"Retry-After": "0"})
+        mocked.get(URL, status=200, payload=[])
+
+        async with aiohttp.ClientSession() as session:
+            data, _ = await scheduler.get_json(session, URL, label="test_owner/test_repo")
+
+    assert data == []
+    assert scheduler.throttled == 1
+
+
+@pytest.mark.asyncio
+async def test_get_json_gives_up_on_rate_limit():
+    scheduler = RequestScheduler(make_config(max_retries=1))
+
+    with aioresponses() as mocked:
+        mocked.get(URL, status=403, headers={"Retry-After": "0"}, repeat=True)
+
+        async with aiohttp.ClientSession() as session:
+            with pytest.raises(RateLimitExceeded):
+                await scheduler.get_json(session, URL, label="test_owner/test_repo")
+
+
+@pytest.mark.asyncio
+async def test_get_json_serves_not_modified_from_cache(tmp_path):
+    config = make_config()
+    config.github_cache_dir = str(tmp_path)
+    config.github_cache_max_bytes = 1024 * 1024
+    scheduler = RequestScheduler(config)
+
+    with aioresponses() as mocked:
+        mocked.get(URL, status=200, payload=[{"sha": "1", "extra": "x"}], headers={"ETag": '"abc"'})
+        mocked.get(URL, status=304)
+
+        async with aiohttp.ClientSession() as session:
+            first, _ = await scheduler.get_json(session, URL, compact=lambda data: [{"sha": c["sha"]} for c in data])
+            second, _ = await scheduler.get_json(session, URL)
+
+    assert first == second == [{"sha": "1"}]
+    assert scheduler.cache.hits == 1
@@ -0,0 +1,37 @@
+from cloud_function.stats_fetcher import daily_commits, fetch_commit_activity, poll_delay
+from cloud_function.github_client import GitHubClient
+from cloud_function.config import Config
+from aioresponses import aioresponses
+from datetime import date, datetime, timezone
+import pytest
+
+API_URL = "http://localhost:8081"
+
+
+def test_daily_commits():
+    week = int(datetime(2024, 11, 3, tzinfo=timezone.utc).timestamp())
+    weeks = [{"week": week, "days": [0, 3, 0, 1, 0, 0, 7], "total": 11}]
+
+    assert daily_commits(weeks, date(2024, 11, 4), date(2024, 11, 8)) == {"2024-11-04": 3, "2024-11-06": 1}
+
+
+def test_poll_delay():
+    assert [poll_delay(attempt, 2, 10) for attempt in range(1, 5)] == [2, 4, 8, 10]
+
+
+@pytest.mark.asyncio
+async def test_fetch_commit_activity_polls_until_ready(monkeypatch):
+    monkeypatch.setenv("GITHUB_API_URL", API_URL)
+    monkeypatch.setenv("GITHUB_CACHE_DIR", "")
+    monkeypatch.setenv("STATS_POLL_INTERVAL", "0")
+    weeks = [{"week": 1730592000, "days": [0, 1, 0, 0, 0, 0, 0], "total": 1}]
+
+    with aioresponses() as mocked:
+        mocked.get(f"{API_URL}/repos/owner/ready/stats/commit_activity", status=202, payload={})
+        mocked.get(f"{API_URL}/repos/owner/ready/stats/commit_activity", payload=weeks)
+        mocked.get(f"{API_URL}/repos/owner/empty/stats/commit_activity", status=204)
+
+        async with GitHubClient(Config()) as client:
+            result = await fetch_commit_activity(client, ["owner/ready", "owner/empty"])
+
+    assert result == {"owner/ready": weeks, "owner/empty": []}
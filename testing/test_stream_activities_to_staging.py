@@ -0,0 +1,192 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from aioresponses import aioresponses
+import re
+import time
+import pytest
+from cloud_function import github_parser
+from cloud_function.config import Config
+from cloud_function.github_client import GitHubClient
+from cloud_function.github_parser import (
+    discard_staged_repos,
+    replace_activity_from_staging,
+    stream_activities_to_staging,
+)
+
+
+def make_pool():
+    conn = MagicMock()
+    conn.transaction.return_value = AsyncMock()
+    conn.copy_records_to_table = AsyncMock()
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def acquire():
+        yield conn
+
+    pool.acquire = acquire
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_failed_repo_is_released_not_marked_done(monkeypatch):
+    monkeypatch.setenv("GITHUB_MAX_RETRIES", "0")
+    monkeypatch.setenv("GITHUB_CACHE_DIR", "")
+    monkeypatch.setenv("PIPELINE_WORKERS", "1")
+    claim_repos = AsyncMock(side_effect=[["owner/broken"], []])
+    release_repos = AsyncMock()
+    mark_repos_done = AsyncMock()
+    monkeypatch.setattr(github_parser, "claim_repos", claim_repos)
+    monkeypatch.setattr(github_parser, "release_repos", release_repos)
+    monkeypatch.setattr(github_parser, "mark_repos_done", mark_repos_done)
+
+    with aioresponses() as mocked:
+        mocked.get(re.compile(r".*/repos/owner/broken/commits.*"), status=502, repeat=True)
+
+        async with GitHubClient(Config()) as client:
+            written, _ = await stream_activities_to_staging(client, make_pool(), {}, 7, "worker-1")
+
+    assert written == 0
+    mark_repos_done.assert_not_called()
+    assert release_repos.call_args_list[0][0][1:] == (7, "worker-1", ["owner/broken"])
+
+
+@pytest.mark.asyncio
+async def test_replace_activity_keeps_rows_of_failed_repos():
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+
+    await replace_activity_from_staging(conn, "activity_stream_staging", ["owner/broken"])
+
+    delete_call = conn.execute.call_args_list[0]
+    assert delete_call[0] == ("DELETE FROM activity WHERE NOT (repo = ANY($1::text[]));", ["owner/broken"])
+
+
+@pytest.mark.asyncio
+async def test_partial_rows_of_failed_repos_are_discarded():
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+
+    await discard_staged_repos(conn, "activity_stream_staging", ["owner/broken"])
+    await discard_staged_repos(conn, "activity_stream_staging", [])
+
+    conn.execute.assert_awaited_once_with(
+        "DELETE FROM activity_stream_staging WHERE repo = ANY($1::text[]);", ["owner/broken"]
+    )
+
+
+class FakeRunState:
+    """Таблица parser_run_repos в памяти: аренды, попытки и статусы, как их меняет run_state."""
+
+    def __init__(self, repos, max_attempts=3):
+        self.repos = {repo: {"owner": None, "attempts": 0, "done": False} for repo in repos}
+        self.max_attempts = max_attempts
+        self.started = set()
+        self.claimed_ahead = 0
+
+    async def claim_repos(self, conn, run_id, worker_id, limit, lease_seconds, max_attempts, staging_table):
+        claimed = [
+            repo for repo, state in self.repos.items()
+            if not state["done"] and state["owner"] is None and state["attempts"] < self.max_attempts
+        ][:limit]
+        for repo in claimed:
+            self.repos[repo]["owner"] = worker_id
+            self.repos[repo]["attempts"] += 1
+        waiting = [
+            repo for repo, state in self.repos.items()
+            if state["owner"] == worker_id and not state["done"] and repo not in self.started
+        ]
+        self.claimed_ahead = max(self.claimed_ahead, len(waiting))
+        return claimed
+
+    async def release_repos(self, conn, run_id, worker_id, repos=None):
+        for repo, state in self.repos.items():
+            if state["owner"] == worker_id and (repos is None or repo in repos):
+                state["owner"] = None
+
+    async def mark_repos_done(self, conn, run_id, worker_id, finished):
+        for repo in finished:
+            self.repos[repo].update(owner=None, done=True)
+
+    async def lock_owned_repos(self, conn, run_id, worker_id, repos):
+        return [repo for repo in repos if self.repos[repo]["owner"] == worker_id]
+
+    def expire_lease(self, repo):
+        self.repos[repo]["owner"] = None
+
+
+class FakeAuthorDictionary:
+    async def encode(self, conn, rows):
+        return rows
+
+
+def use_run_state(monkeypatch, state):
+    monkeypatch.setenv("GITHUB_CACHE_DIR", "")
+    monkeypatch.setenv("PIPELINE_WORKERS", "2")
+    monkeypatch.setenv("PIPELINE_FLUSH_ROWS", "1")
+    for name in ("claim_repos", "release_repos", "mark_repos_done", "lock_owned_repos"):
+        monkeypatch.setattr(github_parser, name, getattr(state, name))
+    monkeypatch.setattr(github_parser, "AuthorDictionary", FakeAuthorDictionary)
+
+    processed = {}
+
+    async def fetch_activity_for_repo(client, repo, days, since=None):
+        state.started.add(repo)
+        await asyncio.sleep(0.01)
+        processed[repo] = state.repos[repo]["owner"]
+        return [{"date": "2024-01-01", "commits": 1, "authors": ["alice"], "last_commit_at": "2024-01-01T00:00:00Z"}]
+
+    monkeypatch.setattr(github_parser, "fetch_activity_for_repo", fetch_activity_for_repo)
+    return processed
+
+
+@pytest.mark.asyncio
+async def test_workers_claim_only_what_they_fetch(monkeypatch):
+    state = FakeRunState([f"owner/repo{i}" for i in range(12)])
+    processed = use_run_state(monkeypatch, state)
+
+    async def worker(worker_id):
+        async with GitHubClient(Config()) as client:
+            return await stream_activities_to_staging(client, make_pool(), {}, 7, worker_id)
+
+    results = await asyncio.gather(*(worker(f"worker-{i}") for i in range(3)))
+
+    assert sum(written for written, _ in results) == 12
+    assert all(state_["done"] and state_["attempts"] == 1 for state_ in state.repos.values())
+    assert set(processed.values()) == {"worker-0", "worker-1", "worker-2"}
+    assert state.claimed_ahead <= 2
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_retried_until_attempts_run_out(monkeypatch):
+    state = FakeRunState(["owner/lost", "owner/exhausted", "owner/fresh"], max_attempts=2)
+    processed = use_run_state(monkeypatch, state)
+    state.repos["owner/lost"].update(owner="worker-dead", attempts=1)
+    state.repos["owner/exhausted"].update(owner="worker-dead", attempts=2)
+    state.expire_lease("owner/lost")
+    state.expire_lease("owner/exhausted")
+
+    async with GitHubClient(Config()) as client:
+        written, _ = await stream_activities_to_staging(client, make_pool(), {}, 7, "worker-1")
+
+    assert written == 2
+    assert state.repos["owner/lost"] == {"owner": None, "attempts": 2, "done": True}
+    assert state.repos["owner/fresh"] == {"owner": None, "attempts": 1, "done": True}
+    assert state.repos["owner/exhausted"] == {"owner": None, "attempts": 2, "done": False}
+    assert "owner/exhausted" not in processed
+
+
+@pytest.mark.asyncio
+async def test_no_repos_are_claimed_after_deadline(monkeypatch):
+    state = FakeRunState(["owner/late"])
+    processed = use_run_state(monkeypatch, state)
+
+    async with GitHubClient(Config()) as client:
+        written, _ = await stream_activities_to_staging(
+            client, make_pool(), {}, 7, "worker-1", deadline=time.monotonic()
+        )
+
+    assert written == 0
+    assert processed == {}
+    assert state.repos["owner/late"]["attempts"] == 0
@@ -0,0 +1,96 @@
+import time
+import pytest
+from cloud_function.token_pool import TokenPool, request_resource
+
+
+@pytest.mark.asyncio
+async def test_acquire_prefers_token_with_most_headroom():
+    pool = TokenPool(["token_aaaa", "token_bbbb"])
+
+    first = await pool.acquire()
+    pool.release(first, {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(time.time() + 3600)})
+    second = await pool.acquire()
+
+    assert second.token == "token_bbbb"
+    assert second.headers == {"Authorization": "token token_bbbb"}
+
+
+@pytest.mark.asyncio
+async def test_exhausted_token_is_parked_until_reset():
+    pool = TokenPool(["token_aaaa", "token_bbbb"])
+
+    first = await pool.acquire()
+    pool.release(first, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 3600)})
+    tokens = []
+    for _ in range(3):
+        state = await pool.acquire()
+        tokens.append(state.token)
+        pool.release(state, {"X-RateLimit-Remaining": "100"})
+
+    assert tokens == ["token_bbbb"] * 3
+
+
+@pytest.mark.asyncio
+async def test_retry_after_parks_token():
+    pool = TokenPool(["token_aaaa", "token_bbbb"])
+
+    first = await pool.acquire()
+    pool.release(first, {}, retry_after=60)
+    second = await pool.acquire()
+
+    assert second is not first
+    assert first.throttled == 1
+
+
+@pytest.mark.asyncio
+async def test_token_returns_after_reset():
+    pool = TokenPool(["token_aaaa"])
+
+    state = await pool.acquire()
+    pool.release(state, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() - 1)})
+
+    assert await pool.acquire() is state
+    assert state.budget("core").remaining == state.budget("core").limit
+
+
+def test_pool_without_tokens_sends_no_authorization():
+    pool = TokenPool([None])
+
+    assert len(pool) == 1
+    assert pool.tokens[0].headers == {}
+
+
+@pytest.mark.asyncio
+async def test_exhausted_search_quota_does_not_park_core_requests():
+    pool = TokenPool(["token_aaaa"])
+
+    state = await pool.acquire("search")
+    pool.release(
+        state,
+        {"X-RateLimit-Resource": "search", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 60)},
+        retry_after=60,
+        resource="search",
+    )
+
+    assert await pool.acquire("core") is state
+    assert state.budget("core").remaining == 5000
+    assert state.budget("search").remaining == 0
+    assert pool._available(time.monotonic(), "search") == []
+
+
+@pytest.mark.asyncio
+async def test_release_updates_budget_named_by_response():
+    pool = TokenPool(["token_aaaa"])
+
+    state = await pool.acquire("core")
+    pool.release(state, {"X-RateLimit-Resource": "graphql", "X-RateLimit-Remaining": "42"}, resource="core")
+
+    assert state.budget("graphql").remaining == 42
+    assert state.budget("core").remaining == 5000
+    assert state.in_flight == 0
+
+
+def test_request_resource():
+    assert request_resource("https://api.github.com/search/repositories") == "search"
+    assert request_resource("https://api.github.com/graphql") == "graphql"
+    assert request_resource("https://api.github.com/repos/owner/repo/commits") == "core"
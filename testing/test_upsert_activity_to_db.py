@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, date, timezone
+import pytest
+from cloud_function.github_parser import upsert_activity_to_db
+
+
+MOCK_ACTIVITY = [
+    {
+        "repo": "test_owner/test_repo",
+        "date": "2024-11-01",
+        "commits": 10,
+        "authors": ["Author1", "Author2"],
+        "last_commit_at": "2024-11-01T18:00:00Z",
+    },
+    {
+        "repo": "test_owner/test_repo",
+        "date": "2024-11-02",
+        "commits": 5,
+        "authors": ["Author1"],
+        "last_commit_at": "2024-11-02T09:30:00Z",
+    },
+]
+
+
+@pytest.mark.asyncio
+async def test_upsert_activity_to_db():
+    mock_conn = MagicMock()
+    mock_conn.transaction.return_value = AsyncMock()
+    mock_conn.execute = AsyncMock()
+    mock_conn.executemany = AsyncMock()
+    mock_conn.copy_records_to_table = AsyncMock()
+    mock_conn.fetch = AsyncMock(return_value=[{"id": 1, "name": "Author1"}, {"id": 2, "name": "Author2"}])
+
+    await upsert_activity_to_db(mock_conn, MOCK_ACTIVITY, ["test_owner/test_repo"], date(2024, 10, 3))
+
+    watermark_call = mock_conn.executemany.call_args
+
+    assert any("ON CONFLICT (repo, date) DO UPDATE" in call[0][0] for call in mock_conn.execute.call_args_list)
+    assert mock_conn.copy_records_to_table.call_args[1]["records"] == [
+        ("test_owner/test_repo", date(2024, 11, 1), 10, [1, 2]),
+        ("test_owner/test_repo", date(2024, 11, 2), 5, [1]),
+    ]
+    assert watermark_call[0][1] == [
+        ("test_owner/test_repo", datetime(2024, 11, 2, 9, 30, tzinfo=timezone.utc)),
+    ]
+
+    mock_conn.execute.assert_any_call(
+        "DELETE FROM activity WHERE date < $1 OR NOT (repo = ANY($2::text[]))",
+        date(2024, 10, 3),
+        ["test_owner/test_repo"],
+    )